@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, Request
 from config import Config
 from models import db
 from routes.auth import auth_bp
@@ -6,56 +6,70 @@ from routes.main import main_bp
 from routes.produtos import produtos_bp
 from routes.perfil import perfil_bp
 from routes.admin import admin_bp
+from sessoes import SessaoBancoInterface
+from fragmentos import card_produto, linha_produto_admin
+import estaticos
+import metricas
+from fotos import srcset_foto
+from fotos_perfil import url_foto_perfil
+
+
+class RequestApp(Request):
+    @property
+    def max_content_length(self):
+        # A importação de produtos aceita arquivos bem maiores que uma foto
+        if self.endpoint == 'admin.importar_produtos':
+            return Config.IMPORTACAO_TAMANHO_MAX
+        return super().max_content_length
+
 
-#def create_app():
-    #app = Flask(__name__)
 def create_app():
-    app = Flask(_name_)
-    return app
- app.config.from_object(Config)
- app = create_app()
-   
-   
-app = create_app()
-    
+    app = Flask(__name__)
+    app.request_class = RequestApp
+    app.config.from_object(Config)
+
     # Inicializa extensões
     db.init_app(app)
-    
+    # Sessão no banco: o cookie leva só um id opaco
+    app.session_interface = SessaoBancoInterface()
+    # Latência, consultas SQL e chamadas ao SUAP por endpoint (GET /metrics)
+    metricas.init_app(app)
+    # Em desenvolvimento: avisa de N+1 e SELECT sem LIMIT grandes (detector_consultas.py)
+    if Config.DETECTOR_CONSULTAS:
+        import detector_consultas
+        detector_consultas.init_app(app)
+
     # Registra blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
     app.register_blueprint(produtos_bp)
     app.register_blueprint(perfil_bp)
     app.register_blueprint(admin_bp)
-    
+
+    # Estáticos com hash no nome e cache imutável (se build_estaticos.py tiver rodado)
+    estaticos.init_app(app)
+
+    # Cards de produto com HTML em cache (fragmentos.py)
+    app.add_template_global(card_produto)
+    app.add_template_global(linha_produto_admin)
+    app.add_template_global(srcset_foto)
+    app.add_template_global(url_foto_perfil)
+
     # Context processor: is_admin disponível em todos os templates
     @app.context_processor
     def inject_admin():
         from utils import is_admin_user
         return dict(is_admin=is_admin_user())
-    
-    # Cria tabelas e aplica migrações pendentes (ex.: coluna is_admin)
-    with app.app_context():
-        db.create_all()
-        _migrate_is_admin_if_needed(app)
-    
-    return app
 
+    # O schema é mantido por migracoes.py e aplicado no deploy (python init_db.py),
+    # não a cada boot de worker.
+    return app
 
-def _migrate_is_admin_if_needed(app):
-    """Adiciona coluna is_admin em usuario_info se o banco já existia antes da área admin."""
-    from sqlalchemy import text
-    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
-    if 'sqlite' not in uri.lower():
-        return
-    with app.app_context():
-        with db.engine.connect() as conn:
-            r = conn.execute(text("PRAGMA table_info(usuario_info)"))
-            cols = [row[1] for row in r.fetchall()]
-            if 'is_admin' not in cols:
-                conn.execute(text("ALTER TABLE usuario_info ADD COLUMN is_admin INTEGER DEFAULT 0"))
-                conn.commit()
 
 if __name__ == '__main__':
+    from migracoes import aplicar_migracoes
     app = create_app()
+    # Em desenvolvimento, aplica migrações pendentes antes de subir o servidor
+    with app.app_context():
+        aplicar_migracoes()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,178 @@
+"""Benchmark de escritas concorrentes no SQLite, com vários processos como os workers do gunicorn.
+
+Uso (na raiz do projeto):
+    python benchmarks/escrita_concorrente.py [--processos 4] [--threads 4] [--segundos 10]
+    python benchmarks/escrita_concorrente.py --sem-pragmas      # SQLite sem WAL/busy_timeout, como antes
+
+Cada execução cria um banco SQLite novo (populado como em carga.py) e sobe --processos
+processos com create_app() e --threads threads cada, todos logados com usuários
+diferentes. Durante --segundos, cada thread sorteia entre avaliar um produto (POST
+/produtos/<id>/avaliar), cadastrar um produto (POST /produtos/novo) e abrir /home,
+conforme --mistura. Mostra escritas/s e leituras/s, p50/p95/p99 das escritas e os
+erros por tipo (ex.: "database is locked"); --saida grava em JSON.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from argparse import Namespace
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import carga  # noqa: E402
+
+OPERACOES = ('avaliar', 'novo', 'ler')
+
+
+def _executar(operacao, cliente, aleatorio, args):
+    if operacao == 'avaliar':
+        nota = aleatorio.randint(1, 5)
+        return cliente.post(f'/produtos/{aleatorio.randint(1, args.produtos)}/avaliar', data={'nota': nota})
+    if operacao == 'novo':
+        return cliente.post('/produtos/novo', data={'nome': f'Produto concorrente {aleatorio.random():.6f}',
+                                                    'preco': '10,00', 'tipo': 'venda', 'descricao': 'benchmark'})
+    return cliente.get('/home')
+
+
+def processo(indice, args, barreira, fila):
+    """Um "worker": app próprio, `args.threads` threads escrevendo até o fim do tempo"""
+    from flask import got_request_exception
+    from app import create_app
+
+    app = create_app()
+    app.logger.disabled = True  # os erros são contados abaixo, sem traceback no terminal
+    logging.getLogger('werkzeug').disabled = True
+    erros = {}
+    erros_lock = threading.Lock()
+
+    def registrar_erro(sender, exception, **kwargs):
+        chave = f"{type(exception).__name__}: {str(exception).splitlines()[0][:80]}"
+        with erros_lock:
+            erros[chave] = erros.get(chave, 0) + 1
+
+    got_request_exception.connect(registrar_erro, app)
+    pesos = [args.mistura[op] for op in OPERACOES]
+    amostras = []
+    amostras_lock = threading.Lock()
+
+    def thread(n):
+        aleatorio = random.Random(indice * 1000 + n)
+        cliente = app.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao['usuario_logado'] = True
+            sessao['matricula'] = carga._matricula((indice * args.threads + n) % args.usuarios)
+        locais = []
+        barreira.wait(timeout=300)
+        fim = time.monotonic() + args.segundos
+        while time.monotonic() < fim:
+            operacao = aleatorio.choices(OPERACOES, pesos)[0]
+            inicio = time.perf_counter()
+            resposta = _executar(operacao, cliente, aleatorio, args)
+            locais.append((operacao, resposta.status_code, time.perf_counter() - inicio))
+        with amostras_lock:
+            amostras.extend(locais)
+
+    threads = [threading.Thread(target=thread, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    fila.put((amostras, erros))
+
+
+def _mistura(valor):
+    """'avaliar=5,novo=1,ler=4' -> pesos por operação"""
+    pesos = dict.fromkeys(OPERACOES, 0)
+    for parte in valor.split(','):
+        nome, _, peso = parte.partition('=')
+        if nome not in pesos:
+            raise argparse.ArgumentTypeError(f"operação desconhecida: {nome} (use {', '.join(OPERACOES)})")
+        pesos[nome] = float(peso)
+    return pesos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processos', type=int, default=4, help='processos (workers do gunicorn)')
+    parser.add_argument('--threads', type=int, default=4, help='threads por processo')
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--mistura', type=_mistura, default='avaliar=5,novo=1,ler=4',
+                        help='pesos das operações (padrão avaliar=5,novo=1,ler=4)')
+    parser.add_argument('--produtos', type=int, default=2000)
+    parser.add_argument('--usuarios', type=int, default=500)
+    parser.add_argument('--sem-pragmas', action='store_true', help='SQLite sem WAL/busy_timeout/mmap')
+    parser.add_argument('--saida', help='arquivo JSON do resultado')
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='escrita_')
+    url = 'sqlite:///' + os.path.join(pasta, 'escrita.db')
+    # Lidos pelo config.py deste processo e dos processos filhos
+    os.environ['DATABASE_URL'] = url
+    os.environ['SQLITE_PRAGMAS'] = '0' if args.sem_pragmas else '1'
+    os.environ.setdefault('FOTOS_PERFIL_DIR', os.path.join(pasta, 'perfis'))
+    from app import create_app
+    from models import db
+    from sqlalchemy import text
+
+    app = create_app()
+    carga.preparar_banco(app, Namespace(recriar=False, usuarios=args.usuarios, produtos=args.produtos, avaliacoes=2))
+    with app.app_context():
+        modo = db.session.execute(text("PRAGMA journal_mode")).scalar()
+        db.engine.dispose()
+
+    contexto = multiprocessing.get_context('spawn')
+    barreira = contexto.Barrier(args.processos * args.threads)
+    fila = contexto.Queue()
+    processos = [contexto.Process(target=processo, args=(i, args, barreira, fila)) for i in range(args.processos)]
+    for p in processos:
+        p.start()
+    amostras, erros = [], {}
+    for _ in processos:
+        parcial, erros_parcial = fila.get()
+        amostras += parcial
+        for chave, n in erros_parcial.items():
+            erros[chave] = erros.get(chave, 0) + n
+    for p in processos:
+        p.join()
+    shutil.rmtree(pasta, ignore_errors=True)
+
+    escritas = sorted(d * 1000 for op, status, d in amostras if op != 'ler' and status < 500)
+    relatorio = {
+        'sqlite_pragmas': not args.sem_pragmas,
+        'journal_mode': modo,
+        'processos': args.processos,
+        'threads': args.threads,
+        'segundos': args.segundos,
+        'mistura': args.mistura,
+        'escritas_ok': len(escritas),
+        'escritas_por_s': round(len(escritas) / args.segundos, 1),
+        'leituras_por_s': round(sum(1 for op, status, _ in amostras if op == 'ler' and status < 500) / args.segundos, 1),
+        'p50_ms': round(carga.percentil(escritas, 50), 1) if escritas else None,
+        'p95_ms': round(carga.percentil(escritas, 95), 1) if escritas else None,
+        'p99_ms': round(carga.percentil(escritas, 99), 1) if escritas else None,
+        'falhas': sum(1 for _, status, _ in amostras if status >= 500),
+        'erros': erros,
+    }
+    print(f"SQLite journal_mode={modo}; {args.processos} processos x {args.threads} threads, {args.segundos:g}s")
+    print(f"escritas {relatorio['escritas_por_s']}/s  leituras {relatorio['leituras_por_s']}/s  "
+          f"p50 {relatorio['p50_ms']} ms  p95 {relatorio['p95_ms']} ms  p99 {relatorio['p99_ms']} ms  "
+          f"falhas {relatorio['falhas']}")
+    for erro, n in sorted(erros.items(), key=lambda item: -item[1]):
+        print(f"  {n:>6}  {erro}")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"Resultado gravado em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Microbenchmark do hash de senhas: logins por segundo por núcleo.
+
+Uso (na raiz do projeto):
+    python benchmarks/hash_senhas.py [--metodos scrypt:32768:8:1 pbkdf2:sha256:600000] [--n 20]
+
+Para cada método mede a verificação na própria thread (1 núcleo) e através do
+pool de senhas.py com HASH_WORKERS processos, o que mostra quanto CPU um login
+custa e quantos logins simultâneos o servidor aguenta antes de recusar (503).
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash, check_password_hash  # noqa: E402
+from config import Config  # noqa: E402
+import senhas  # noqa: E402
+
+
+def medir_sequencial(senha_hash, n):
+    inicio = time.perf_counter()
+    for _ in range(n):
+        check_password_hash(senha_hash, 'senha-de-teste')
+    return n / (time.perf_counter() - inicio)
+
+
+def medir_pool(senha_hash, n):
+    senhas.verificar_senha(senha_hash, 'senha-de-teste')  # aquece os processos
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=Config.HASH_FILA_MAX) as clientes:
+        list(clientes.map(lambda _: senhas.verificar_senha(senha_hash, 'senha-de-teste'), range(n)))
+    return n / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--metodos', nargs='+',
+                        default=[Config.PASSWORD_HASH_METHOD, 'scrypt:16384:8:1', 'pbkdf2:sha256:600000'])
+    parser.add_argument('--n', type=int, default=20, help='verificações por medição')
+    args = parser.parse_args()
+
+    print(f"HASH_WORKERS={Config.HASH_WORKERS} HASH_FILA_MAX={Config.HASH_FILA_MAX} núcleos={os.cpu_count()}")
+    print(f"{'método':<26}{'ms/login':>10}{'logins/s/núcleo':>18}{'logins/s (pool)':>18}")
+    for metodo in args.metodos:
+        senha_hash = generate_password_hash('senha-de-teste', method=metodo)
+        por_nucleo = medir_sequencial(senha_hash, args.n)
+        pool = medir_pool(senha_hash, args.n) if Config.HASH_WORKERS > 0 else por_nucleo
+        print(f"{metodo:<26}{1000 / por_nucleo:>10.1f}{por_nucleo:>18.1f}{pool:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
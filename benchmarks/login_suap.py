@@ -0,0 +1,157 @@
+"""Teste de carga do primeiro login com SUAP, contra o SUAP falso (suap_falso.py).
+
+Uso (na raiz do projeto):
+    python benchmarks/login_suap.py [--logins 200] [--clientes 16] [--latencia 80 --latencia-p99 800]
+                                    [--taxa-5xx 0.05] [--taxa-timeout 0.02 --duracao-timeout 15]
+    python benchmarks/login_suap.py --suap http://localhost:8001   # SUAP falso já rodando
+
+Sem --suap, sobe o SUAP falso em uma thread, com as opções de latência/falhas dadas.
+--fluxo rota (padrão) faz POST /login e consulta /login/status até o resultado, como
+o navegador; --fluxo direto chama utils.autenticar_suap. Cada login usa uma matrícula
+nova, então todos passam pelo SUAP. Mostra p50/p95/p99 do login completo, logins/s,
+quantos terminaram em cada resultado e os contadores do SUAP falso; --saida grava em JSON.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import suap_falso  # noqa: E402
+
+
+def percentil(ordenados, p):
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)] if ordenados else None
+
+
+def subir_suap_falso(args):
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class SemLog(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app = suap_falso.criar_app(args.semente, senha=args.senha, latencia=args.latencia,
+                               latencia_p99=args.latencia_p99, taxa_401=args.taxa_401,
+                               taxa_404=args.taxa_404, taxa_5xx=args.taxa_5xx,
+                               taxa_timeout=args.taxa_timeout, duracao_timeout=args.duracao_timeout,
+                               desativados=args.desativar)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True, request_handler=SemLog)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f'http://127.0.0.1:{servidor.server_port}'
+
+
+def login_rota(app, matricula, senha, limite):
+    """POST /login + consultas a /login/status; retorna o resultado final ('ok' ou a mensagem de erro)"""
+    cliente = app.test_client()
+    resposta = cliente.post('/login', data={'matricula': matricula, 'senha': senha})
+    if resposta.status_code != 200 or b'pendente' not in resposta.data:
+        return f'HTTP {resposta.status_code} no POST /login'
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        status = cliente.get('/login/status').get_json()
+        if status['status'] == 'ok':
+            return 'ok'
+        if status['status'] != 'pendente':
+            return status.get('erro') or status['status']
+        time.sleep(0.02)
+    return 'sem resultado dentro do limite'
+
+
+def login_direto(app, matricula, senha, limite):
+    from utils import autenticar_suap
+    with app.app_context():
+        resultado = autenticar_suap(matricula, senha)
+    return 'ok' if resultado.get('sucesso') else resultado.get('erro')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--clientes', type=int, default=16, help='logins simultâneos')
+    parser.add_argument('--fluxo', choices=('rota', 'direto'), default='rota')
+    parser.add_argument('--suap', help='URL de um SUAP falso já rodando (senão sobe um aqui)')
+    parser.add_argument('--senha', default=suap_falso.PADRAO['senha'])
+    parser.add_argument('--latencia', type=float, default=0, help='latência mediana do SUAP (ms)')
+    parser.add_argument('--latencia-p99', type=float, default=0, help='latência p99 do SUAP (ms)')
+    parser.add_argument('--taxa-401', type=float, default=0)
+    parser.add_argument('--taxa-404', type=float, default=0)
+    parser.add_argument('--taxa-5xx', type=float, default=0)
+    parser.add_argument('--taxa-timeout', type=float, default=0)
+    parser.add_argument('--duracao-timeout', type=float, default=30)
+    parser.add_argument('--desativar', nargs='*', default=[], choices=suap_falso.ENDPOINTS_DADOS)
+    parser.add_argument('--semente', type=int, default=1)
+    parser.add_argument('--limite', type=float, default=120, help='segundos máximos por login')
+    parser.add_argument('--saida', help='arquivo JSON do resultado')
+    args = parser.parse_args()
+
+    servidor = None
+    if args.suap:
+        base_url = args.suap.rstrip('/')
+    else:
+        servidor, base_url = subir_suap_falso(args)
+    # O cliente do SUAP lê a URL base ao importar utils: definir antes de criar o app
+    os.environ['SUAP_API_BASE_URL'] = base_url
+    pasta = tempfile.mkdtemp(prefix='login_suap_')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(pasta, 'login.db'))
+    os.environ.setdefault('FOTOS_PERFIL_DIR', os.path.join(pasta, 'perfis'))
+    from app import create_app
+    from migracoes import aplicar_migracoes
+
+    app = create_app()
+    with app.app_context():
+        aplicar_migracoes()
+    fazer_login = login_rota if args.fluxo == 'rota' else login_direto
+    prefixo = f'{int(time.time()) % 100000:05d}'
+
+    def um(i):
+        inicio = time.perf_counter()
+        resultado = fazer_login(app, f'{prefixo}{i:07d}', args.senha, args.limite)
+        return time.perf_counter() - inicio, resultado
+
+    print(f"SUAP em {base_url}; {args.logins} logins, {args.clientes} simultâneos, fluxo {args.fluxo}")
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clientes) as clientes:
+        amostras = list(clientes.map(um, range(args.logins)))
+    total = time.perf_counter() - inicio
+
+    duracoes = sorted(d * 1000 for d, _ in amostras)
+    resultados = {}
+    for _, resultado in amostras:
+        resultados[resultado] = resultados.get(resultado, 0) + 1
+    relatorio = {
+        'suap': base_url,
+        'fluxo': args.fluxo,
+        'logins': args.logins,
+        'clientes': args.clientes,
+        'p50_ms': round(percentil(duracoes, 50), 1),
+        'p95_ms': round(percentil(duracoes, 95), 1),
+        'p99_ms': round(percentil(duracoes, 99), 1),
+        'max_ms': round(duracoes[-1], 1),
+        'logins_por_s': round(args.logins / total, 2),
+        'resultados': resultados,
+        'suap_falso': dict(servidor.app.extensions['suap_falso'].estatisticas) if servidor else None,
+    }
+    print(f"p50 {relatorio['p50_ms']} ms  p95 {relatorio['p95_ms']} ms  p99 {relatorio['p99_ms']} ms  "
+          f"máx {relatorio['max_ms']} ms  {relatorio['logins_por_s']} logins/s")
+    for resultado, n in sorted(resultados.items(), key=lambda item: -item[1]):
+        print(f"  {n:>6}  {resultado}")
+    if relatorio['suap_falso']:
+        print(f"SUAP falso: {relatorio['suap_falso']}")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"Resultado gravado em {args.saida}")
+    if servidor:
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Gera a versão de produção dos arquivos estáticos.
+
+Para cada arquivo em static/ cria static/dist/<nome>.<hash>.<ext> (hash do conteúdo),
+com variantes .gz e .br para os formatos de texto, e grava static/dist/manifest.json.
+Com o manifesto presente, url_for('static', ...) passa a apontar para os nomes com
+hash, servidos com cache imutável (veja estaticos.py).
+
+Uso: python build_estaticos.py   (no Dockerfile roda durante o build da imagem)
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:  # Brotli é opcional: sem ele, só as variantes .gz são geradas
+    brotli = None
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+ESTATICOS = os.path.join(RAIZ, 'static')
+DESTINO = os.path.join(ESTATICOS, 'dist')
+MANIFESTO = 'manifest.json'
+
+# Formatos que valem a pena comprimir (imagens já comprimidas ficam de fora)
+COMPRIMIVEIS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml', '.ico'}
+
+
+def _hash(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(65536), b''):
+            h.update(bloco)
+    return h.hexdigest()[:12]
+
+
+def _arquivos():
+    for pasta, subpastas, arquivos in os.walk(ESTATICOS):
+        if os.path.abspath(pasta) == DESTINO:
+            subpastas[:] = []
+            continue
+        subpastas[:] = [s for s in subpastas if os.path.join(pasta, s) != DESTINO]
+        for nome in sorted(arquivos):
+            yield os.path.relpath(os.path.join(pasta, nome), ESTATICOS).replace(os.sep, '/')
+
+
+def _comprimir(caminho):
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    with open(caminho + '.gz', 'wb') as f:
+        # mtime=0: mesmo conteúdo gera o mesmo .gz em todo build
+        with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=9, mtime=0) as gz:
+            gz.write(dados)
+    if brotli is not None:
+        with open(caminho + '.br', 'wb') as f:
+            f.write(brotli.compress(dados, quality=11))
+
+
+def construir():
+    if os.path.isdir(DESTINO):
+        shutil.rmtree(DESTINO)
+    os.makedirs(DESTINO)
+
+    manifesto = {}
+    for relativo in _arquivos():
+        origem = os.path.join(ESTATICOS, relativo)
+        base, ext = os.path.splitext(relativo)
+        com_hash = f"{base}.{_hash(origem)}{ext}"
+        destino = os.path.join(DESTINO, com_hash)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        shutil.copyfile(origem, destino)
+        if ext.lower() in COMPRIMIVEIS:
+            _comprimir(destino)
+        manifesto[relativo] = com_hash
+        print(f"  {relativo} -> dist/{com_hash}")
+
+    with open(os.path.join(DESTINO, MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False, sort_keys=True)
+    if brotli is None:
+        print("Aviso: pacote 'brotli' não instalado; apenas variantes .gz foram geradas.")
+    print(f"{len(manifesto)} arquivos estáticos gerados em static/dist/")
+    return manifesto
+
+
+if __name__ == '__main__':
+    construir()
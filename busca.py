@@ -0,0 +1,126 @@
+"""Busca textual de produtos (nome/descrição).
+
+SQLite: tabela FTS5 `produto_fts` (rowid = produto.id), sincronizada pelas rotas.
+MySQL: índice FULLTEXT em produto(nome, descricao), mantido pelo próprio banco.
+"""
+import re
+from sqlalchemy import bindparam, text
+from config import Config
+from models import db, Produto
+
+FTS_TABELA = 'produto_fts'
+FULLTEXT_INDICE = 'ft_produto_nome_descricao'
+MAX_TERMOS = 10
+
+
+def _dialeto(conn=None):
+    return (conn or db.session.get_bind()).dialect.name
+
+
+def extrair_termos(consulta):
+    """Quebra a consulta em palavras (descarta operadores/aspas do usuário)"""
+    return re.findall(r'\w+', consulta or '', re.UNICODE)[:MAX_TERMOS]
+
+
+def criar_indice(conn):
+    """Cria a estrutura de busca do dialeto e indexa os produtos existentes (usado na migração)"""
+    dialeto = _dialeto(conn)
+    if dialeto == 'sqlite':
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABELA} USING fts5("
+            "nome, descricao, tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(f"DELETE FROM {FTS_TABELA}"))
+        conn.execute(text(
+            f"INSERT INTO {FTS_TABELA} (rowid, nome, descricao) "
+            "SELECT id, nome, COALESCE(descricao, '') FROM produto"
+        ))
+    elif dialeto == 'mysql':
+        existe = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'produto' AND index_name = :nome"
+        ), {'nome': FULLTEXT_INDICE}).scalar()
+        if not existe:
+            conn.execute(text(f"CREATE FULLTEXT INDEX {FULLTEXT_INDICE} ON produto (nome, descricao)"))
+
+
+def indexar_produto(produto):
+    """Insere/atualiza o produto no índice FTS5 (na transação corrente; no MySQL é automático)"""
+    if _dialeto() != 'sqlite':
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABELA} WHERE rowid = :id"), {'id': produto.id})
+    db.session.execute(
+        text(f"INSERT INTO {FTS_TABELA} (rowid, nome, descricao) VALUES (:id, :nome, :descricao)"),
+        {'id': produto.id, 'nome': produto.nome, 'descricao': produto.descricao or ''}
+    )
+
+
+def indexar_ids(ids):
+    """Indexa de uma vez os produtos recém-inseridos com esses ids (importação em massa)"""
+    if _dialeto() != 'sqlite' or not ids:
+        return
+    db.session.execute(
+        text(f"INSERT INTO {FTS_TABELA} (rowid, nome, descricao) "
+             "SELECT id, nome, COALESCE(descricao, '') FROM produto WHERE id IN :ids"
+             ).bindparams(bindparam('ids', expanding=True)),
+        {'ids': list(ids)}
+    )
+
+
+def remover_produto(produto_id):
+    """Remove o produto do índice FTS5 (na transação corrente)"""
+    if _dialeto() != 'sqlite':
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABELA} WHERE rowid = :id"), {'id': produto_id})
+
+
+def buscar_produtos(consulta, tipo=None, pagina=1, limite=None):
+    """Busca produtos disponíveis por relevância.
+
+    Retorna (produtos, tem_mais). Apenas a página pedida é carregada.
+    """
+    termos = extrair_termos(consulta)
+    if not termos:
+        return [], False
+    limite = max(1, min(limite or Config.PRODUTOS_POR_PAGINA, Config.PRODUTOS_POR_PAGINA_MAX))
+    pagina = max(1, pagina or 1)
+    params = {'limite': limite + 1, 'offset': (pagina - 1) * limite}
+    filtro_tipo = ''
+    if tipo:
+        filtro_tipo = ' AND p.tipo = :tipo'
+        params['tipo'] = tipo
+
+    dialeto = _dialeto()
+    if dialeto == 'sqlite':
+        # Prefixo em cada termo ("cade"* encontra "cadeira"); nome pesa mais que descrição
+        params['q'] = ' OR '.join(f'"{t}"*' for t in termos)
+        sql = (
+            f"SELECT p.id FROM {FTS_TABELA} f JOIN produto p ON p.id = f.rowid "
+            f"WHERE {FTS_TABELA} MATCH :q AND p.status = 'disponivel'{filtro_tipo} "
+            f"ORDER BY bm25({FTS_TABELA}, 10.0, 1.0) LIMIT :limite OFFSET :offset"
+        )
+    elif dialeto == 'mysql':
+        params['q'] = ' '.join(f'{t}*' for t in termos)
+        sql = (
+            "SELECT p.id FROM produto p "
+            "WHERE MATCH(p.nome, p.descricao) AGAINST (:q IN BOOLEAN MODE) "
+            f"AND p.status = 'disponivel'{filtro_tipo} "
+            "ORDER BY MATCH(p.nome, p.descricao) AGAINST (:q IN BOOLEAN MODE) DESC "
+            "LIMIT :limite OFFSET :offset"
+        )
+    else:
+        # Dialeto sem busca textual configurada: LIKE apenas como último recurso
+        params['q'] = f"%{' '.join(termos)}%"
+        sql = (
+            "SELECT p.id FROM produto p WHERE (p.nome LIKE :q OR p.descricao LIKE :q) "
+            f"AND p.status = 'disponivel'{filtro_tipo} "
+            "ORDER BY p.created_at DESC LIMIT :limite OFFSET :offset"
+        )
+
+    ids = [row[0] for row in db.session.execute(text(sql), params)]
+    tem_mais = len(ids) > limite
+    ids = ids[:limite]
+    if not ids:
+        return [], False
+    por_id = {p.id: p for p in Produto.query.filter(Produto.id.in_(ids)).all()}
+    return [por_id[i] for i in ids if i in por_id], tem_mais
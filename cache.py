@@ -0,0 +1,75 @@
+"""Caches em memória do processo (cada worker do gunicorn tem o seu)."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Dicionário thread-safe cujas entradas expiram após `ttl` segundos"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._dados = {}
+        self._lock = threading.Lock()
+
+    def get(self, chave, padrao=None):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return padrao
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return padrao
+            return valor
+
+    def set(self, chave, valor, ttl=None):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+
+    def delete(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def obter_ou_calcular(self, chave, calcular):
+        """Retorna o valor em cache ou calcula, guarda e retorna"""
+        ausente = object()
+        valor = self.get(chave, ausente)
+        if valor is ausente:
+            valor = calcular()
+            self.set(chave, valor)
+        return valor
+
+
+class LRUCache:
+    """Dicionário thread-safe limitado a `max_itens`; descarta o usado há mais tempo"""
+
+    def __init__(self, max_itens):
+        self.max_itens = max_itens
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave, padrao=None):
+        with self._lock:
+            if chave not in self._dados:
+                return padrao
+            self._dados.move_to_end(chave)
+            return self._dados[chave]
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self):
+        return len(self._dados)
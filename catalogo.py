@@ -0,0 +1,229 @@
+"""Exportação e importação em massa do catálogo de produtos (CSV ou JSONL).
+
+A exportação lê o banco em lotes (yield_per) e gera o arquivo aos pedaços, com
+memória constante. A importação valida cada linha e insere em lotes com um único
+INSERT executemany por lote; por padrão é tudo ou nada (uma linha inválida
+desfaz a importação inteira).
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from sqlalchemy import insert
+from models import db, Produto
+import busca
+import fotos
+from utils import invalidar_estatisticas
+
+FORMATOS = ('csv', 'jsonl')
+TIPOS_CONTEUDO = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson; charset=utf-8'}
+# Avaliações não entram: os agregados são derivados da tabela avaliacao
+CAMPOS = ('id', 'nome', 'preco', 'descricao', 'usuario_matricula', 'usuario_nome', 'tipo', 'status',
+          'endereco', 'latitude', 'longitude', 'foto', 'created_at', 'updated_at')
+TIPOS = ('venda', 'troca', 'doacao')
+STATUS = ('disponivel', 'vendido', 'trocado', 'reservado')
+LOTE = 1000
+MAX_ERROS = 50
+
+
+class ImportacaoInvalida(Exception):
+    """Linhas inválidas em importação tudo ou nada; `erros` traz (linha, mensagem)"""
+
+    def __init__(self, erros, total_erros):
+        super().__init__(f'{total_erros} linha(s) inválida(s)')
+        self.erros = erros
+        self.total_erros = total_erros
+
+
+# --- Exportação ---
+
+def _valor_exportado(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def exportar(formato='csv', lote=LOTE):
+    """Gera o arquivo em pedaços de texto (um por lote de `lote` produtos)"""
+    colunas = [getattr(Produto, c) for c in CAMPOS]
+    linhas = db.session.query(*colunas).order_by(Produto.id).execution_options(yield_per=lote)
+
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n') if formato == 'csv' else None
+    if escritor:
+        escritor.writerow(CAMPOS)
+    pendentes = 0
+    for linha in linhas:
+        valores = [_valor_exportado(v) for v in linha]
+        if escritor:
+            escritor.writerow(['' if v is None else v for v in valores])
+        else:
+            buffer.write(json.dumps(dict(zip(CAMPOS, valores)), ensure_ascii=False))
+            buffer.write('\n')
+        pendentes += 1
+        if pendentes >= lote:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendentes = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# --- Importação ---
+
+def _texto(valor, maximo, campo, obrigatorio=False):
+    valor = '' if valor is None else str(valor).strip()
+    if not valor:
+        if obrigatorio:
+            raise ValueError(f'{campo} é obrigatório')
+        return None
+    if len(valor) > maximo:
+        raise ValueError(f'{campo} passa de {maximo} caracteres')
+    return valor
+
+
+def _numero(valor, campo, minimo=None, maximo=None):
+    if valor is None or str(valor).strip() == '':
+        return None
+    try:
+        numero = float(str(valor).replace(',', '.'))
+    except ValueError:
+        raise ValueError(f'{campo} inválido: {valor!r}')
+    if not math.isfinite(numero) or (minimo is not None and numero < minimo) or (maximo is not None and numero > maximo):
+        raise ValueError(f'{campo} fora do intervalo: {valor!r}')
+    return numero
+
+
+def _foto(valor):
+    nome = _texto(valor, 80, 'foto')
+    if nome is not None and not fotos.NOME_VALIDO.match(nome):
+        raise ValueError(f'foto inválida (use o nome <sha256>.<ext> de FOTOS_DIR): {valor!r}')
+    return nome
+
+
+def _data(valor, campo):
+    if valor is None or str(valor).strip() == '':
+        return None
+    try:
+        return datetime.fromisoformat(str(valor).strip())
+    except ValueError:
+        raise ValueError(f'{campo} inválido (use ISO 8601): {valor!r}')
+
+
+def validar_linha(dados):
+    """Converte uma linha do arquivo no dicionário de colunas de Produto (ValueError se inválida).
+
+    O id do arquivo é ignorado: os produtos ganham ids novos no banco de destino.
+    """
+    tipo = (_texto(dados.get('tipo'), 20, 'tipo') or 'venda').lower()
+    if tipo not in TIPOS:
+        raise ValueError(f'tipo inválido: {tipo!r}')
+    status = (_texto(dados.get('status'), 20, 'status') or 'disponivel').lower()
+    if status not in STATUS:
+        raise ValueError(f'status inválido: {status!r}')
+    preco = _numero(dados.get('preco'), 'preco', minimo=0)
+    if preco is None:
+        if tipo == 'venda':
+            raise ValueError('preco é obrigatório para produtos à venda')
+        preco = 0.0
+    latitude = _numero(dados.get('latitude'), 'latitude', -90, 90)
+    longitude = _numero(dados.get('longitude'), 'longitude', -180, 180)
+    if (latitude is None) != (longitude is None):
+        raise ValueError('latitude e longitude devem vir juntas')
+
+    produto = {
+        'nome': _texto(dados.get('nome'), 100, 'nome', obrigatorio=True),
+        'preco': preco,
+        'descricao': _texto(dados.get('descricao'), 500, 'descricao'),
+        'usuario_matricula': _texto(dados.get('usuario_matricula'), 20, 'usuario_matricula'),
+        'usuario_nome': _texto(dados.get('usuario_nome'), 150, 'usuario_nome'),
+        'tipo': tipo,
+        'status': status,
+        'endereco': _texto(dados.get('endereco'), 200, 'endereco'),
+        'latitude': latitude,
+        'longitude': longitude,
+        'foto': _foto(dados.get('foto')),
+    }
+    # Datas ausentes ficam com o padrão do banco (agora)
+    for campo in ('created_at', 'updated_at'):
+        data = _data(dados.get(campo), campo)
+        if data is not None:
+            produto[campo] = data
+    return produto
+
+
+def ler_linhas(arquivo_texto, formato):
+    """Itera (número da linha, dict) de um arquivo texto CSV (com cabeçalho) ou JSONL"""
+    if formato == 'csv':
+        leitor = csv.DictReader(arquivo_texto)
+        for dados in leitor:
+            yield leitor.line_num, dados
+    else:
+        for numero, linha in enumerate(arquivo_texto, start=1):
+            if not linha.strip():
+                continue
+            try:
+                dados = json.loads(linha)
+            except ValueError as e:
+                yield numero, e
+                continue
+            yield numero, dados if isinstance(dados, dict) else ValueError('linha não é um objeto JSON')
+
+
+def _inserir(lote):
+    # Todas as linhas do lote precisam das mesmas chaves para um único executemany
+    chaves = set().union(*(p.keys() for p in lote))
+    for produto in lote:
+        for chave in chaves:
+            produto.setdefault(chave, None)
+    if not db.session.get_bind().dialect.insert_executemany_returning:
+        db.session.execute(insert(Produto), lote)  # MySQL: o FULLTEXT se atualiza sozinho
+        return
+    # Indexa exatamente os ids inseridos: um cadastro concorrente pode ganhar um id
+    # no meio da faixa da importação e já estar no índice
+    ids = db.session.execute(insert(Produto).returning(Produto.id), lote).scalars().all()
+    busca.indexar_ids(ids)
+
+
+def importar(arquivo_texto, formato='csv', ignorar_invalidos=False, lote=LOTE):
+    """Importa produtos de um arquivo texto aberto.
+
+    Retorna {'importados', 'invalidos', 'erros'}. Sem `ignorar_invalidos`, qualquer
+    linha inválida desfaz tudo e lança ImportacaoInvalida.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f'formato deve ser um de {FORMATOS}')
+    importados = 0
+    total_erros = 0
+    erros = []
+    pendentes = []
+    try:
+        for numero, dados in ler_linhas(arquivo_texto, formato):
+            try:
+                if isinstance(dados, Exception):
+                    raise ValueError(str(dados))
+                pendentes.append(validar_linha(dados))
+            except ValueError as e:
+                total_erros += 1
+                if len(erros) < MAX_ERROS:
+                    erros.append((numero, str(e)))
+                continue
+            # Tudo ou nada: depois do primeiro erro só continua validando, sem inserir
+            if len(pendentes) >= lote:
+                if not total_erros or ignorar_invalidos:
+                    _inserir(pendentes)
+                    importados += len(pendentes)
+                pendentes = []
+        if total_erros and not ignorar_invalidos:
+            raise ImportacaoInvalida(erros, total_erros)
+        if pendentes:
+            _inserir(pendentes)
+            importados += len(pendentes)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    invalidar_estatisticas()
+    return {'importados': importados, 'invalidos': total_erros, 'erros': erros}
@@ -0,0 +1,68 @@
+"""GET condicional (ETag / Last-Modified) para as listagens de produtos.
+
+O validador é a versão global do catálogo (tabela catalogo_versao, lida pela chave
+primária): ela sobe em toda transação que altera produtos ou avaliações, então o
+custo não cresce com o número de produtos. Se o navegador já tem a versão atual, a
+rota responde 304 antes de paginar e renderizar o template.
+"""
+import hashlib
+import os
+from flask import request, session, make_response
+from werkzeug.http import is_resource_modified
+from models import db, CatalogoVersao
+from utils import is_admin_user
+
+_versao_app = None
+
+
+def versao_app():
+    """Identifica a versão de templates/estáticos em disco (muda a cada deploy)"""
+    global _versao_app
+    if _versao_app is None:
+        raiz = os.path.dirname(os.path.abspath(__file__))
+        h = hashlib.sha1()
+        for pasta in ('templates', 'static'):
+            for caminho, _, arquivos in sorted(os.walk(os.path.join(raiz, pasta))):
+                for nome in sorted(arquivos):
+                    completo = os.path.join(caminho, nome)
+                    h.update(f"{completo}:{os.path.getmtime(completo)}".encode('utf-8'))
+        _versao_app = h.hexdigest()[:12]
+    return _versao_app
+
+
+class Validador:
+    """Validador de uma listagem de produtos.
+
+    Uso na rota:
+        validador = Validador()
+        if not validador.modificado():
+            return validador.nao_modificado()
+        ...
+        return validador.aplicar(render_template(...))
+    """
+
+    def __init__(self):
+        versao, ultima = db.session.query(CatalogoVersao.versao, CatalogoVersao.atualizado_em).filter(
+            CatalogoVersao.id == 1).first() or (0, None)
+        self.ultima_modificacao = ultima
+        # A página muda também com o usuário logado (menus, botões de admin)
+        partes = [versao_app(), session.get('matricula') or '', int(is_admin_user()), versao]
+        self.etag = hashlib.sha1('|'.join(map(str, partes)).encode('utf-8')).hexdigest()[:20]
+
+    def modificado(self):
+        # If-None-Match tem precedência; If-Modified-Since só vale sem ETag do cliente
+        return is_resource_modified(request.environ, etag=self.etag, last_modified=self.ultima_modificacao)
+
+    def nao_modificado(self):
+        return self.aplicar(make_response('', 304))
+
+    def aplicar(self, resposta):
+        resposta = make_response(resposta)
+        resposta.set_etag(self.etag, weak=True)
+        if self.ultima_modificacao:
+            resposta.last_modified = self.ultima_modificacao
+        # Conteúdo por usuário: o navegador guarda, mas sempre revalida
+        resposta.cache_control.private = True
+        resposta.cache_control.no_cache = True
+        resposta.vary.add('Cookie')
+        return resposta
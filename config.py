@@ -21,13 +21,124 @@ class Config:
         SQLALCHEMY_DATABASE_URI = (
             f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}"
         )
+    # URL completa do banco (ex.: bancos de benchmark); tem prioridade sobre as opções acima
+    if os.environ.get('DATABASE_URL'):
+        SQLALCHEMY_DATABASE_URI = os.environ['DATABASE_URL']
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Pool de conexões por worker: tamanho + excedente acima das threads do gunicorn;
+    # pre-ping e reciclagem descartam conexões derrubadas pelo wait_timeout do MySQL
+    DB_POOL_TAMANHO = int(os.environ.get('DB_POOL_TAMANHO', 10))
+    DB_POOL_EXCEDENTE = int(os.environ.get('DB_POOL_EXCEDENTE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # espera por conexão livre (s)
+    DB_POOL_RECICLAR = int(os.environ.get('DB_POOL_RECICLAR', 1800))  # idade máxima da conexão (s)
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes')
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': DB_POOL_PRE_PING, 'pool_recycle': DB_POOL_RECICLAR}
+    # SQLite em memória usa um pool de conexão única, sem tamanho
+    if SQLALCHEMY_DATABASE_URI not in ('sqlite://', 'sqlite:///:memory:'):
+        SQLALCHEMY_ENGINE_OPTIONS.update(pool_size=DB_POOL_TAMANHO, max_overflow=DB_POOL_EXCEDENTE,
+                                         pool_timeout=DB_POOL_TIMEOUT)
+    # SQLite: WAL (leitores não bloqueiam a escrita), espera pelo lock em vez de
+    # "database is locked", synchronous=NORMAL e leitura por mmap (models.py)
+    SQLITE_PRAGMAS = os.environ.get('SQLITE_PRAGMAS', '1').lower() in ('1', 'true', 'yes')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 15000))  # ms; o padrão do driver é 5000
+    SQLITE_MMAP = int(os.environ.get('SQLITE_MMAP', 256 * 1024 * 1024))  # bytes
     
     # API SUAP
     # Base URL conforme documentação: https://suap.ifrn.edu.br/api/docs/
-    SUAP_API_BASE_URL = "https://suap.ifrn.edu.br"
+    # Para testes offline/carga, aponte para o SUAP falso (python suap_falso.py): http://localhost:8001
+    SUAP_API_BASE_URL = (os.environ.get('SUAP_API_BASE_URL') or "https://suap.ifrn.edu.br").rstrip('/')
+    # Cliente HTTP do SUAP (utils.SuapClient): timeouts em segundos, retentativas e circuit breaker
+    SUAP_TIMEOUT_CONEXAO = float(os.environ.get('SUAP_TIMEOUT_CONEXAO', 3))
+    SUAP_TIMEOUT_LEITURA = float(os.environ.get('SUAP_TIMEOUT_LEITURA', 10))
+    SUAP_TENTATIVAS = int(os.environ.get('SUAP_TENTATIVAS', 2))
+    SUAP_BACKOFF = float(os.environ.get('SUAP_BACKOFF', 0.3))
+    SUAP_POOL_TAMANHO = int(os.environ.get('SUAP_POOL_TAMANHO', 10))
+    SUAP_BREAKER_FALHAS = int(os.environ.get('SUAP_BREAKER_FALHAS', 5))
+    SUAP_BREAKER_REABERTURA = float(os.environ.get('SUAP_BREAKER_REABERTURA', 30))
+    # Validade do perfil normalizado do SUAP em cache (memória + tabela perfil_suap), em segundos
+    PERFIL_SUAP_TTL = int(os.environ.get('PERFIL_SUAP_TTL', 24 * 3600))
+    # Quanto tempo cada processo reaproveita o perfil em memória antes de reler perfil_suap.
+    # /perfil?atualizar=1 só limpa a memória do worker que atendeu: os outros podem mostrar
+    # o perfil antigo por até este tempo
+    PERFIL_MEMORIA_TTL = int(os.environ.get('PERFIL_MEMORIA_TTL', 60))
+    # Logins com SUAP rodam em segundo plano: threads por processo e máximo de logins na fila
+    SUAP_LOGIN_WORKERS = int(os.environ.get('SUAP_LOGIN_WORKERS', 8))
+    SUAP_LOGIN_FILA_MAX = int(os.environ.get('SUAP_LOGIN_FILA_MAX', 64))
+    # Segundos até um login ainda pendente virar erro em /login/status (worker reiniciado,
+    # falha ao gravar o resultado); padrão: token + perfil com todas as tentativas, mais folga
+    SUAP_LOGIN_PRAZO = float(os.environ.get('SUAP_LOGIN_PRAZO') or
+                             2 * (SUAP_TIMEOUT_CONEXAO + SUAP_TIMEOUT_LEITURA) * (SUAP_TENTATIVAS + 1) + 30)
+    # Threads para sondar em paralelo os endpoints de dados do SUAP (por processo)
+    SUAP_SONDAGEM_WORKERS = int(os.environ.get('SUAP_SONDAGEM_WORKERS', 10))
     # Matrículas iniciais de admin (configurável por env, separadas por vírgula)
     _admin_raw = os.environ.get('ADMIN_MATRICULAS', '20231041110013,20221041110028')
     ADMIN_MATRICULAS = {m.strip() for m in _admin_raw.split(',') if m.strip()}
+    # Conjunto de admins (config + is_admin no banco) em cache por processo, em segundos;
+    # vale para páginas e leituras: POST e afins sempre conferem no banco.
+    # O toggle-admin só limpa o cache do worker que o atendeu: nos outros, menus e páginas
+    # de admin seguem com a permissão antiga por até este tempo
+    ADMINS_CACHE_TTL = int(os.environ.get('ADMINS_CACHE_TTL', 30))
+
+    # Hash de senhas locais (formato do werkzeug: 'scrypt:N:r:p' ou 'pbkdf2:sha256:iteracoes').
+    # Ao mudar, as senhas são refeitas no próximo login bem-sucedido.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Processos dedicados ao hash (0 = na própria thread) e máximo de hashes aguardando vaga
+    HASH_WORKERS = int(os.environ.get('HASH_WORKERS', 2))
+    HASH_FILA_MAX = int(os.environ.get('HASH_FILA_MAX', 16))
+    HASH_ESPERA_MAX = float(os.environ.get('HASH_ESPERA_MAX', 2))
+
+    # Fotos de produtos: originais por hash do conteúdo + miniaturas geradas em segundo plano
+    FOTOS_DIR = os.environ.get('FOTOS_DIR') or join(dirname(os.path.abspath(__file__)), 'uploads', 'produtos')
+    FOTOS_TAMANHO_MAX = int(os.environ.get('FOTOS_TAMANHO_MAX', 8 * 1024 * 1024))  # bytes por foto
+    FOTOS_LARGURAS = (320, 640, 1280)  # larguras das miniaturas (srcset)
+    FOTOS_WORKERS = int(os.environ.get('FOTOS_WORKERS', 1))  # processos que geram as miniaturas
+    # Limite do corpo da requisição (foto + campos do formulário)
+    MAX_CONTENT_LENGTH = FOTOS_TAMANHO_MAX + 256 * 1024
+    # Exceção ao limite acima: arquivo CSV/JSONL da importação de produtos do admin
+    IMPORTACAO_TAMANHO_MAX = int(os.environ.get('IMPORTACAO_TAMANHO_MAX', 200 * 1024 * 1024))
+
+    # Fotos de perfil do SUAP servidas localmente (/fotos/<matricula>, ver fotos_perfil.py)
+    FOTOS_PERFIL_DIR = os.environ.get('FOTOS_PERFIL_DIR') or join(dirname(os.path.abspath(__file__)), 'uploads', 'perfis')
+    FOTOS_PERFIL_LARGURAS = (75, 150, 300)
+    FOTOS_PERFIL_TAMANHO_MAX = 2 * 1024 * 1024
+    # Função que baixa as fotos ('modulo:funcao'); vazio = cliente HTTP do SUAP
+    FOTOS_PERFIL_FETCHER = os.environ.get('FOTOS_PERFIL_FETCHER', '')
+    # Download em segundo plano, com cliente e circuit breaker próprios (sem retentativas),
+    # para não consumir o breaker do login; após uma falha, espera antes de tentar de novo
+    FOTOS_PERFIL_TIMEOUT_CONEXAO = float(os.environ.get('FOTOS_PERFIL_TIMEOUT_CONEXAO', 2))
+    FOTOS_PERFIL_TIMEOUT_LEITURA = float(os.environ.get('FOTOS_PERFIL_TIMEOUT_LEITURA', 5))
+    FOTOS_PERFIL_WORKERS = int(os.environ.get('FOTOS_PERFIL_WORKERS', 2))  # threads por processo
+    FOTOS_PERFIL_ESPERA_FALHA = int(os.environ.get('FOTOS_PERFIL_ESPERA_FALHA', 60))  # segundos
+
+    # Máximo de cards de produto renderizados guardados em memória (por worker)
+    CARDS_CACHE_MAX = int(os.environ.get('CARDS_CACHE_MAX', 5000))
+
+    # Tabelas da área admin: linhas por página e até quanto a contagem é exata
+    ADMIN_POR_PAGINA = int(os.environ.get('ADMIN_POR_PAGINA', 50))
+    ADMIN_CONTAGEM_EXATA_MAX = int(os.environ.get('ADMIN_CONTAGEM_EXATA_MAX', 10000))
+
+    # Paginação das listagens de produtos (home, venda, troca e /api/produtos)
+    PRODUTOS_POR_PAGINA = int(os.environ.get('PRODUTOS_POR_PAGINA', 24))
+    PRODUTOS_POR_PAGINA_MAX = int(os.environ.get('PRODUTOS_POR_PAGINA_MAX', 100))
+
+    # Estatísticas da página pública (/) em cache por processo, em segundos.
+    # invalidar_estatisticas só vale para o worker da escrita: com vários workers
+    # (GUNICORN_WORKERS), os outros podem mostrar números antigos por até este tempo
+    ESTATISTICAS_CACHE_TTL = int(os.environ.get('ESTATISTICAS_CACHE_TTL', 300))
+
+    # Mapa da home: a partir deste zoom os produtos vêm individualmente (abaixo, agrupados)
+    MAPA_ZOOM_DETALHE = int(os.environ.get('MAPA_ZOOM_DETALHE', 15))
+    MAPA_MAX_PONTOS = int(os.environ.get('MAPA_MAX_PONTOS', 500))
+
+    # Métricas por endpoint em /metrics (metricas.py); token opcional para o Prometheus
+    METRICAS_ATIVAS = os.environ.get('METRICAS_ATIVAS', '1').lower() in ('1', 'true', 'yes')
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+    # Requisições acima disso (ms) vão para o log com o SQL executado; 0 desliga
+    METRICAS_LENTA_MS = int(os.environ.get('METRICAS_LENTA_MS', 0))
 
+    # Detector de N+1 e de SELECT sem LIMIT (detector_consultas.py); para desenvolvimento
+    DETECTOR_CONSULTAS = os.environ.get('DETECTOR_CONSULTAS', '').lower() in ('1', 'true', 'yes')
+    DETECTOR_REPETICOES = int(os.environ.get('DETECTOR_REPETICOES', 5))  # mesma consulta por requisição
+    DETECTOR_LINHAS_MAX = int(os.environ.get('DETECTOR_LINHAS_MAX', 200))  # linhas de um SELECT sem LIMIT
@@ -0,0 +1,219 @@
+"""Detector de consultas suspeitas para desenvolvimento (DETECTOR_CONSULTAS=1).
+
+Aponta, por requisição:
+- N+1: a mesma consulta (mesmo SQL, parâmetros à parte) repetida mais de
+  DETECTOR_REPETICOES vezes, como uma consulta por produto dentro de um laço;
+- SELECT sem LIMIT que trouxe mais de DETECTOR_LINHAS_MAX linhas.
+
+Cada aviso leva a rota (método, caminho e endpoint) e o ponto do código do projeto
+que disparou a consulta (arquivo:linha, incluindo templates), e vai para o log.
+
+Nos testes, o módulo é também um plugin do pytest, que falha o teste com violações:
+
+    python -m pytest -p detector_consultas         # fixture detector_consultas disponível
+    def test_home(client, detector_consultas): ...
+
+A fixture liga o detector mesmo sem DETECTOR_CONSULTAS e também vigia as consultas
+feitas fora de requisição na thread do teste.
+"""
+import os
+import re
+import sysconfig
+import threading
+import traceback
+from flask import g, has_request_context, request
+from flask.signals import request_tearing_down
+from sqlalchemy import Select, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+_ESTE = os.path.abspath(__file__)
+_BIBLIOTECAS = tuple({sysconfig.get_paths()[nome] for nome in ('stdlib', 'platstdlib', 'purelib', 'platlib')})
+# Listas de parâmetros de IN (?, ?, ?) / (%s, %s) viram uma só: o formato não muda com o tamanho
+_LISTA_PARAMETROS = re.compile(r'\(\s*(\?|%s|%\(\w+\)s)(\s*,\s*(\?|%s|%\(\w+\)s))*\s*\)')
+_ESPACOS = re.compile(r'\s+')
+
+_local = threading.local()
+_ouvintes = []  # funções chamadas com cada lista de violações (ex.: a fixture do pytest)
+_ativo = False
+
+
+class Violacao:
+    def __init__(self, tipo, origem, local, sql, detalhe):
+        self.tipo = tipo  # 'n+1' ou 'sem_limite'
+        self.origem = origem
+        self.local = local
+        self.sql = sql
+        self.detalhe = detalhe
+
+    def __str__(self):
+        return (f"[{self.tipo}] {self.origem}: {self.detalhe}\n"
+                f"    em {self.local}\n"
+                f"    {self.sql[:300]}")
+
+
+def _config():
+    # Importado só quando usado: como plugin (-p detector_consultas), o módulo carrega antes
+    # do conftest dos testes, que define DATABASE_URL antes de o config ser lido
+    from config import Config
+    return Config
+
+
+def formato(sql):
+    """SQL normalizado para comparar consultas que só diferem nos parâmetros"""
+    return _ESPACOS.sub(' ', _LISTA_PARAMETROS.sub('(?...)', sql)).strip()
+
+
+def _local_no_projeto():
+    """Último frame da pilha em código do projeto; sem ele (ex.: testes em outra pasta),
+    o último fora das bibliotecas"""
+    reserva = None
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        arquivo = os.path.abspath(frame.filename)
+        if arquivo == _ESTE or arquivo.startswith(_BIBLIOTECAS) or 'site-packages' in arquivo:
+            continue
+        descricao = f":{frame.lineno}" + (f" ({frame.name})" if frame.name != '<module>' else '')
+        if arquivo.startswith(RAIZ + os.sep) and f'{os.sep}venv{os.sep}' not in arquivo:
+            return os.path.relpath(arquivo, RAIZ) + descricao
+        if reserva is None and not frame.filename.startswith('<'):
+            reserva = arquivo + descricao
+    return reserva or 'origem desconhecida'
+
+
+def _rota():
+    return f"{request.method} {request.path} ({request.endpoint or 'sem rota'})"
+
+
+class _Escopo:
+    """Consultas de uma requisição (ou de um teste, fora de requisição)"""
+
+    def __init__(self, origem=None):
+        self._origem = origem
+        self.repeticoes = {}
+        self.violacoes = []
+
+    @property
+    def origem(self):
+        # Na requisição, resolvida na hora: a sessão é lida do banco antes do roteamento
+        return self._origem or _rota()
+
+    def consulta(self, sql):
+        chave = formato(sql)
+        n = self.repeticoes.get(chave, 0) + 1
+        self.repeticoes[chave] = n
+        limite = _config().DETECTOR_REPETICOES
+        # Registra uma vez, quando passa do limite: o frame é o do laço que repete
+        if n == limite + 1:
+            self.violacoes.append(Violacao('n+1', self.origem, _local_no_projeto(), chave,
+                                           f"consulta repetida mais de {limite} vezes"))
+
+    def finalizar(self):
+        for violacao in self.violacoes:
+            if violacao.tipo == 'n+1':
+                violacao.detalhe = f"consulta repetida {self.repeticoes[violacao.sql]} vezes"
+        return self.violacoes
+
+
+def _escopo_atual():
+    if has_request_context():
+        escopo = g.get('_detector_consultas')
+        if escopo is None:
+            escopo = g._detector_consultas = _Escopo()
+        return escopo
+    return getattr(_local, 'escopo', None)
+
+
+def _depois_consulta(conn, cursor, sql, parametros, contexto, executemany):
+    escopo = _escopo_atual()
+    if escopo is not None and not executemany:
+        escopo.consulta(sql)
+
+
+def _sem_limite(estado):
+    """SELECT do ORM/session sem LIMIT: conta as linhas trazidas (só em desenvolvimento)"""
+    escopo = _escopo_atual()
+    instrucao = estado.statement
+    if (escopo is None or not estado.is_select or not isinstance(instrucao, Select)
+            or instrucao._limit_clause is not None or instrucao._fetch_clause is not None
+            or estado.execution_options.get('yield_per') or estado.execution_options.get('stream_results')):
+        return None
+    # Materializa o resultado para contar e devolve uma cópia equivalente
+    congelado = estado.invoke_statement().freeze()
+    linhas = len(congelado.data)
+    limite = _config().DETECTOR_LINHAS_MAX
+    if linhas > limite:
+        sql = formato(str(instrucao.compile(dialect=estado.session.get_bind().dialect)))
+        escopo.violacoes.append(Violacao('sem_limite', escopo.origem, _local_no_projeto(), sql,
+                                         f"SELECT sem LIMIT trouxe {linhas} linhas "
+                                         f"(limite {limite})"))
+    return congelado()
+
+
+def _fim_requisicao(app, exc=None, **kwargs):
+    escopo = g.pop('_detector_consultas', None)
+    if escopo is not None:
+        _relatar(escopo.finalizar())
+
+
+def _relatar(violacoes):
+    for violacao in violacoes:
+        print(f"Consulta suspeita {violacao}")
+    if violacoes:
+        for ouvinte in list(_ouvintes):
+            ouvinte(violacoes)
+
+
+def ativar():
+    """Liga o detector para todas as engines, sessões e apps do processo"""
+    global _ativo
+    if _ativo:
+        return
+    event.listen(Engine, 'after_cursor_execute', _depois_consulta)
+    event.listen(Session, 'do_orm_execute', _sem_limite)
+    request_tearing_down.connect(_fim_requisicao)
+    _ativo = True
+
+
+def init_app(app):
+    ativar()
+
+
+class vigiar:
+    """Coleta as violações enquanto ativo, inclusive fora de requisição nesta thread.
+
+        with detector_consultas.vigiar('teste') as violacoes: ...
+    """
+
+    def __init__(self, origem='fora de requisição'):
+        self.origem = origem
+        self.violacoes = []
+
+    def __enter__(self):
+        ativar()
+        self._anterior = getattr(_local, 'escopo', None)
+        _local.escopo = _Escopo(self.origem)
+        _ouvintes.append(self.violacoes.extend)
+        return self.violacoes
+
+    def __exit__(self, *exc):
+        escopo, _local.escopo = _local.escopo, self._anterior
+        _relatar(escopo.finalizar())
+        _ouvintes.remove(self.violacoes.extend)
+        return False
+
+
+try:
+    import pytest
+except ImportError:  # pytest só é necessário para usar o módulo como plugin
+    pytest = None
+
+if pytest is not None:
+    @pytest.fixture
+    def detector_consultas(request):
+        """Falha o teste se alguma requisição (ou o próprio teste) fizer N+1 ou SELECT sem LIMIT grande"""
+        with vigiar(request.node.nodeid) as violacoes:
+            yield violacoes
+        if violacoes:
+            pytest.fail(f"{len(violacoes)} consulta(s) suspeita(s):\n" + "\n".join(map(str, violacoes)),
+                        pytrace=False)
@@ -0,0 +1,63 @@
+"""Serve os estáticos gerados por build_estaticos.py.
+
+Se static/dist/manifest.json existir, url_for('static', filename=...) é reescrito
+para o nome com hash do conteúdo. Esses arquivos nunca mudam, então saem com
+Cache-Control imutável de um ano e, quando o navegador aceita, na variante
+pré-comprimida (.br ou .gz). Sem o manifesto (desenvolvimento), nada muda.
+"""
+import json
+import mimetypes
+import os
+from flask import request, send_from_directory
+from werkzeug.exceptions import NotFound
+
+PREFIXO = 'dist/'
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+# Ordem de preferência das variantes pré-comprimidas
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def carregar_manifesto(app):
+    caminho = os.path.join(app.static_folder, PREFIXO, 'manifest.json')
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    manifesto = carregar_manifesto(app)
+    if not manifesto:
+        return
+    pasta_dist = os.path.join(app.static_folder, PREFIXO)
+    servir_padrao = app.view_functions['static']
+
+    @app.url_defaults
+    def url_com_hash(endpoint, values):
+        if endpoint == 'static':
+            nome = values.get('filename')
+            if nome in manifesto:
+                values['filename'] = PREFIXO + manifesto[nome]
+
+    def servir_estatico(filename):
+        if not filename.startswith(PREFIXO):
+            return servir_padrao(filename=filename)
+        relativo = filename[len(PREFIXO):]
+        aceitas = request.accept_encodings
+        for codificacao, sufixo in CODIFICACOES:
+            if aceitas[codificacao] and os.path.isfile(os.path.join(pasta_dist, relativo + sufixo)):
+                resposta = send_from_directory(pasta_dist, relativo + sufixo, max_age=31536000,
+                                               mimetype=mimetypes.guess_type(relativo)[0])
+                resposta.headers['Content-Encoding'] = codificacao
+                break
+        else:
+            try:
+                resposta = send_from_directory(pasta_dist, relativo, max_age=31536000)
+            except NotFound:
+                return servir_padrao(filename=filename)
+        resposta.headers['Cache-Control'] = CACHE_IMUTAVEL
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+
+    app.view_functions['static'] = servir_estatico
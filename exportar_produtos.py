@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Exporta o catálogo de produtos em CSV ou JSONL (mesmo formato de /admin/produtos/exportar).
+
+    python exportar_produtos.py produtos.csv
+    python exportar_produtos.py --formato jsonl produtos.jsonl
+    python exportar_produtos.py --formato jsonl > produtos.jsonl
+"""
+import argparse
+import io
+import sys
+from app import create_app
+import catalogo
+
+# Configura encoding para UTF-8
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+parser = argparse.ArgumentParser(description='Exporta os produtos em CSV ou JSONL.')
+parser.add_argument('saida', nargs='?', help='arquivo de saída (padrão: saída padrão)')
+parser.add_argument('--formato', choices=catalogo.FORMATOS, default=None,
+                    help='padrão: extensão do arquivo de saída, ou csv')
+args = parser.parse_args()
+formato = args.formato or (args.saida.rsplit('.', 1)[-1].lower() if args.saida else 'csv')
+if formato not in catalogo.FORMATOS:
+    formato = 'csv'
+
+app = create_app()
+
+with app.app_context():
+    saida = open(args.saida, 'w', encoding='utf-8', newline='') if args.saida else sys.stdout
+    try:
+        for pedaco in catalogo.exportar(formato):
+            saida.write(pedaco)
+    finally:
+        if args.saida:
+            saida.close()
+    if args.saida:
+        print(f"Produtos exportados em {args.saida} ({formato}).")
@@ -0,0 +1,261 @@
+"""Fotos de produtos.
+
+O upload é copiado para o disco em blocos, calculando o SHA-256 no caminho, e fica em
+originais/<aa>/<sha256>.<ext>: a mesma imagem enviada duas vezes é guardada uma vez só.
+As miniaturas (FOTOS_LARGURAS, em JPEG e WebP) são geradas por um pool de processos,
+fora da requisição; enquanto não ficam prontas, as URLs de miniatura servem o original.
+Com o Pillow instalado, o upload que ele não consegue ler é recusado; se mesmo assim
+a geração falhar, um arquivo 'falhou' na pasta das miniaturas impede novas tentativas
+e as URLs de miniatura seguem servindo o original.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app, has_app_context, send_file, url_for
+from config import Config
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow é opcional: sem ele, as listagens usam a foto original
+    Image = None
+
+BLOCO = 64 * 1024
+TIPOS = {'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+FORMATOS_MINIATURA = ('webp', 'jpg')
+NOME_VALIDO = re.compile(r'^[0-9a-f]{64}\.(jpg|png|webp)$')
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+# Fotos com mais pixels que isso são recusadas na geração das miniaturas
+MAX_PIXELS = 40_000_000
+
+
+class FotoInvalida(ValueError):
+    """Arquivo enviado não é uma imagem aceita ou passa do tamanho máximo"""
+
+
+def _detectar_formato(cabecalho):
+    """Formato pela assinatura do arquivo (não confia na extensão nem no Content-Type)"""
+    if cabecalho.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if cabecalho.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if cabecalho[:4] == b'RIFF' and cabecalho[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def caminho_original(nome):
+    return os.path.join(Config.FOTOS_DIR, 'originais', nome[:2], nome)
+
+
+def _pasta_miniaturas(nome):
+    hash_foto = nome.split('.', 1)[0]
+    return os.path.join(Config.FOTOS_DIR, 'miniaturas', hash_foto[:2], hash_foto)
+
+
+def caminho_miniatura(nome, largura, formato):
+    return os.path.join(_pasta_miniaturas(nome), f'{largura}.{formato}')
+
+
+def caminho_falha(nome):
+    """Marcador de original que o Pillow não decodifica (as miniaturas não são refeitas)"""
+    return os.path.join(_pasta_miniaturas(nome), 'falhou')
+
+
+def foto_existe(nome):
+    return bool(NOME_VALIDO.match(nome or '')) and os.path.isfile(caminho_original(nome))
+
+
+def salvar_upload(arquivo):
+    """Grava o upload (FileStorage) em disco e retorna o nome '<sha256>.<ext>'.
+
+    Lança FotoInvalida se não for JPEG/PNG/WebP, passar de FOTOS_TAMANHO_MAX ou
+    o Pillow (se instalado) não conseguir ler.
+    """
+    pasta_tmp = os.path.join(Config.FOTOS_DIR, 'tmp')
+    os.makedirs(pasta_tmp, exist_ok=True)
+    sha = hashlib.sha256()
+    tamanho = 0
+    with tempfile.NamedTemporaryFile(dir=pasta_tmp, delete=False) as tmp:
+        try:
+            bloco = arquivo.stream.read(BLOCO)
+            formato = _detectar_formato(bloco)
+            if formato is None:
+                raise FotoInvalida('Envie uma imagem JPEG, PNG ou WebP.')
+            while bloco:
+                tamanho += len(bloco)
+                if tamanho > Config.FOTOS_TAMANHO_MAX:
+                    raise FotoInvalida(f'A foto deve ter no máximo {Config.FOTOS_TAMANHO_MAX // (1024 * 1024)} MB.')
+                sha.update(bloco)
+                tmp.write(bloco)
+                bloco = arquivo.stream.read(BLOCO)
+        except Exception:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+
+    try:
+        _verificar_imagem(tmp.name)
+    except FotoInvalida:
+        os.unlink(tmp.name)
+        raise
+
+    nome = f'{sha.hexdigest()}.{formato}'
+    destino = caminho_original(nome)
+    if os.path.exists(destino):
+        os.unlink(tmp.name)  # Mesma foto já enviada antes
+    else:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(tmp.name, destino)
+    agendar_miniaturas(nome)
+    return nome
+
+
+def _verificar_imagem(caminho):
+    """Recusa o que passa pela assinatura mas o Pillow não lê (verify() não decodifica os pixels)"""
+    if Image is None:
+        return
+    try:
+        with Image.open(caminho) as img:
+            if img.width * img.height > MAX_PIXELS:
+                raise FotoInvalida('A foto tem resolução grande demais.')
+            img.verify()
+    except FotoInvalida:
+        raise
+    except Exception:
+        raise FotoInvalida('Não foi possível ler a imagem. Envie outro arquivo JPEG, PNG ou WebP.')
+
+
+def _logger():
+    return current_app.logger if has_app_context() else logging.getLogger(__name__)
+
+
+# --- Miniaturas (pool de processos) ---
+
+def _sem_transparencia(img):
+    """JPEG não tem canal alfa: aplica a imagem sobre fundo branco"""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        fundo = Image.new('RGB', img.size, (255, 255, 255))
+        fundo.paste(img, mask=img.getchannel('A'))
+        return fundo
+    return img.convert('RGB')
+
+
+def gerar_miniaturas(origem, destinos):
+    """Executado no processo do pool: `destinos` é [(largura, {formato: caminho})] em ordem decrescente"""
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    with Image.open(origem) as aberta:
+        img = ImageOps.exif_transpose(aberta)
+        img = img.convert('RGBA') if img.mode in ('LA', 'P', 'RGBA') else img.convert('RGB')
+        for largura, caminhos in destinos:
+            # Reduz a partir da miniatura anterior (maior): mais rápido que partir do original
+            img.thumbnail((largura, largura * 4), Image.LANCZOS)
+            for formato, caminho in caminhos.items():
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                tmp = caminho + '.tmp'
+                if formato == 'jpg':
+                    _sem_transparencia(img).save(tmp, 'JPEG', quality=82, optimize=True, progressive=True)
+                else:
+                    img.save(tmp, 'WEBP', quality=80, method=4)
+                os.replace(tmp, caminho)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pendentes = set()
+
+
+def _obter_pool():
+    global _pool
+    if _pool is None:
+        # 'spawn': o worker do gunicorn tem threads, e fork com threads pode travar
+        _pool = ProcessPoolExecutor(max_workers=Config.FOTOS_WORKERS,
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _marcar_falha(nome, erro, logger):
+    try:
+        os.makedirs(_pasta_miniaturas(nome), exist_ok=True)
+        with open(caminho_falha(nome), 'w', encoding='utf-8') as marcador:
+            marcador.write(f"{type(erro).__name__}: {erro}\n")
+    except OSError as e:
+        logger.error("Erro ao marcar a falha das miniaturas de %s: %s", nome, e)
+
+
+def _concluido(nome, futuro, logger):
+    global _pool
+    erro = futuro.exception()
+    if erro is not None:
+        logger.error("Erro ao gerar miniaturas de %s: %s", nome, erro)
+        if isinstance(erro, BrokenProcessPool):
+            with _pool_lock:
+                _pool = None
+        else:
+            # O original não muda (nome = hash do conteúdo): tentar de novo falharia igual.
+            # Marcado antes de sair da fila, para nenhuma requisição reenfileirar no meio
+            _marcar_falha(nome, erro, logger)
+    with _pool_lock:
+        _pendentes.discard(nome)
+
+
+def agendar_miniaturas(nome):
+    """Enfileira a geração das miniaturas (se ainda faltarem, não estiverem na fila e não
+    tiverem falhado antes)"""
+    global _pool
+    if Image is None or os.path.exists(caminho_falha(nome)):
+        return
+    destinos = [
+        (largura, {f: caminho_miniatura(nome, largura, f) for f in FORMATOS_MINIATURA})
+        for largura in sorted(Config.FOTOS_LARGURAS, reverse=True)
+    ]
+    if all(os.path.exists(c) for _, caminhos in destinos for c in caminhos.values()):
+        return
+    with _pool_lock:
+        if nome in _pendentes:
+            return
+        _pendentes.add(nome)
+        try:
+            futuro = _obter_pool().submit(gerar_miniaturas, caminho_original(nome), destinos)
+        except BrokenProcessPool:
+            _pendentes.discard(nome)
+            _pool = None
+            return
+    # O callback roda fora do contexto da app: leva o logger dela daqui
+    logger = _logger()
+    futuro.add_done_callback(lambda f: _concluido(nome, f, logger))
+
+
+# --- Envio ---
+
+def resposta_original(nome):
+    resposta = send_file(caminho_original(nome), mimetype=TIPOS[nome.rsplit('.', 1)[1]], max_age=31536000)
+    resposta.headers['Cache-Control'] = CACHE_IMUTAVEL
+    return resposta
+
+
+def resposta_miniatura(nome, largura, formato):
+    """Miniatura pronta (cache imutável) ou, enquanto é gerada, o original sem cache longo"""
+    caminho = caminho_miniatura(nome, largura, formato)
+    if os.path.exists(caminho):
+        resposta = send_file(caminho, mimetype=TIPOS[formato], max_age=31536000)
+        resposta.headers['Cache-Control'] = CACHE_IMUTAVEL
+        return resposta
+    agendar_miniaturas(nome)  # Ex.: servidor reiniciou antes de terminar
+    resposta = send_file(caminho_original(nome), mimetype=TIPOS[nome.rsplit('.', 1)[1]], max_age=0)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
+
+def srcset_foto(nome, formato):
+    """Valor do atributo srcset com todas as larguras de miniatura"""
+    return ', '.join(
+        f"{url_for('produtos.miniatura_produto', nome=nome, largura=largura, formato=formato)} {largura}w"
+        for largura in Config.FOTOS_LARGURAS
+    )
@@ -0,0 +1,220 @@
+"""Fotos de perfil do SUAP servidas pelo próprio site (/fotos/<matricula>).
+
+A foto é baixada uma vez pelo fetcher configurado, redimensionada para
+FOTOS_PERFIL_LARGURAS e guardada em FOTOS_PERFIL_DIR/<matricula>/<versão>/.
+O download roda em segundo plano: até ele terminar (ou por FOTOS_PERFIL_ESPERA_FALHA
+segundos após uma falha), /fotos/<matricula> responde com uma imagem padrão.
+A versão é o hash de UsuarioInfo.foto_url: quando a sincronização do perfil
+traz outra URL, a versão muda e a foto é baixada de novo. "Atualizar dados do
+SUAP" (/perfil?atualizar=1) também descarta a cópia local.
+
+O fetcher é qualquer função url -> bytes. Para trocar (ex.: stub local em testes),
+use FOTOS_PERFIL_FETCHER='modulo:funcao' ou definir_fetcher(funcao).
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from flask import current_app, send_file, url_for
+from werkzeug.utils import import_string
+from cache import TTLCache
+from config import Config
+from models import db, UsuarioInfo
+from utils import CircuitBreaker, SuapClient
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow é opcional: sem ele, a foto é servida no tamanho original
+    Image = None
+
+MATRICULA_VALIDA = re.compile(r'^[0-9A-Za-z]{1,20}$')
+CACHE_LONGO = 'private, max-age=31536000, immutable'
+CACHE_CURTO = 'private, max-age=300'
+SEM_FOTO = os.path.join('img', 'perfil_sem_foto.svg')  # em static/
+
+
+class FotoIndisponivel(Exception):
+    """Não foi possível obter a foto na origem"""
+
+
+# Cliente próprio: timeouts curtos, sem retentativas e breaker separado do usado no login
+cliente_fotos = SuapClient(
+    Config.SUAP_API_BASE_URL,
+    timeout=(Config.FOTOS_PERFIL_TIMEOUT_CONEXAO, Config.FOTOS_PERFIL_TIMEOUT_LEITURA),
+    tentativas=0,
+    pool_tamanho=Config.FOTOS_PERFIL_WORKERS,
+    breaker=CircuitBreaker(Config.SUAP_BREAKER_FALHAS, Config.SUAP_BREAKER_REABERTURA)
+)
+
+
+def buscar_foto_suap(url):
+    """Fetcher padrão: baixa pelo cliente de fotos (pool e circuit breaker próprios)"""
+    resposta = cliente_fotos.get(url, stream=True)
+    try:
+        if resposta.status_code != 200:
+            raise FotoIndisponivel(f'HTTP {resposta.status_code} ao baixar {url}')
+        dados = BytesIO()
+        for bloco in resposta.iter_content(64 * 1024):
+            dados.write(bloco)
+            if dados.tell() > Config.FOTOS_PERFIL_TAMANHO_MAX:
+                raise FotoIndisponivel(f'Foto maior que o permitido: {url}')
+        return dados.getvalue()
+    finally:
+        resposta.close()
+
+
+_fetcher = None
+
+
+def definir_fetcher(funcao):
+    """Troca a função que baixa as fotos (None volta ao padrão/configurado)"""
+    global _fetcher
+    _fetcher = funcao
+
+
+def obter_fetcher():
+    if _fetcher is not None:
+        return _fetcher
+    if Config.FOTOS_PERFIL_FETCHER:
+        return import_string(Config.FOTOS_PERFIL_FETCHER.replace(':', '.'))
+    return buscar_foto_suap
+
+
+def versao(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+
+
+def foto_de(dados):
+    """URL da foto no perfil (mesma prioridade usada para gravar UsuarioInfo.foto_url)"""
+    return dados.get('url_foto_150x200') or dados.get('url_foto_75x100') or dados.get('foto')
+
+
+def _pasta(matricula, versao_foto=None):
+    pasta = os.path.join(Config.FOTOS_PERFIL_DIR, matricula)
+    return os.path.join(pasta, versao_foto) if versao_foto else pasta
+
+
+def _caminho(matricula, versao_foto, largura):
+    return os.path.join(_pasta(matricula, versao_foto), f'{largura}.jpg' if Image else 'original')
+
+
+def _gravar(caminho, conteudo):
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(caminho), delete=False) as tmp:
+        tmp.write(conteudo)
+    os.replace(tmp.name, caminho)
+
+
+def _gerar_variantes(matricula, versao_foto, conteudo):
+    pasta = _pasta(matricula, versao_foto)
+    os.makedirs(pasta, exist_ok=True)
+    if Image is None:
+        _gravar(_caminho(matricula, versao_foto, None), conteudo)
+        return
+    # Fotos do SUAP são pequenas (150x200): redimensionar aqui custa poucos milissegundos
+    with Image.open(BytesIO(conteudo)) as aberta:
+        img = ImageOps.exif_transpose(aberta).convert('RGB')
+    for largura in sorted(Config.FOTOS_PERFIL_LARGURAS, reverse=True):
+        img.thumbnail((largura, largura * 2), Image.LANCZOS)
+        saida = BytesIO()
+        img.save(saida, 'JPEG', quality=85, optimize=True)
+        _gravar(_caminho(matricula, versao_foto, largura), saida.getvalue())
+
+
+_executor = ThreadPoolExecutor(max_workers=Config.FOTOS_PERFIL_WORKERS, thread_name_prefix='foto-perfil')
+_baixando = set()
+_baixando_lock = threading.Lock()
+_falhas = TTLCache(ttl=Config.FOTOS_PERFIL_ESPERA_FALHA)  # matrícula -> versão que falhou
+
+
+def _baixar(matricula, versao_foto, url):
+    try:
+        conteudo = obter_fetcher()(url)
+        # Versões antigas da foto deixam de ser usadas
+        shutil.rmtree(_pasta(matricula), ignore_errors=True)
+        _gerar_variantes(matricula, versao_foto, conteudo)
+    except Exception as e:
+        print(f"Foto de {matricula} indisponível: {str(e)}")
+        _falhas.set(matricula, versao_foto)
+    finally:
+        with _baixando_lock:
+            _baixando.discard(matricula)
+
+
+def agendar_download(matricula, versao_foto, url):
+    """Enfileira o download (um por matrícula), exceto se essa versão falhou há pouco"""
+    if _falhas.get(matricula) == versao_foto:
+        return
+    with _baixando_lock:
+        if matricula in _baixando:
+            return
+        _baixando.add(matricula)
+    _executor.submit(_baixar, matricula, versao_foto, url)
+
+
+def caminho_foto(matricula, largura):
+    """Arquivo local da foto na largura pedida, agendando o download na primeira vez.
+
+    Retorna (caminho, versão), com caminho None enquanto a foto não foi baixada,
+    ou (None, None) se o usuário não tem foto.
+    """
+    info = UsuarioInfo.query.filter_by(matricula=matricula).first()
+    if not info or not info.foto_url:
+        return None, None
+    versao_foto = versao(info.foto_url)
+    caminho = _caminho(matricula, versao_foto, largura)
+    if os.path.exists(caminho):
+        return caminho, versao_foto
+    agendar_download(matricula, versao_foto, info.foto_url)
+    return None, versao_foto
+
+
+def resposta_foto(matricula, largura, versao_pedida):
+    caminho, versao_foto = caminho_foto(matricula, largura)
+    if versao_foto is None:
+        return None
+    if caminho is None:
+        # Sem esperar o SUAP: imagem padrão, sem cache, até a foto ficar pronta
+        resposta = send_file(os.path.join(current_app.static_folder, SEM_FOTO),
+                             mimetype='image/svg+xml', max_age=0)
+        resposta.headers['Cache-Control'] = 'no-store'
+        return resposta
+    resposta = send_file(caminho, mimetype='image/jpeg' if Image else None, max_age=0)
+    # A URL com a versão atual nunca muda de conteúdo; sem versão (ou antiga), cache curto
+    resposta.headers['Cache-Control'] = CACHE_LONGO if versao_pedida == versao_foto else CACHE_CURTO
+    return resposta
+
+
+def invalidar(matricula):
+    """Descarta as cópias locais: a próxima exibição baixa a foto de novo"""
+    if MATRICULA_VALIDA.match(matricula or ''):
+        _falhas.delete(matricula)
+        shutil.rmtree(_pasta(matricula), ignore_errors=True)
+
+
+def sincronizar(matricula, dados, forcar=False):
+    """Chamado após ler o perfil no SUAP: atualiza foto_url e, se preciso, descarta a cópia local"""
+    url = foto_de(dados or {})
+    info = UsuarioInfo.query.filter_by(matricula=matricula).first()
+    if not info or not url:
+        return
+    if url != info.foto_url:
+        info.foto_url = url
+        db.session.commit()
+        invalidar(matricula)
+    elif forcar:
+        invalidar(matricula)
+
+
+def url_foto_perfil(usuario, largura=150):
+    """URL local (versionada) da foto de um perfil (dict no formato do SUAP) ou None"""
+    if not usuario:
+        return None
+    matricula = usuario.get('matricula')
+    url = foto_de(usuario)
+    if not matricula or not url or not MATRICULA_VALIDA.match(str(matricula)):
+        return None
+    return url_for('perfil.foto_perfil', matricula=matricula, largura=largura, v=versao(url))
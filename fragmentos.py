@@ -0,0 +1,32 @@
+"""Cache do HTML renderizado dos cards de produto.
+
+Cada card depende só do produto (e de poucas opções de exibição), então o HTML
+é guardado por (template, id, versão, opções). produto.versao sobe a cada UPDATE
+(edição, voto, mudança de status), inclusive várias no mesmo segundo, então toda
+escrita gera uma chave nova; as antigas saem pelo LRU.
+"""
+from markupsafe import Markup
+from flask import current_app
+from config import Config
+from cache import LRUCache
+
+_fragmentos = LRUCache(Config.CARDS_CACHE_MAX)
+
+
+def renderizar_fragmento(nome_template, produto, **opcoes):
+    chave = (nome_template, produto.id, produto.versao, tuple(sorted(opcoes.items())))
+    html = _fragmentos.get(chave)
+    if html is None:
+        html = Markup(current_app.jinja_env.get_template(nome_template).render(produto=produto, **opcoes))
+        _fragmentos.set(chave, html)
+    return html
+
+
+def card_produto(produto, **opcoes):
+    """Card das listagens; opções: autor, avaliacao, status, detalhes, acoes ('avaliar'/'dono'), admin"""
+    return renderizar_fragmento('_produto_card.html', produto, **opcoes)
+
+
+def linha_produto_admin(produto):
+    """Linha da tabela de produtos do admin"""
+    return renderizar_fragmento('admin/_produto_linha.html', produto)
@@ -0,0 +1,11 @@
+# Configuração do gunicorn (usada pelo Dockerfile)
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+# Workers com threads: uma requisição esperando I/O (banco, SUAP) não bloqueia o processo inteiro.
+# O handshake com o SUAP no primeiro login roda em segundo plano (login_pendente.py).
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = 5
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Importa produtos de um CSV ou JSONL (mesmo formato gerado pela exportação).
+
+Por padrão é tudo ou nada: uma linha inválida cancela a importação inteira.
+
+    python importar_produtos.py produtos.csv
+    python importar_produtos.py --ignorar-invalidos produtos.jsonl
+"""
+import argparse
+import io
+import sys
+from app import create_app
+import catalogo
+
+# Configura encoding para UTF-8
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+parser = argparse.ArgumentParser(description='Importa produtos de um CSV ou JSONL.')
+parser.add_argument('arquivo')
+parser.add_argument('--formato', choices=catalogo.FORMATOS, default=None,
+                    help='padrão: extensão do arquivo')
+parser.add_argument('--ignorar-invalidos', action='store_true',
+                    help='importa as linhas válidas e só relata as inválidas')
+args = parser.parse_args()
+formato = args.formato or args.arquivo.rsplit('.', 1)[-1].lower()
+if formato == 'ndjson':
+    formato = 'jsonl'
+if formato not in catalogo.FORMATOS:
+    parser.error('não foi possível deduzir o formato pela extensão; use --formato')
+
+app = create_app()
+
+with app.app_context():
+    with open(args.arquivo, encoding='utf-8-sig', newline='') as f:
+        try:
+            resumo = catalogo.importar(f, formato, ignorar_invalidos=args.ignorar_invalidos)
+        except catalogo.ImportacaoInvalida as e:
+            for linha, mensagem in e.erros:
+                print(f"  linha {linha}: {mensagem}")
+            print(f"{e.total_erros} linha(s) inválida(s); nada foi importado.")
+            sys.exit(1)
+    for linha, mensagem in resumo['erros']:
+        print(f"  linha {linha}: {mensagem}")
+    print(f"{resumo['importados']} produto(s) importado(s), {resumo['invalidos']} linha(s) ignorada(s).")
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from app import create_app
-from models import db
+from migracoes import aplicar_migracoes
 import sys
 import io
 
@@ -10,6 +10,9 @@ sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 app = create_app()
 
 with app.app_context():
-    db.create_all()
+    aplicadas = aplicar_migracoes()
+    if aplicadas:
+        print(f"Migrações aplicadas: {', '.join(str(v) for v in aplicadas)}")
+    else:
+        print("Banco de dados já está atualizado.")
     print("Banco de dados inicializado com sucesso!")
-    print("Tabelas criadas no MySQL: produto, usuario_info, avaliacao")
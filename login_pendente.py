@@ -0,0 +1,108 @@
+"""Primeiro login com SUAP fora da thread da requisição.
+
+O POST /login só registra um LoginPendente e devolve a página em estado de espera;
+o handshake com o SUAP (token + perfil) roda em um executor e o navegador consulta
+/login/status até o resultado ficar pronto. O estado fica no banco, então qualquer
+worker do gunicorn pode responder à consulta.
+"""
+import json
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from config import Config
+from models import db, LoginPendente
+from utils import autenticar_suap
+
+# Pendente por mais que isso: a tarefa morreu (worker reiniciado) ou não conseguiu gravar
+PRAZO_PENDENTE = timedelta(seconds=Config.SUAP_LOGIN_PRAZO)
+# Resultados não consumidos (com o token do SUAP) são apagados depois desse tempo
+VALIDADE = PRAZO_PENDENTE + timedelta(minutes=2)
+# Só o que /login/status usa; o perfil completo fica em perfil_suap (utils.obter_perfil_cache)
+CAMPOS_RESULTADO = ('sucesso', 'erro', 'is_aluno', 'token')
+
+_executor = ThreadPoolExecutor(max_workers=Config.SUAP_LOGIN_WORKERS, thread_name_prefix='suap-login')
+_em_andamento = threading.BoundedSemaphore(Config.SUAP_LOGIN_FILA_MAX)
+
+
+def _agora_utc():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _limpar_expirados():
+    LoginPendente.query.filter(LoginPendente.created_at < _agora_utc() - VALIDADE).delete()
+
+
+def _gravar(pendente_id, resultado):
+    pendente = db.session.get(LoginPendente, pendente_id)
+    if pendente:
+        pendente.status = 'concluido'
+        pendente.resultado = json.dumps(resultado, ensure_ascii=False)
+    _limpar_expirados()
+    db.session.commit()
+
+
+def _executar(app, pendente_id, matricula, senha):
+    try:
+        with app.app_context():
+            try:
+                resultado = autenticar_suap(matricula, senha)
+            except Exception as e:
+                resultado = {'sucesso': False, 'erro': f'Erro inesperado: {str(e)}'}
+            resultado = {campo: resultado[campo] for campo in CAMPOS_RESULTADO if campo in resultado}
+            resultado['matricula'] = matricula
+            try:
+                _gravar(pendente_id, resultado)
+            except Exception as e:
+                # Sem isso a exceção sumiria no future e a página ficaria em "pendente"
+                print(f"Erro ao gravar o login SUAP de {matricula}: {e}")
+                db.session.rollback()
+                try:
+                    _gravar(pendente_id, {'sucesso': False, 'matricula': matricula,
+                                          'erro': 'Erro ao concluir o login. Por favor, tente novamente.'})
+                except Exception as e:
+                    print(f"Erro ao gravar a falha do login SUAP de {matricula}: {e}")
+                    db.session.rollback()
+            finally:
+                db.session.remove()
+    finally:
+        _em_andamento.release()
+
+
+def iniciar(app, matricula, senha):
+    """Agenda a autenticação no SUAP; retorna o id do login pendente ou None se a fila estiver cheia"""
+    if not _em_andamento.acquire(blocking=False):
+        return None
+    try:
+        _limpar_expirados()
+        pendente = LoginPendente(id=secrets.token_urlsafe(32), matricula=matricula,
+                                 status='pendente', created_at=_agora_utc())
+        db.session.add(pendente)
+        db.session.commit()
+        # A senha só existe em memória, dentro da tarefa; nunca é gravada
+        _executor.submit(_executar, app, pendente.id, matricula, senha)
+        return pendente.id
+    except Exception:
+        _em_andamento.release()
+        raise
+
+
+def consultar(pendente_id):
+    """Retorna None enquanto pendente; o resultado de autenticar_suap quando concluído.
+
+    O registro é removido ao entregar o resultado. Ids desconhecidos/expirados, e
+    pendentes além de PRAZO_PENDENTE, retornam um resultado de erro.
+    """
+    pendente = db.session.get(LoginPendente, pendente_id) if pendente_id else None
+    if not pendente or pendente.created_at < _agora_utc() - VALIDADE:
+        return {'sucesso': False, 'erro': 'Sua tentativa de login expirou. Por favor, tente novamente.'}
+    if pendente.status == 'pendente':
+        if pendente.created_at >= _agora_utc() - PRAZO_PENDENTE:
+            return None
+        db.session.delete(pendente)
+        db.session.commit()
+        return {'sucesso': False, 'erro': 'O login com o SUAP não foi concluído a tempo. Por favor, tente novamente.'}
+    resultado = json.loads(pendente.resultado)
+    db.session.delete(pendente)
+    db.session.commit()
+    return resultado
@@ -0,0 +1,116 @@
+"""Produtos do mapa da home em GeoJSON, limitados ao viewport.
+
+Em zoom baixo os produtos são agrupados no servidor em células de grade,
+de modo que a resposta tenha tamanho limitado independente do catálogo.
+"""
+import math
+from sqlalchemy import func, cast, Integer
+from config import Config
+from models import db, Produto
+
+# Tamanho aproximado de cada célula de agrupamento, em pixels de tela (tiles de 256px)
+CELULA_PIXELS = 64
+
+
+def parse_bbox(valor):
+    """Converte 'minLon,minLat,maxLon,maxLat' em tupla de floats ou None se inválido"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in (valor or '').split(','))
+    except ValueError:
+        return None
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        return None
+    min_lon, max_lon = max(-180.0, min(min_lon, max_lon)), min(180.0, max(min_lon, max_lon))
+    min_lat, max_lat = max(-90.0, min(min_lat, max_lat)), min(90.0, max(min_lat, max_lat))
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def tamanho_celula(zoom):
+    """Largura da célula da grade em graus para o nível de zoom (Web Mercator)"""
+    return 360.0 / (2 ** zoom) * (CELULA_PIXELS / 256.0)
+
+
+def _feature_produto(produto):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [produto.longitude, produto.latitude]},
+        'properties': {
+            'id': produto.id,
+            'nome': produto.nome,
+            'tipo': produto.tipo,
+            'preco': produto.preco
+        }
+    }
+
+
+def _feature_grupo(lon, lat, total):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+        'properties': {'cluster': True, 'total': total}
+    }
+
+
+def _indice_celula(coluna, origem, celula):
+    """floor((coluna + origem) / celula) portável: SQLite não tem FLOOR, mas o valor é sempre >= 0"""
+    expr = (coluna + origem) / celula
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return cast(expr, Integer)
+    return func.floor(expr)
+
+
+def _agrupar(filtros, zoom):
+    celula = tamanho_celula(zoom)
+    cx = _indice_celula(Produto.longitude, 180.0, celula).label('cx')
+    cy = _indice_celula(Produto.latitude, 90.0, celula).label('cy')
+    return db.session.query(
+        cx, cy,
+        func.count(Produto.id),
+        func.avg(Produto.longitude),
+        func.avg(Produto.latitude),
+        func.min(Produto.id)
+    ).filter(*filtros).group_by(cx, cy).all()
+
+
+def produtos_no_viewport(bbox, zoom, tipo=None):
+    """Retorna um FeatureCollection com produtos (ou grupos) dentro do bbox"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    zoom = max(0, min(int(zoom), 22))
+
+    filtros = [
+        Produto.status == 'disponivel',
+        Produto.latitude.between(min_lat, max_lat),
+        Produto.longitude.between(min_lon, max_lon),
+    ]
+    if tipo:
+        filtros.append(Produto.tipo == tipo)
+
+    if zoom >= Config.MAPA_ZOOM_DETALHE:
+        produtos = Produto.query.filter(*filtros).limit(Config.MAPA_MAX_PONTOS + 1).all()
+        if len(produtos) <= Config.MAPA_MAX_PONTOS:
+            return {
+                'type': 'FeatureCollection',
+                'features': [_feature_produto(p) for p in produtos],
+                'agrupado': False
+            }
+        # Viewport denso demais mesmo em zoom alto: agrupa também
+
+    grupos = _agrupar(filtros, zoom)
+    # bbox grande demais para o zoom informado: engrossa a grade até caber no limite
+    while len(grupos) > Config.MAPA_MAX_PONTOS and zoom > 0:
+        zoom = max(0, zoom - 2)
+        grupos = _agrupar(filtros, zoom)
+
+    # Células com um único produto viram marcadores normais (uma consulta para todas)
+    unicos = [produto_id for _, _, total, _, _, produto_id in grupos if total == 1]
+    por_id = {}
+    if unicos:
+        por_id = {p.id: p for p in Produto.query.filter(Produto.id.in_(unicos)).all()}
+
+    features = []
+    for _, _, total, lon, lat, produto_id in grupos:
+        if total == 1 and produto_id in por_id:
+            features.append(_feature_produto(por_id[produto_id]))
+        else:
+            features.append(_feature_grupo(float(lon), float(lat), total))
+    return {'type': 'FeatureCollection', 'features': features, 'agrupado': True}
@@ -0,0 +1,238 @@
+"""Métricas por endpoint no formato texto do Prometheus (GET /metrics).
+
+Hooks de requisição do Flask medem a latência de cada endpoint; hooks de cursor do
+SQLAlchemy contam consultas e somam o tempo no banco da requisição corrente; o
+cliente do SUAP (utils.SuapClient) registra a latência de cada chamada.
+
+Os valores ficam na memória de cada processo: com vários workers do gunicorn, cada
+raspagem vê um worker (label `pid`). Acesso: admin logado ou, para o Prometheus,
+`Authorization: Bearer <METRICAS_TOKEN>`.
+
+Com METRICAS_LENTA_MS > 0, requisições mais lentas que isso são registradas no log
+com as consultas SQL executadas e o tempo de cada uma.
+"""
+import hmac
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+from flask import g, has_request_context, request, session, Response, abort
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Config
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+MAX_SQL_LOG = 50
+FORA_DE_REQUISICAO = '(segundo plano)'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(nomes, valores, le=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if le is not None:
+        pares.append(f'le="{le}"')
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    def __init__(self, nome, ajuda, labels):
+        self.nome, self.ajuda, self.labels = nome, ajuda, labels
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def exportar(self):
+        with self._lock:
+            itens = sorted(self._valores.items())
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} counter']
+        linhas += [f'{self.nome}{_labels(self.labels, v)} {_numero(n)}' for v, n in itens]
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome, ajuda, labels, buckets):
+        self.nome, self.ajuda, self.labels, self.buckets = nome, ajuda, labels, buckets
+        self._series = {}  # valores dos labels -> [contagens por bucket..., soma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valores, medida):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if medida <= limite:
+                    serie[i] += 1
+            serie[-2] += medida
+            serie[-1] += 1
+
+    def exportar(self):
+        with self._lock:
+            itens = sorted((v, list(s)) for v, s in self._series.items())
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} histogram']
+        for valores, serie in itens:
+            for limite, n in zip(self.buckets, serie):
+                linhas.append(f'{self.nome}_bucket{_labels(self.labels, valores, limite)} {n}')
+            linhas.append(f'{self.nome}_bucket{_labels(self.labels, valores, "+Inf")} {serie[-1]}')
+            linhas.append(f'{self.nome}_sum{_labels(self.labels, valores)} {_numero(serie[-2])}')
+            linhas.append(f'{self.nome}_count{_labels(self.labels, valores)} {serie[-1]}')
+        return linhas
+
+
+requisicoes = Contador('reutilizaif_requisicoes_total', 'Requisições atendidas',
+                       ('endpoint', 'metodo', 'status'))
+latencia = Histograma('reutilizaif_requisicao_segundos', 'Latência das requisições',
+                      ('endpoint', 'metodo'), BUCKETS_LATENCIA)
+consultas_por_requisicao = Histograma('reutilizaif_consultas_sql_por_requisicao',
+                                      'Consultas SQL executadas por requisição', ('endpoint',), BUCKETS_CONSULTAS)
+consultas = Contador('reutilizaif_consultas_sql_total', 'Consultas SQL executadas', ('endpoint',))
+tempo_sql = Contador('reutilizaif_sql_segundos_total', 'Tempo gasto em consultas SQL', ('endpoint',))
+suap = Histograma('reutilizaif_suap_segundos', 'Latência das chamadas ao SUAP',
+                  ('endpoint', 'status'), BUCKETS_LATENCIA)
+METRICAS = (requisicoes, latencia, consultas_por_requisicao, consultas, tempo_sql, suap)
+
+
+def exportar():
+    """Todas as métricas no formato texto do Prometheus, com o pid do worker como label"""
+    pid = f'pid="{os.getpid()}"'
+    linhas = []
+    for metrica in METRICAS:
+        for linha in metrica.exportar():
+            if linha.startswith('#'):
+                linhas.append(linha)
+            elif '{' in linha:
+                linhas.append(linha.replace('{', '{' + pid + ',', 1))
+            else:
+                nome, valor = linha.rsplit(' ', 1)
+                linhas.append(f'{nome}{{{pid}}} {valor}')
+    return '\n'.join(linhas) + '\n'
+
+
+# --- SUAP ---
+
+# Segmentos variáveis (ids, hashes, arquivos como a foto de cada matrícula) viram ':id'
+_SEGMENTO_VARIAVEL = re.compile(r'^(\d+|[0-9A-Fa-f-]{16,}|.+\.\w+)$')
+
+
+def endpoint_suap(url):
+    """Caminho chamado no SUAP, sem host nem query: /api/rh/eu/, /media/fotos/75x100/:id"""
+    caminho = urlsplit(url).path or '/'
+    return '/'.join(':id' if _SEGMENTO_VARIAVEL.match(parte) else parte for parte in caminho.split('/'))
+
+
+def observar_suap(url, status, duracao):
+    """Chamado por utils.SuapClient a cada chamada (status = código HTTP ou tipo do erro)"""
+    suap.observar((endpoint_suap(url), str(status)), duracao)
+
+
+# --- SQL ---
+
+# O início fica no contexto de execução da instrução: se ela falhar, some junto com ele
+# (na conexão, sobraria um início a cada erro)
+
+def _antes_consulta(conn, cursor, sql, parametros, contexto, executemany):
+    if contexto is not None:
+        contexto._metricas_inicio = time.perf_counter()
+
+
+def _depois_consulta(conn, cursor, sql, parametros, contexto, executemany):
+    inicio = getattr(contexto, '_metricas_inicio', None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    atual = _estado() if has_request_context() else None
+    if atual is None:
+        consultas.inc((FORA_DE_REQUISICAO,))
+        tempo_sql.inc((FORA_DE_REQUISICAO,), duracao)
+        return
+    atual['consultas'] += 1
+    atual['tempo_sql'] += duracao
+    if Config.METRICAS_LENTA_MS and len(atual['sql']) < MAX_SQL_LOG:
+        atual['sql'].append((duracao, sql))
+
+
+# --- Requisições ---
+
+def _estado():
+    """Medições da requisição corrente; criadas na primeira consulta ou no before_request,
+    o que vier antes (a sessão é lida do banco antes dos hooks de requisição)"""
+    if '_metricas' not in g:
+        g._metricas = {'inicio': time.perf_counter(), 'consultas': 0, 'tempo_sql': 0.0, 'sql': [], 'status': 500}
+    return g._metricas
+
+
+def _inicio_requisicao():
+    _estado()
+
+
+def _resposta(resposta):
+    if '_metricas' in g:
+        g._metricas['status'] = resposta.status_code
+    return resposta
+
+
+def _fim_requisicao(erro=None):
+    atual = g.pop('_metricas', None)
+    if atual is None or not has_request_context():
+        return
+    duracao = time.perf_counter() - atual['inicio']
+    endpoint = request.endpoint or '(sem rota)'
+    requisicoes.inc((endpoint, request.method, str(atual['status'])))
+    latencia.observar((endpoint, request.method), duracao)
+    consultas_por_requisicao.observar((endpoint,), atual['consultas'])
+    consultas.inc((endpoint,), atual['consultas'])
+    tempo_sql.inc((endpoint,), atual['tempo_sql'])
+    if Config.METRICAS_LENTA_MS and duracao * 1000 >= Config.METRICAS_LENTA_MS:
+        print(f"Requisição lenta: {request.method} {request.full_path.rstrip('?')} ({endpoint}) "
+              f"{duracao * 1000:.0f} ms, {atual['consultas']} consultas SQL em {atual['tempo_sql'] * 1000:.0f} ms")
+        for duracao_sql, sql in atual['sql']:
+            print(f"    {duracao_sql * 1000:7.1f} ms  {' '.join(sql.split())[:500]}")
+        if atual['consultas'] > len(atual['sql']):
+            print(f"    ... mais {atual['consultas'] - len(atual['sql'])} consultas")
+
+
+def _autorizado():
+    if Config.METRICAS_TOKEN:
+        cabecalho = request.headers.get('Authorization', '')
+        if hmac.compare_digest(cabecalho.encode('utf-8'), f'Bearer {Config.METRICAS_TOKEN}'.encode('utf-8')):
+            return True
+    from utils import is_admin_user
+    return bool(session.get('usuario_logado')) and is_admin_user()
+
+
+def metrics():
+    if not _autorizado():
+        abort(403)
+    resposta = Response(exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+
+_sql_instrumentado = False
+
+
+def init_app(app):
+    global _sql_instrumentado
+    if not Config.METRICAS_ATIVAS:
+        return
+    if not _sql_instrumentado:
+        # Em Engine (classe): vale para qualquer engine criada pelo Flask-SQLAlchemy
+        event.listen(Engine, 'before_cursor_execute', _antes_consulta)
+        event.listen(Engine, 'after_cursor_execute', _depois_consulta)
+        _sql_instrumentado = True
+    app.before_request(_inicio_requisicao)
+    app.after_request(_resposta)
+    app.teardown_request(_fim_requisicao)
+    app.add_url_rule('/metrics', 'metrics', metrics)
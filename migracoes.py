@@ -0,0 +1,168 @@
+"""Migrações versionadas do schema (SQLite e MySQL).
+
+Cada migração roda uma única vez e fica registrada em schema_migracao.
+Devem ser aplicadas no deploy (python init_db.py), não a cada boot de worker.
+"""
+from sqlalchemy import inspect, text
+from models import db, Avaliacao, CatalogoVersao, PerfilSuap, LoginPendente, Sessao
+
+MIGRACOES = []
+
+
+def migracao(versao, descricao):
+    """Registra uma função como migração de número `versao`"""
+    def registrar(f):
+        MIGRACOES.append((versao, descricao, f))
+        return f
+    return registrar
+
+
+def _colunas(conn, tabela):
+    return {c['name'] for c in inspect(conn).get_columns(tabela)}
+
+
+def _indices(conn, tabela):
+    insp = inspect(conn)
+    nomes = {i['name'] for i in insp.get_indexes(tabela)}
+    nomes |= {u['name'] for u in insp.get_unique_constraints(tabela)}
+    return nomes
+
+
+def _adicionar_coluna(conn, tabela, coluna, ddl):
+    if coluna not in _colunas(conn, tabela):
+        conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {ddl}"))
+
+
+def _criar_indice(conn, nome, tabela, colunas, unico=False):
+    if nome not in _indices(conn, tabela):
+        tipo = 'UNIQUE INDEX' if unico else 'INDEX'
+        conn.execute(text(f"CREATE {tipo} {nome} ON {tabela} ({', '.join(colunas)})"))
+
+
+@migracao(1, 'schema inicial (produto, usuario_info, avaliacao)')
+def _schema_inicial(conn):
+    db.metadata.create_all(bind=conn)
+
+
+@migracao(2, 'usuario_info.is_admin')
+def _is_admin(conn):
+    _adicionar_coluna(conn, 'usuario_info', 'is_admin', 'BOOLEAN DEFAULT 0')
+
+
+@migracao(3, 'produto.rating_count/rating_sum materializados')
+def _agregados_avaliacao(conn):
+    colunas = _colunas(conn, 'produto')
+    _adicionar_coluna(conn, 'produto', 'rating_count', 'INTEGER NOT NULL DEFAULT 0')
+    _adicionar_coluna(conn, 'produto', 'rating_sum', 'INTEGER NOT NULL DEFAULT 0')
+    if 'rating_count' not in colunas:
+        Avaliacao.recalcular_agregados(conn)
+
+
+@migracao(4, 'índices das listagens e avaliação única por usuário')
+def _indices_consultas(conn):
+    # Remove avaliações duplicadas (mantém a mais recente) antes do índice único
+    conn.execute(text(
+        "DELETE FROM avaliacao WHERE id NOT IN ("
+        " SELECT id FROM (SELECT MAX(id) AS id FROM avaliacao"
+        " GROUP BY produto_id, avaliador_matricula) AS ultimas)"
+    ))
+    Avaliacao.recalcular_agregados(conn)
+
+    _criar_indice(conn, 'ix_produto_status_tipo_created', 'produto', ['status', 'tipo', 'created_at', 'id'])
+    _criar_indice(conn, 'ix_produto_status_created', 'produto', ['status', 'created_at', 'id'])
+    _criar_indice(conn, 'ix_produto_usuario_created', 'produto', ['usuario_matricula', 'created_at'])
+    _criar_indice(conn, 'ix_avaliacao_produto_id', 'avaliacao', ['produto_id'])
+    _criar_indice(conn, 'uq_avaliacao_produto_avaliador', 'avaliacao',
+                  ['produto_id', 'avaliador_matricula'], unico=True)
+
+
+@migracao(5, 'busca textual (FTS5 no SQLite / FULLTEXT no MySQL)')
+def _busca_textual(conn):
+    from busca import criar_indice
+    criar_indice(conn)
+
+
+@migracao(6, 'índice de localização do mapa')
+def _indice_mapa(conn):
+    _criar_indice(conn, 'ix_produto_lat_lon', 'produto', ['latitude', 'longitude'])
+
+
+@migracao(7, 'cache persistente de perfis do SUAP (perfil_suap)')
+def _perfil_suap(conn):
+    db.metadata.create_all(bind=conn, tables=[PerfilSuap.__table__])
+
+
+@migracao(8, 'logins SUAP em segundo plano (login_pendente)')
+def _login_pendente(conn):
+    db.metadata.create_all(bind=conn, tables=[LoginPendente.__table__])
+
+
+@migracao(9, 'sessões no servidor (sessao)')
+def _sessao(conn):
+    db.metadata.create_all(bind=conn, tables=[Sessao.__table__])
+
+
+@migracao(10, 'produto.foto')
+def _foto_produto(conn):
+    _adicionar_coluna(conn, 'produto', 'foto', 'VARCHAR(80)')
+
+
+@migracao(11, 'índices das tabelas paginadas do admin')
+def _indices_admin(conn):
+    _criar_indice(conn, 'ix_produto_created', 'produto', ['created_at', 'id'])
+    _criar_indice(conn, 'ix_produto_nome', 'produto', ['nome', 'id'])
+    _criar_indice(conn, 'ix_produto_preco', 'produto', ['preco', 'id'])
+    _criar_indice(conn, 'ix_usuario_info_created', 'usuario_info', ['created_at', 'id'])
+    _criar_indice(conn, 'ix_usuario_info_nome', 'usuario_info', ['nome', 'id'])
+
+
+@migracao(12, 'produto.versao')
+def _versao_produto(conn):
+    _adicionar_coluna(conn, 'produto', 'versao', 'INTEGER NOT NULL DEFAULT 1')
+
+
+@migracao(13, 'versão do catálogo (catalogo_versao)')
+def _catalogo_versao(conn):
+    db.metadata.create_all(bind=conn, tables=[CatalogoVersao.__table__])
+    if not conn.execute(text("SELECT COUNT(*) FROM catalogo_versao")).scalar():
+        conn.execute(text(
+            "INSERT INTO catalogo_versao (id, versao, atualizado_em)"
+            " SELECT 1, 1, COALESCE(MAX(updated_at), CURRENT_TIMESTAMP) FROM produto"
+        ))
+
+
+def versao_atual(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migracao ("
+        " versao INTEGER PRIMARY KEY,"
+        " descricao VARCHAR(200),"
+        " aplicada_em DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return conn.execute(text("SELECT COALESCE(MAX(versao), 0) FROM schema_migracao")).scalar()
+
+
+def aplicar_migracoes(engine=None):
+    """Aplica as migrações pendentes em ordem; retorna a lista de versões aplicadas"""
+    engine = engine or db.engine
+    aplicadas = []
+    with engine.connect() as conn:
+        mysql = conn.dialect.name == 'mysql'
+        if mysql:
+            # Evita que dois deploys simultâneos migrem ao mesmo tempo
+            conn.execute(text("SELECT GET_LOCK('reutilizaif_migracoes', 300)"))
+        try:
+            atual = versao_atual(conn)
+            conn.commit()
+            for versao, descricao, funcao in sorted(MIGRACOES, key=lambda m: m[0]):
+                if versao <= atual:
+                    continue
+                print(f"Aplicando migração {versao}: {descricao}")
+                funcao(conn)
+                conn.execute(text("INSERT INTO schema_migracao (versao, descricao) VALUES (:v, :d)"),
+                             {'v': versao, 'd': descricao})
+                conn.commit()
+                aplicadas.append(versao)
+        finally:
+            if mysql:
+                conn.execute(text("SELECT RELEASE_LOCK('reutilizaif_migracoes')"))
+    return aplicadas
@@ -1,9 +1,40 @@
+import itertools
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from config import Config
 
 db = SQLAlchemy()
 
+
+@event.listens_for(Engine, 'connect')
+def configurar_sqlite(conexao, registro):
+    """Pragmas de cada conexão SQLite nova (ver SQLITE_* em config.py)"""
+    if not isinstance(conexao, sqlite3.Connection) or not Config.SQLITE_PRAGMAS:
+        return
+    cursor = conexao.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT)}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={int(Config.SQLITE_MMAP)}")
+    cursor.close()
+
+
 class Produto(db.Model):
     __tablename__ = 'produto'
+    # Índices das listagens (status/tipo + keyset em created_at, id), de "meus produtos" e do mapa
+    __table_args__ = (
+        db.Index('ix_produto_status_tipo_created', 'status', 'tipo', 'created_at', 'id'),
+        db.Index('ix_produto_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_produto_usuario_created', 'usuario_matricula', 'created_at'),
+        db.Index('ix_produto_lat_lon', 'latitude', 'longitude'),
+        # Ordenações da tabela de produtos do admin
+        db.Index('ix_produto_created', 'created_at', 'id'),
+        db.Index('ix_produto_nome', 'nome', 'id'),
+        db.Index('ix_produto_preco', 'preco', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
@@ -16,12 +47,27 @@ class Produto(db.Model):
     endereco = db.Column(db.String(200))  # Endereço/localização
     latitude = db.Column(db.Float)  # Latitude para mapa
     longitude = db.Column(db.Float)  # Longitude para mapa
+    foto = db.Column(db.String(80))  # '<sha256>.<ext>' em FOTOS_DIR (ver fotos.py)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    # Agregados de avaliação mantidos na mesma transação do voto (ver avaliar_produto)
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Incrementada em todo UPDATE (ORM ou update() do SQLAlchemy): updated_at tem resolução
+    # de segundos, então caches e ETags usam a versão para enxergar edições no mesmo segundo
+    versao = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                       onupdate=db.literal_column('versao') + 1)
 
     def __repr__(self):
         return f'<Produto {self.nome}>'
 
+    @property
+    def media_avaliacao(self):
+        """Média das notas a partir dos agregados (sem consultar avaliacao)"""
+        if not self.rating_count:
+            return 0.0
+        return round(self.rating_sum / self.rating_count, 1)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -31,12 +77,19 @@ class Produto(db.Model):
             'usuario_matricula': self.usuario_matricula,
             'usuario_nome': self.usuario_nome,
             'tipo': self.tipo,
-            'status': self.status
+            'status': self.status,
+            'foto': self.foto,
+            'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
 
 class UsuarioInfo(db.Model):
     __tablename__ = 'usuario_info'
+    # Ordenações da tabela de usuários do admin (matrícula já tem índice único)
+    __table_args__ = (
+        db.Index('ix_usuario_info_created', 'created_at', 'id'),
+        db.Index('ix_usuario_info_nome', 'nome', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     matricula = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -55,8 +108,68 @@ class UsuarioInfo(db.Model):
         return f'<UsuarioInfo {self.matricula}>'
 
 
+class PerfilSuap(db.Model):
+    """Perfil normalizado vindo do SUAP, guardado localmente para evitar novas consultas"""
+    __tablename__ = 'perfil_suap'
+
+    id = db.Column(db.Integer, primary_key=True)
+    matricula = db.Column(db.String(20), unique=True, nullable=False, index=True)
+    dados = db.Column(db.Text, nullable=False)  # JSON já normalizado por obter_dados_usuario_suap
+    atualizado_em = db.Column(db.DateTime, nullable=False)  # UTC
+
+    def __repr__(self):
+        return f'<PerfilSuap {self.matricula}>'
+
+
+class LoginPendente(db.Model):
+    """Primeiro login com SUAP em andamento em segundo plano (consultado por /login/status)"""
+    __tablename__ = 'login_pendente'
+
+    id = db.Column(db.String(64), primary_key=True)  # Token aleatório guardado na sessão
+    matricula = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # 'pendente', 'concluido'
+    resultado = db.Column(db.Text)  # JSON retornado por autenticar_suap
+    created_at = db.Column(db.DateTime, nullable=False, index=True)  # UTC
+
+    def __repr__(self):
+        return f'<LoginPendente {self.matricula} {self.status}>'
+
+
+class CatalogoVersao(db.Model):
+    """Versão global do catálogo (linha única, id=1): validador O(1) das listagens (condicional.py).
+
+    Sobe uma vez por transação que insere, altera ou remove produtos ou avaliações
+    (ver _registrar_alteracao_catalogo), em qualquer worker, pois fica no banco.
+    """
+    __tablename__ = 'catalogo_versao'
+
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=1)
+    atualizado_em = db.Column(db.DateTime, nullable=False)  # Last-Modified das listagens
+
+    def __repr__(self):
+        return f'<CatalogoVersao {self.versao}>'
+
+
+class Sessao(db.Model):
+    """Dados da sessão Flask guardados no servidor; o cookie leva apenas o id opaco"""
+    __tablename__ = 'sessao'
+
+    id = db.Column(db.String(64), primary_key=True)  # SHA-256 do id enviado no cookie
+    dados = db.Column(db.Text, nullable=False)  # Sessão serializada (JSON com tags do Flask)
+    expira_em = db.Column(db.DateTime, nullable=False, index=True)  # UTC
+
+    def __repr__(self):
+        return f'<Sessao {self.id[:8]}>'
+
+
 class Avaliacao(db.Model):
     __tablename__ = 'avaliacao'
+    # Um voto por usuário e produto
+    __table_args__ = (
+        db.Index('ix_avaliacao_produto_id', 'produto_id'),
+        db.Index('uq_avaliacao_produto_avaliador', 'produto_id', 'avaliador_matricula', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=False)
@@ -73,9 +186,77 @@ class Avaliacao(db.Model):
     @staticmethod
     def calcular_media(produto_id):
         """Calcula a média de avaliações de um produto"""
-        avaliacoes = Avaliacao.query.filter_by(produto_id=produto_id).all()
-        if not avaliacoes:
-            return 0.0
-        total = sum(av.nota for av in avaliacoes)
-        return round(total / len(avaliacoes), 1)
+        produto = db.session.get(Produto, produto_id)
+        return produto.media_avaliacao if produto else 0.0
+
+    @staticmethod
+    def registrar_voto(produto_id, nota, nota_anterior=None):
+        """Ajusta rating_count/rating_sum do produto (sem commit, na transação corrente).
+
+        Usa UPDATE com expressão SQL para não perder votos concorrentes.
+        """
+        if nota_anterior is None:
+            delta_total, delta_soma = 1, nota
+        else:
+            delta_total, delta_soma = 0, nota - nota_anterior
+        db.session.query(Produto).filter(Produto.id == produto_id).update({
+            Produto.rating_count: Produto.rating_count + delta_total,
+            Produto.rating_sum: Produto.rating_sum + delta_soma
+        }, synchronize_session=False)
+
+    @staticmethod
+    def recalcular_agregados(conn=None):
+        """Reconstrói rating_count/rating_sum de todos os produtos a partir de avaliacao.
+
+        Com `conn` (usado pelas migrações) executa na conexão dada, sem commit, e só
+        toca as colunas de avaliação: colunas de migrações posteriores (como o onupdate
+        de produto.versao) podem ainda não existir.
+        """
+        if conn is not None:
+            produto = db.table('produto', db.column('id'), db.column('rating_count'), db.column('rating_sum'))
+        else:
+            produto = Produto.__table__
+        total = db.select(db.func.count(Avaliacao.id)).where(
+            Avaliacao.produto_id == produto.c.id).scalar_subquery()
+        soma = db.select(db.func.coalesce(db.func.sum(Avaliacao.nota), 0)).where(
+            Avaliacao.produto_id == produto.c.id).scalar_subquery()
+        stmt = db.update(produto).values(rating_count=total, rating_sum=soma)
+        if conn is not None:
+            return conn.execute(stmt).rowcount
+        resultado = db.session.execute(stmt.execution_options(synchronize_session=False))
+        db.session.commit()
+        return resultado.rowcount
+
+
+
+# --- Versão do catálogo ---
+
+def _incrementar_catalogo(session):
+    """Uma vez por transação: o contador só é lido pelos outros depois do commit"""
+    if session.info.get('catalogo_alterado'):
+        return
+    session.info['catalogo_alterado'] = True
+    session.connection().execute(
+        db.update(CatalogoVersao.__table__).where(CatalogoVersao.id == 1)
+        .values(versao=CatalogoVersao.versao + 1, atualizado_em=db.func.now())
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _catalogo_no_flush(session, contexto):
+    alterados = itertools.chain(session.new, session.dirty, session.deleted)
+    if any(isinstance(obj, (Produto, Avaliacao)) for obj in alterados):
+        _incrementar_catalogo(session)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _catalogo_em_massa(estado):
+    # insert()/update()/delete() do ORM (registrar_voto, importação do catálogo) não passam pelo flush
+    if ((estado.is_insert or estado.is_update or estado.is_delete)
+            and any(m.class_ in (Produto, Avaliacao) for m in estado.all_mappers)):
+        _incrementar_catalogo(estado.session)
+
 
+@event.listens_for(Session, 'after_transaction_end')
+def _catalogo_fim_transacao(session, transacao):
+    session.info.pop('catalogo_alterado', None)
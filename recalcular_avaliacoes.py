@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""Reconstrói produto.rating_count/rating_sum a partir da tabela avaliacao.
+
+Use após importações manuais ou se os agregados ficarem inconsistentes:
+
+    python recalcular_avaliacoes.py
+"""
+from app import create_app
+from models import Avaliacao
+import sys
+import io
+
+# Configura encoding para UTF-8
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+app = create_app()
+
+with app.app_context():
+    total = Avaliacao.recalcular_agregados()
+    print(f"Agregados de avaliação recalculados para {total} produto(s).")
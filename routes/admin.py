@@ -1,8 +1,17 @@
+import io
+from datetime import datetime
 from functools import wraps
-from flask import Blueprint, render_template, redirect, url_for, session, request
-from models import db, UsuarioInfo, Produto, Avaliacao
-from sqlalchemy import func
-from utils import is_admin_user
+from flask import Blueprint, render_template, redirect, url_for, session, request, jsonify, Response, stream_with_context
+from models import db, UsuarioInfo, Produto
+from sqlalchemy import or_, and_
+from config import Config
+from utils import is_admin_user, invalidar_admins, matriculas_admin
+import catalogo
+import tabelas_admin
+
+# Colunas ordenáveis (?ordem=coluna ou -coluna); cada uma tem índice em (coluna, id)
+COLUNAS_USUARIOS = {'matricula': UsuarioInfo.matricula, 'nome': UsuarioInfo.nome, 'created_at': UsuarioInfo.created_at}
+COLUNAS_PRODUTOS = {'id': Produto.id, 'nome': Produto.nome, 'preco': Produto.preco, 'created_at': Produto.created_at}
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -28,12 +37,27 @@ def index():
 @admin_bp.route('/usuarios')
 @admin_required
 def usuarios():
-    usuarios_list = UsuarioInfo.query.order_by(UsuarioInfo.created_at.desc()).all()
-    from config import Config
-    # Marca quem é admin (config ou is_admin no banco)
-    for u in usuarios_list:
-        u._e_admin = (u.matricula in Config.ADMIN_MATRICULAS or getattr(u, 'is_admin', False))
-    return render_template('admin/usuarios.html', usuarios=usuarios_list)
+    """Usuários paginados, com filtro por matrícula/nome (prefixo) e admin"""
+    filtros = {chave: request.args.get(chave, '').strip() for chave in ('matricula', 'nome', 'admin')}
+    query = UsuarioInfo.query
+    if filtros['matricula']:
+        query = query.filter(tabelas_admin.filtro_prefixo(UsuarioInfo.matricula, filtros['matricula']))
+    if filtros['nome']:
+        query = query.filter(tabelas_admin.filtro_prefixo(UsuarioInfo.nome, filtros['nome']))
+    if filtros['admin'] in ('1', '0'):
+        # Admin = is_admin no banco ou matrícula em ADMIN_MATRICULAS
+        e_admin = or_(UsuarioInfo.is_admin.is_(True), UsuarioInfo.matricula.in_(sorted(Config.ADMIN_MATRICULAS)))
+        query = query.filter(e_admin if filtros['admin'] == '1'
+                             else and_(or_(UsuarioInfo.is_admin.is_(False), UsuarioInfo.is_admin.is_(None)),
+                                       UsuarioInfo.matricula.notin_(sorted(Config.ADMIN_MATRICULAS))))
+
+    ordem, descendente = tabelas_admin.ordenacao(request.args.get('ordem'), COLUNAS_USUARIOS, '-created_at')
+    usuarios_list, proximo_cursor = tabelas_admin.paginar(query, COLUNAS_USUARIOS, ordem, descendente,
+                                                          UsuarioInfo.id, request.args.get('cursor'))
+    total = tabelas_admin.contar(query, UsuarioInfo.id, 'usuario_info', any(filtros.values()))
+    return render_template('admin/usuarios.html', usuarios=usuarios_list, admins=matriculas_admin(),
+                           filtros=filtros, ordem=ordem, descendente=descendente, total=total,
+                           proximo_cursor=proximo_cursor, url_tabela=tabelas_admin.url_tabela)
 
 
 @admin_bp.route('/usuarios/<matricula>/toggle-admin', methods=['POST'])
@@ -44,26 +68,75 @@ def toggle_admin(matricula):
         return redirect(url_for('admin.usuarios'))
     usuario.is_admin = not getattr(usuario, 'is_admin', False)
     db.session.commit()
+    invalidar_admins()
     return redirect(url_for('admin.usuarios'))
 
 
 @admin_bp.route('/produtos')
 @admin_required
 def produtos():
-    produtos_list = Produto.query.order_by(Produto.created_at.desc()).all()
-    produto_ids = [p.id for p in produtos_list]
-    if produto_ids:
-        avaliacoes_data = db.session.query(
-            Avaliacao.produto_id,
-            func.count(Avaliacao.id).label('total'),
-            func.avg(Avaliacao.nota).label('media')
-        ).filter(Avaliacao.produto_id.in_(produto_ids)).group_by(Avaliacao.produto_id).all()
-        avaliacoes_dict = {pid: {'total': total, 'media': round(float(media), 1)}
-                           for pid, total, media in avaliacoes_data}
-    else:
-        avaliacoes_dict = {}
-    produtos_com_avaliacoes = []
-    for p in produtos_list:
-        av = avaliacoes_dict.get(p.id, {'total': 0, 'media': 0})
-        produtos_com_avaliacoes.append({'produto': p, 'media_avaliacao': av['media'], 'total_avaliacoes': av['total']})
-    return render_template('admin/produtos.html', produtos_com_avaliacoes=produtos_com_avaliacoes)
+    """Produtos paginados, com filtro por matrícula do dono/nome (prefixo), tipo e status"""
+    filtros = {chave: request.args.get(chave, '').strip() for chave in ('matricula', 'nome', 'tipo', 'status')}
+    query = Produto.query
+    if filtros['matricula']:
+        query = query.filter(tabelas_admin.filtro_prefixo(Produto.usuario_matricula, filtros['matricula']))
+    if filtros['nome']:
+        query = query.filter(tabelas_admin.filtro_prefixo(Produto.nome, filtros['nome']))
+    if filtros['tipo']:
+        query = query.filter(Produto.tipo == filtros['tipo'])
+    if filtros['status']:
+        query = query.filter(Produto.status == filtros['status'])
+
+    ordem, descendente = tabelas_admin.ordenacao(request.args.get('ordem'), COLUNAS_PRODUTOS, '-created_at')
+    produtos_list, proximo_cursor = tabelas_admin.paginar(query, COLUNAS_PRODUTOS, ordem, descendente,
+                                                          Produto.id, request.args.get('cursor'))
+    total = tabelas_admin.contar(query, Produto.id, 'produto', any(filtros.values()))
+    return render_template('admin/produtos.html', produtos=produtos_list, filtros=filtros,
+                           tipos=catalogo.TIPOS, status_produto=catalogo.STATUS,
+                           ordem=ordem, descendente=descendente, total=total,
+                           proximo_cursor=proximo_cursor, url_tabela=tabelas_admin.url_tabela)
+
+
+@admin_bp.route('/produtos/exportar')
+@admin_required
+def exportar_produtos():
+    """Catálogo completo em CSV ou JSONL, gerado aos pedaços (não monta o arquivo em memória)"""
+    formato = request.args.get('formato', 'csv')
+    if formato not in catalogo.FORMATOS:
+        return jsonify({'erro': f'Formato inválido. Use: {", ".join(catalogo.FORMATOS)}.'}), 400
+    nome = f"produtos-{datetime.now():%Y%m%d-%H%M%S}.{formato}"
+    return Response(
+        stream_with_context(catalogo.exportar(formato)),
+        content_type=catalogo.TIPOS_CONTEUDO[formato],
+        headers={'Content-Disposition': f'attachment; filename="{nome}"', 'Cache-Control': 'no-store'},
+    )
+
+
+@admin_bp.route('/produtos/importar', methods=['POST'])
+@admin_required
+def importar_produtos():
+    """Importa produtos de um CSV/JSONL enviado (campo 'arquivo'); responde um resumo em JSON"""
+    arquivo = request.files.get('arquivo')
+    if not arquivo or not arquivo.filename:
+        return jsonify({'erro': 'Envie um arquivo CSV ou JSONL.'}), 400
+    formato = request.form.get('formato') or arquivo.filename.rsplit('.', 1)[-1].lower()
+    if formato == 'ndjson':
+        formato = 'jsonl'
+    if formato not in catalogo.FORMATOS:
+        return jsonify({'erro': f'Formato inválido. Use: {", ".join(catalogo.FORMATOS)}.'}), 400
+    ignorar_invalidos = request.form.get('ignorar_invalidos') in ('1', 'on', 'true')
+
+    # utf-8-sig: aceita o BOM que planilhas costumam gravar no início do CSV
+    texto = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+    try:
+        resumo = catalogo.importar(texto, formato, ignorar_invalidos=ignorar_invalidos)
+    except catalogo.ImportacaoInvalida as e:
+        return jsonify({'erro': f'{e.total_erros} linha(s) inválida(s); nada foi importado.',
+                        'importados': 0, 'invalidos': e.total_erros,
+                        'erros': [{'linha': linha, 'mensagem': msg} for linha, msg in e.erros]}), 400
+    except UnicodeDecodeError:
+        return jsonify({'erro': 'O arquivo precisa estar em UTF-8.'}), 400
+    print(f"Importação de produtos por {session.get('matricula')}: {resumo['importados']} importados, "
+          f"{resumo['invalidos']} inválidos")
+    return jsonify({'importados': resumo['importados'], 'invalidos': resumo['invalidos'],
+                    'erros': [{'linha': linha, 'mensagem': msg} for linha, msg in resumo['erros']]})
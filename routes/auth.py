@@ -1,8 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session
+from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify, current_app
 from models import db, UsuarioInfo
-from utils import autenticar_suap, obter_dados_usuario_suap, salvar_info_usuario
+from utils import invalidar_estatisticas, obter_perfil_cache
 from config import Config
-from werkzeug.security import generate_password_hash, check_password_hash
+import login_pendente
+import senhas
+from sessoes import renovar_id
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -21,37 +23,27 @@ def login():
             
             if usuario_info and usuario_info.senha_hash:
                 # Login com senha local
-                if check_password_hash(usuario_info.senha_hash, senha):
+                if senhas.verificar_senha(usuario_info.senha_hash, senha):
+                    # Método/custo do hash mudou na configuração: refaz com a senha em mãos
+                    if senhas.precisa_rehash(usuario_info.senha_hash):
+                        usuario_info.senha_hash = senhas.gerar_hash(senha)
+                        db.session.commit()
+                    # Perfil e token ficam no UsuarioInfo; a sessão guarda só a matrícula
+                    renovar_id(session)
                     session['usuario_logado'] = True
                     session['matricula'] = matricula
-                    session['dados_usuario'] = {
-                        'nome_usual': usuario_info.nome,
-                        'nome': usuario_info.nome,
-                        'matricula': matricula
-                    }
-                    if usuario_info.jwt_token:
-                        session['token'] = usuario_info.jwt_token
                     return redirect(url_for('main.home'))
                 else:
                     return render_template('login.html', error='Senha incorreta.')
             else:
-                # Primeiro login - autentica com SUAP
-                resultado = autenticar_suap(matricula, senha)
-                
-                if resultado['sucesso']:
-                    if resultado.get('is_aluno'):
-                        # Redireciona para registro (criar senha local)
-                        session['registro_matricula'] = matricula
-                        session['registro_token'] = resultado.get('token')
-                        session['registro_dados'] = resultado.get('dados_usuario', {})
-                        return redirect(url_for('auth.registro'))
-                    else:
-                        return render_template('login.html', error='Acesso restrito apenas para alunos com matrícula ativa no IFRN')
-                else:
-                    erro = resultado.get('erro', 'Erro ao autenticar. Verifique suas credenciais.')
-                    if 'parse' in erro.lower() or 'cannot parse' in erro.lower():
-                        erro = 'Erro na comunicação com o SUAP. Por favor, tente novamente ou verifique suas credenciais.'
-                    return render_template('login.html', error=erro)
+                # Primeiro login - autentica com SUAP em segundo plano; a página consulta /login/status
+                pendente_id = login_pendente.iniciar(current_app._get_current_object(), matricula, senha)
+                if not pendente_id:
+                    return render_template('login.html', error='Muitos logins em andamento. Tente novamente em alguns instantes.')
+                session['login_pendente'] = pendente_id
+                return render_template('login.html', pendente=True)
+        except senhas.SenhasOcupado:
+            return render_template('login.html', error='Muitos logins em andamento. Tente novamente em alguns instantes.'), 503
         except Exception as e:
             print(f"Erro no login: {str(e)}")
             return render_template('login.html', error='Erro inesperado. Por favor, tente novamente.')
@@ -59,6 +51,34 @@ def login():
     return render_template('login.html')
 
 
+@auth_bp.route('/login/status')
+def login_status():
+    """Consultado pela página de login enquanto o SUAP autentica em segundo plano"""
+    pendente_id = session.get('login_pendente')
+    if not pendente_id:
+        return jsonify({'status': 'erro', 'erro': 'Nenhum login em andamento.'})
+
+    resultado = login_pendente.consultar(pendente_id)
+    if resultado is None:
+        return jsonify({'status': 'pendente'})
+    session.pop('login_pendente', None)
+
+    if resultado['sucesso']:
+        if resultado.get('is_aluno'):
+            # Redireciona para registro (criar senha local)
+            session['registro_matricula'] = resultado.get('matricula')
+            session['registro_token'] = resultado.get('token')
+            # O perfil completo não passa por login_pendente: já está no cache de perfis
+            session['registro_dados'] = obter_perfil_cache(resultado.get('matricula')) or {}
+            return jsonify({'status': 'ok', 'redirect': url_for('auth.registro')})
+        return jsonify({'status': 'erro', 'erro': 'Acesso restrito apenas para alunos com matrícula ativa no IFRN'})
+
+    erro = resultado.get('erro', 'Erro ao autenticar. Verifique suas credenciais.')
+    if 'parse' in erro.lower() or 'cannot parse' in erro.lower():
+        erro = 'Erro na comunicação com o SUAP. Por favor, tente novamente ou verifique suas credenciais.'
+    return jsonify({'status': 'erro', 'erro': erro})
+
+
 @auth_bp.route('/registro', methods=['GET', 'POST'])
 def registro():
     # Verifica se há dados de registro na sessão
@@ -104,7 +124,7 @@ def registro():
             if nome:
                 usuario_info.nome = nome
             usuario_info.jwt_token = token
-            usuario_info.senha_hash = generate_password_hash(senha)
+            usuario_info.senha_hash = senhas.gerar_hash(senha)
             
             # Salva curso e campus
             vinculo = dados_usuario.get('vinculo') or {}
@@ -125,6 +145,7 @@ def registro():
                 usuario_info.foto_url = foto
             
             db.session.commit()
+            invalidar_estatisticas()
             
             # Limpa dados de registro da sessão
             session.pop('registro_matricula', None)
@@ -132,12 +153,15 @@ def registro():
             session.pop('registro_dados', None)
             
             # Faz login automático
+            renovar_id(session)
             session['usuario_logado'] = True
             session['matricula'] = matricula
-            session['dados_usuario'] = dados_usuario
-            session['token'] = token
             
             return redirect(url_for('main.home'))
+        except senhas.SenhasOcupado:
+            db.session.rollback()
+            return render_template('registro.html', error='Servidor ocupado. Tente novamente em alguns instantes.',
+                                 matricula=matricula, dados_usuario=dados_usuario), 503
         except Exception as e:
             print(f"Erro no registro: {str(e)}")
             return render_template('registro.html', error='Erro ao criar conta. Por favor, tente novamente.', 
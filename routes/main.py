@@ -1,93 +1,58 @@
-from flask import Blueprint, render_template, redirect, url_for, session
-from models import Produto, UsuarioInfo, Avaliacao, db
-from sqlalchemy import func
-from utils import is_admin_user
+from flask import Blueprint, render_template, redirect, url_for, session, request
+from models import Produto
+from utils import is_admin_user, paginar_produtos, obter_estatisticas, perfil_atual
+from condicional import Validador
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
 def index():
     try:
-        # Otimização: Buscar todas as estatísticas em consultas mais eficientes
-        # Usar cache de contagem se disponível, ou consultas otimizadas
-        total_usuarios = db.session.query(func.count(UsuarioInfo.id)).scalar() or 0
-        total_produtos = db.session.query(func.count(Produto.id)).scalar() or 0
-        
-        # Buscar contagens de produtos por tipo em uma única consulta
-        produtos_stats = db.session.query(
-            Produto.tipo,
-            func.count(Produto.id)
-        ).filter_by(status='disponivel').group_by(Produto.tipo).all()
-        
-        produtos_venda = 0
-        produtos_troca = 0
-        for tipo, count in produtos_stats:
-            if tipo == 'venda':
-                produtos_venda = count
-            elif tipo == 'troca':
-                produtos_troca = count
+        # Página pública mais acessada: contadores vêm do cache em memória
+        estatisticas = obter_estatisticas()
     except Exception as e:
         # Se houver erro (banco não inicializado), usar valores padrão
         print(f"Erro ao buscar estatísticas: {e}")
-        total_usuarios = 0
-        total_produtos = 0
-        produtos_venda = 0
-        produtos_troca = 0
+        estatisticas = {
+            'total_usuarios': 0,
+            'total_produtos': 0,
+            'produtos_venda': 0,
+            'produtos_troca': 0
+        }
     
-    return render_template(
-        'index.html',
-        total_usuarios=total_usuarios,
-        total_produtos=total_produtos,
-        produtos_venda=produtos_venda,
-        produtos_troca=produtos_troca
-    )
+    return render_template('index.html', **estatisticas)
 
 @main_bp.route('/home')
 def home():
     if not session.get('usuario_logado'):
         return redirect(url_for('auth.login'))
     
-    # Buscar produtos disponíveis
-    produtos = Produto.query.filter_by(status='disponivel').all()
-    dados_usuario = session.get('dados_usuario', {})
-    
-    # Produtos com localização para o mapa
-    produtos_com_localizacao = [p for p in produtos if p.latitude and p.longitude]
-    
-    # Otimização: Buscar todas as avaliações de uma vez usando subquery/agregação
-    produto_ids = [p.id for p in produtos]
-    
-    if produto_ids:
-        # Buscar todas as avaliações de uma vez
-        avaliacoes_data = db.session.query(
-            Avaliacao.produto_id,
-            func.count(Avaliacao.id).label('total'),
-            func.avg(Avaliacao.nota).label('media')
-        ).filter(Avaliacao.produto_id.in_(produto_ids)).group_by(Avaliacao.produto_id).all()
-        
-        # Criar dicionário para acesso rápido
-        avaliacoes_dict = {prod_id: {'total': total, 'media': round(float(media), 1)} 
-                          for prod_id, total, media in avaliacoes_data}
-    else:
-        avaliacoes_dict = {}
+    # Nada mudou desde a última visita: 304 sem consultar a página nem renderizar
+    validador = Validador()
+    if not validador.modificado():
+        return validador.nao_modificado()
+
+    # Buscar uma página de produtos disponíveis (keyset em created_at, id)
+    produtos, proximo_cursor = paginar_produtos(
+        Produto.query.filter_by(status='disponivel'),
+        cursor=request.args.get('cursor'),
+        limite=request.args.get('limite', type=int)
+    )
     
-    # Montar lista de produtos com avaliações
-    produtos_com_avaliacoes = []
-    for produto in produtos:
-        aval_info = avaliacoes_dict.get(produto.id, {'total': 0, 'media': 0})
-        produtos_com_avaliacoes.append({
-            'produto': produto,
-            'media_avaliacao': aval_info['media'],
-            'total_avaliacoes': aval_info['total']
-        })
+    # Avaliações vêm dos agregados materializados em Produto (sem consulta extra)
+    produtos_com_avaliacoes = [{
+        'produto': produto,
+        'media_avaliacao': produto.media_avaliacao,
+        'total_avaliacoes': produto.rating_count
+    } for produto in produtos]
     
-    return render_template(
+    return validador.aplicar(render_template(
         'home.html',
         produtos=produtos,
         produtos_com_avaliacoes=produtos_com_avaliacoes,
-        produtos_mapa=produtos_com_localizacao,
-        usuario=dados_usuario,
+        proximo_cursor=proximo_cursor,
+        usuario=perfil_atual,
         is_admin=is_admin_user(),
         pode_criar=session.get('usuario_logado', False)
-    )
+    ))
 
@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session
+from flask import Blueprint, render_template, request, redirect, url_for, session, abort
 from models import db, UsuarioInfo, Produto
-from utils import obter_dados_usuario_suap, is_admin_user
+from config import Config
+import fotos_perfil
+from utils import obter_perfil_usuario, is_admin_user, usuario_atual, dados_usuario_atual, perfil_de_usuario_info
 
 perfil_bp = Blueprint('perfil', __name__)
 
@@ -9,9 +11,8 @@ def perfil():
     if not session.get('usuario_logado'):
         return redirect(url_for('auth.login'))
     
-    dados_usuario = session.get('dados_usuario', {})
     matricula = session.get('matricula')
-    info = UsuarioInfo.query.filter_by(matricula=matricula).first()
+    info = usuario_atual()
     
     if request.method == 'POST':
         telefone = request.form.get('telefone', '').strip()
@@ -22,14 +23,17 @@ def perfil():
         db.session.commit()
         return redirect(url_for('perfil.perfil'))
 
-    if not dados_usuario and session.get('token'):
-        token = session.get('token')
-        dados_usuario = obter_dados_usuario_suap(token)
-        if dados_usuario:
-            session['dados_usuario'] = dados_usuario
+    # Perfil completo do SUAP (cache local; ?atualizar=1 força nova leitura), senão o do UsuarioInfo
+    token = info.jwt_token if info else None
+    dados_usuario = None
+    if token:
+        dados_usuario = obter_perfil_usuario(matricula, token, atualizar=request.args.get('atualizar') == '1')
+    if not dados_usuario:
+        dados_usuario = dados_usuario_atual()
     
     telefone = info.telefone if info else ''
-    return render_template('perfil.html', usuario=dados_usuario, telefone=telefone, is_admin=is_admin_user())
+    return render_template('perfil.html', usuario=dados_usuario, telefone=telefone,
+                           pode_atualizar=bool(token), is_admin=is_admin_user())
 
 
 @perfil_bp.route('/usuarios/<matricula>', methods=['GET', 'POST'])
@@ -55,21 +59,11 @@ def usuario_publico(matricula):
     if not info and not produtos:
         return render_template('perfil.html', usuario=None, telefone='', is_admin=is_admin_user())
 
-    usuario = {}
     if info:
-        usuario['matricula'] = info.matricula
-        usuario['nome'] = info.nome
-        usuario['foto'] = info.foto_url
-        usuario['url_foto_150x200'] = info.foto_url
-        usuario['url_foto_75x100'] = info.foto_url
-        usuario['vinculo'] = {
-            'curso': {'nome': info.curso} if info.curso else None,
-            'campus': {'nome': info.campus} if info.campus else None
-        }
+        usuario = perfil_de_usuario_info(info)
     else:
         nome = produtos[0].usuario_nome if produtos else matricula
-        usuario['matricula'] = matricula
-        usuario['nome'] = nome
+        usuario = {'matricula': matricula, 'nome': nome}
 
     telefone = info.telefone if info else ''
 
@@ -81,3 +75,15 @@ def usuario_publico(matricula):
     )
 
 
+@perfil_bp.route('/fotos/<matricula>')
+def foto_perfil(matricula):
+    """Foto do SUAP baixada uma vez e servida daqui, redimensionada (?largura=75|150|300)"""
+    if not session.get('usuario_logado'):
+        abort(403)
+    largura = request.args.get('largura', 150, type=int)
+    if largura not in Config.FOTOS_PERFIL_LARGURAS or not fotos_perfil.MATRICULA_VALIDA.match(matricula):
+        abort(404)
+    resposta = fotos_perfil.resposta_foto(matricula, largura, request.args.get('v'))
+    if resposta is None:
+        abort(404)
+    return resposta
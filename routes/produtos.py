@@ -1,10 +1,36 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify, abort
 from models import db, Produto, Avaliacao
-from sqlalchemy import func
-from utils import is_admin_user
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from utils import is_admin_user, paginar_produtos, invalidar_estatisticas, perfil_atual, usuario_atual
+import math
+import busca
+import fotos
+import mapa
+from condicional import Validador
 
 produtos_bp = Blueprint('produtos', __name__)
 
+
+def _receber_foto():
+    """Salva a foto enviada no formulário (se houver); retorna (nome, erro)"""
+    arquivo = request.files.get('foto')
+    if not arquivo or not arquivo.filename:
+        return None, None
+    try:
+        return fotos.salvar_upload(arquivo), None
+    except fotos.FotoInvalida as e:
+        return None, str(e)
+
+
+@produtos_bp.errorhandler(413)
+def upload_grande_demais(e):
+    produto_id = (request.view_args or {}).get('produto_id')
+    produto = db.session.get(Produto, produto_id) if produto_id else None
+    mensagem = f'A foto deve ter no máximo {Config.FOTOS_TAMANHO_MAX // (1024 * 1024)} MB.'
+    return render_template('produto_form.html', error=mensagem, produto=produto,
+                           acao='editar' if produto else 'novo'), 413
+
 @produtos_bp.route('/produtos/novo', methods=['GET', 'POST'])
 def novo_produto():
     if not session.get('usuario_logado'):
@@ -41,8 +67,12 @@ def novo_produto():
             except ValueError:
                 pass
 
-        dados_usuario = session.get('dados_usuario', {})
-        nome_usuario = dados_usuario.get('nome_usual') or dados_usuario.get('nome') or 'Usuário'
+        foto, erro_foto = _receber_foto()
+        if erro_foto:
+            return render_template('produto_form.html', error=erro_foto, produto=None, acao='novo')
+
+        info = usuario_atual()
+        nome_usuario = (info.nome if info else None) or 'Usuário'
         matricula_usuario = session.get('matricula')
 
         produto = Produto(
@@ -54,10 +84,14 @@ def novo_produto():
             tipo=tipo,
             endereco=endereco if endereco else None,
             latitude=lat_val,
-            longitude=lon_val
+            longitude=lon_val,
+            foto=foto
         )
         db.session.add(produto)
+        db.session.flush()
+        busca.indexar_produto(produto)
         db.session.commit()
+        invalidar_estatisticas()
         return redirect(url_for('produtos.meus_produtos'))
 
     return render_template('produto_form.html', produto=None, acao='novo')
@@ -69,40 +103,24 @@ def meus_produtos():
         return redirect(url_for('auth.login'))
     
     matricula = session.get('matricula')
+    validador = Validador()
+    if not validador.modificado():
+        return validador.nao_modificado()
     produtos = Produto.query.filter_by(usuario_matricula=matricula).order_by(Produto.created_at.desc()).all()
     
-    # Otimização: Buscar todas as avaliações de uma vez
-    produto_ids = [p.id for p in produtos]
-    
-    if produto_ids:
-        avaliacoes_data = db.session.query(
-            Avaliacao.produto_id,
-            func.count(Avaliacao.id).label('total'),
-            func.avg(Avaliacao.nota).label('media')
-        ).filter(Avaliacao.produto_id.in_(produto_ids)).group_by(Avaliacao.produto_id).all()
-        
-        avaliacoes_dict = {prod_id: {'total': total, 'media': round(float(media), 1)} 
-                          for prod_id, total, media in avaliacoes_data}
-    else:
-        avaliacoes_dict = {}
+    # Avaliações vêm dos agregados materializados em Produto (sem consulta extra)
+    produtos_com_avaliacoes = [{
+        'produto': produto,
+        'media_avaliacao': produto.media_avaliacao,
+        'total_avaliacoes': produto.rating_count
+    } for produto in produtos]
     
-    # Montar lista de produtos com avaliações
-    produtos_com_avaliacoes = []
-    for produto in produtos:
-        aval_info = avaliacoes_dict.get(produto.id, {'total': 0, 'media': 0})
-        produtos_com_avaliacoes.append({
-            'produto': produto,
-            'media_avaliacao': aval_info['media'],
-            'total_avaliacoes': aval_info['total']
-        })
-    
-    dados_usuario = session.get('dados_usuario', {})
-    return render_template(
+    return validador.aplicar(render_template(
         'meus_produtos.html',
         produtos_com_avaliacoes=produtos_com_avaliacoes,
-        usuario=dados_usuario,
+        usuario=perfil_atual,
         is_admin=is_admin_user()
-    )
+    ))
 
 
 @produtos_bp.route('/produtos/<int:produto_id>/editar', methods=['GET', 'POST'])
@@ -149,6 +167,14 @@ def editar_produto(produto_id):
             except ValueError:
                 pass
 
+        foto, erro_foto = _receber_foto()
+        if erro_foto:
+            return render_template('produto_form.html', error=erro_foto, produto=produto, acao='editar')
+        if foto:
+            produto.foto = foto
+        elif request.form.get('remover_foto'):
+            produto.foto = None
+
         produto.nome = nome
         produto.preco = preco_valor
         produto.descricao = descricao
@@ -156,7 +182,9 @@ def editar_produto(produto_id):
         produto.endereco = endereco if endereco else None
         produto.latitude = lat_val
         produto.longitude = lon_val
+        busca.indexar_produto(produto)
         db.session.commit()
+        invalidar_estatisticas()
         return redirect(url_for('produtos.meus_produtos'))
 
     return render_template('produto_form.html', produto=produto, acao='editar')
@@ -174,24 +202,49 @@ def excluir_produto(produto_id):
     if not is_admin_user() and produto.usuario_matricula != matricula:
         return redirect(url_for('main.home'))
 
+    busca.remover_produto(produto.id)
     db.session.delete(produto)
     db.session.commit()
+    invalidar_estatisticas()
     return redirect(url_for('produtos.meus_produtos'))
 
 
+@produtos_bp.route('/produtos/fotos/<nome>')
+def foto_produto(nome):
+    """Foto original; o nome é o hash do conteúdo, então pode ficar em cache para sempre"""
+    if not fotos.foto_existe(nome):
+        abort(404)
+    return fotos.resposta_original(nome)
+
+
+@produtos_bp.route('/produtos/fotos/<nome>/<int:largura>.<formato>')
+def miniatura_produto(nome, largura, formato):
+    if (largura not in Config.FOTOS_LARGURAS or formato not in fotos.FORMATOS_MINIATURA
+            or not fotos.foto_existe(nome)):
+        abort(404)
+    return fotos.resposta_miniatura(nome, largura, formato)
+
+
 @produtos_bp.route('/venda')
 def venda():
     if not session.get('usuario_logado'):
         return redirect(url_for('auth.login'))
     
-    produtos = Produto.query.filter_by(tipo='venda', status='disponivel').all()
-    dados_usuario = session.get('dados_usuario', {})
-    return render_template(
+    validador = Validador()
+    if not validador.modificado():
+        return validador.nao_modificado()
+    produtos, proximo_cursor = paginar_produtos(
+        Produto.query.filter_by(tipo='venda', status='disponivel'),
+        cursor=request.args.get('cursor'),
+        limite=request.args.get('limite', type=int)
+    )
+    return validador.aplicar(render_template(
         'venda.html',
         produtos=produtos,
-        usuario=dados_usuario,
+        proximo_cursor=proximo_cursor,
+        usuario=perfil_atual,
         is_admin=is_admin_user()
-    )
+    ))
 
 
 @produtos_bp.route('/troca')
@@ -199,14 +252,104 @@ def troca():
     if not session.get('usuario_logado'):
         return redirect(url_for('auth.login'))
     
-    produtos = Produto.query.filter_by(tipo='troca', status='disponivel').all()
-    dados_usuario = session.get('dados_usuario', {})
-    return render_template(
+    validador = Validador()
+    if not validador.modificado():
+        return validador.nao_modificado()
+    produtos, proximo_cursor = paginar_produtos(
+        Produto.query.filter_by(tipo='troca', status='disponivel'),
+        cursor=request.args.get('cursor'),
+        limite=request.args.get('limite', type=int)
+    )
+    return validador.aplicar(render_template(
         'troca.html',
         produtos=produtos,
-        usuario=dados_usuario,
+        proximo_cursor=proximo_cursor,
+        usuario=perfil_atual,
         is_admin=is_admin_user()
+    ))
+
+
+@produtos_bp.route('/api/produtos')
+def api_produtos():
+    """Mesmas páginas de /home, /venda e /troca em JSON (rolagem infinita)"""
+    if not session.get('usuario_logado'):
+        return jsonify({'erro': 'Usuário não autenticado'}), 401
+
+    filtros = [Produto.status == 'disponivel']
+    tipo = request.args.get('tipo', '').strip()
+    if tipo:
+        filtros.append(Produto.tipo == tipo)
+    validador = Validador()
+    if not validador.modificado():
+        return validador.nao_modificado()
+    query = Produto.query.filter(*filtros)
+
+    produtos, proximo_cursor = paginar_produtos(
+        query,
+        cursor=request.args.get('cursor'),
+        limite=request.args.get('limite', type=int)
     )
+    return validador.aplicar(jsonify({
+        'produtos': [p.to_dict() for p in produtos],
+        'proximo_cursor': proximo_cursor
+    }))
+
+
+@produtos_bp.route('/produtos/busca')
+def busca_produtos():
+    if not session.get('usuario_logado'):
+        return redirect(url_for('auth.login'))
+
+    q = request.args.get('q', '').strip()
+    tipo = request.args.get('tipo', '').strip() or None
+    pagina = request.args.get('pagina', 1, type=int)
+    produtos, tem_mais = busca.buscar_produtos(q, tipo=tipo, pagina=pagina)
+    return render_template(
+        'busca.html',
+        produtos=produtos,
+        q=q,
+        tipo=tipo,
+        pagina=pagina,
+        tem_mais=tem_mais,
+        usuario=perfil_atual,
+        is_admin=is_admin_user()
+    )
+
+
+@produtos_bp.route('/api/produtos/busca')
+def api_busca_produtos():
+    if not session.get('usuario_logado'):
+        return jsonify({'erro': 'Usuário não autenticado'}), 401
+
+    pagina = request.args.get('pagina', 1, type=int)
+    produtos, tem_mais = busca.buscar_produtos(
+        request.args.get('q', '').strip(),
+        tipo=request.args.get('tipo', '').strip() or None,
+        pagina=pagina,
+        limite=request.args.get('limite', type=int)
+    )
+    return jsonify({
+        'produtos': [p.to_dict() for p in produtos],
+        'pagina': pagina,
+        'tem_mais': tem_mais
+    })
+
+
+@produtos_bp.route('/api/produtos/mapa')
+def api_mapa_produtos():
+    """GeoJSON dos produtos no viewport (?bbox=minLon,minLat,maxLon,maxLat&zoom=)"""
+    if not session.get('usuario_logado'):
+        return jsonify({'erro': 'Usuário não autenticado'}), 401
+
+    bbox = mapa.parse_bbox(request.args.get('bbox'))
+    if not bbox:
+        return jsonify({'erro': 'Parâmetro bbox inválido.'}), 400
+    zoom = request.args.get('zoom', 13, type=float)
+    # float() aceita 'nan' e 'inf', que quebrariam int(zoom) em mapa.py
+    if not math.isfinite(zoom):
+        return jsonify({'erro': 'Parâmetro zoom inválido.'}), 400
+    tipo = request.args.get('tipo', '').strip() or None
+    return jsonify(mapa.produtos_no_viewport(bbox, zoom, tipo=tipo))
 
 
 @produtos_bp.route('/produtos/<int:produto_id>/avaliar', methods=['POST'])
@@ -233,9 +376,11 @@ def avaliar_produto(produto_id):
         return jsonify({'erro': 'Nota inválida. Deve ser entre 1 e 5.'}), 400
     
     if avaliacao_existente:
+        Avaliacao.registrar_voto(produto_id, nota, nota_anterior=avaliacao_existente.nota)
         avaliacao_existente.nota = nota
         avaliacao_existente.comentario = comentario
     else:
+        Avaliacao.registrar_voto(produto_id, nota)
         avaliacao = Avaliacao(
             produto_id=produto_id,
             avaliador_matricula=matricula,
@@ -244,15 +389,18 @@ def avaliar_produto(produto_id):
         )
         db.session.add(avaliacao)
     
-    db.session.commit()
-    
-    total_avaliacoes = Avaliacao.query.filter_by(produto_id=produto_id).count()
-    soma_notas = sum(av.nota for av in Avaliacao.query.filter_by(produto_id=produto_id).all())
-    media = round(soma_notas / total_avaliacoes, 1) if total_avaliacoes > 0 else 0
+    # Avaliação e agregados do produto no mesmo commit
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Voto simultâneo do mesmo usuário (índice único produto/avaliador)
+        db.session.rollback()
+        return jsonify({'erro': 'Avaliação já registrada. Tente novamente.'}), 409
+    db.session.refresh(produto)
     
     return jsonify({
         'sucesso': True,
-        'media': media,
-        'total_avaliacoes': total_avaliacoes
+        'media': produto.media_avaliacao,
+        'total_avaliacoes': produto.rating_count
     })
 
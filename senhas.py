@@ -0,0 +1,78 @@
+"""Hash de senhas locais fora da thread da requisição.
+
+Os hashes rodam em um pool de processos limitado (HASH_WORKERS), com controle de
+admissão: no máximo HASH_FILA_MAX hashes em andamento por worker; quem não conseguir
+vaga em HASH_ESPERA_MAX segundos recebe SenhasOcupado, em vez de enfileirar e
+deixar o catálogo sem CPU durante picos de login.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+
+
+class SenhasOcupado(Exception):
+    """Fila de hash cheia; a requisição deve ser recusada (tente novamente)"""
+
+
+_vagas = threading.BoundedSemaphore(Config.HASH_FILA_MAX)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _obter_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn': o worker do gunicorn tem threads, e fork com threads pode travar
+            _pool = ProcessPoolExecutor(max_workers=Config.HASH_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _executar(funcao, *args):
+    if not _vagas.acquire(timeout=Config.HASH_ESPERA_MAX):
+        raise SenhasOcupado('Muitas verificações de senha em andamento')
+    try:
+        if Config.HASH_WORKERS <= 0:
+            return funcao(*args)
+        pool = _obter_pool()
+        try:
+            return pool.submit(funcao, *args).result()
+        except BrokenProcessPool:
+            # Um processo morreu (OOM, kill): descarta o pool para o próximo hash recriá-lo
+            _descartar_pool(pool)
+            raise
+    finally:
+        _vagas.release()
+
+
+def gerar_hash(senha):
+    """Gera o hash com o método/custo configurado em PASSWORD_HASH_METHOD"""
+    return _executar(generate_password_hash, senha, Config.PASSWORD_HASH_METHOD)
+
+
+def verificar_senha(senha_hash, senha):
+    return _executar(check_password_hash, senha_hash, senha)
+
+
+@lru_cache(maxsize=None)
+def _prefixo_metodo(metodo):
+    # O werkzeug completa os parâmetros padrão (ex.: 'scrypt' -> 'scrypt:32768:8:1')
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+
+def precisa_rehash(senha_hash):
+    """True se o hash foi gerado com método/custo diferente do configurado"""
+    return senha_hash.split('$', 1)[0] != _prefixo_metodo(Config.PASSWORD_HASH_METHOD)
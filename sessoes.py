@@ -0,0 +1,116 @@
+"""Sessão do Flask guardada no banco (tabela sessao).
+
+O cookie carrega apenas um id aleatório; os dados (matrícula, token do SUAP,
+dados temporários do registro) ficam no servidor. No banco é gravado o SHA-256
+do id, então uma cópia da tabela não permite assumir sessões. A linha só é
+regravada quando a sessão muda ou quando falta pouco para expirar.
+"""
+import hashlib
+import random
+import secrets
+from datetime import datetime, timedelta, timezone
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from sqlalchemy import delete, insert, select, update
+from werkzeug.datastructures import CallbackDict
+from models import db, Sessao
+
+# Fração das gravações que também apagam sessões expiradas
+LIMPEZA_PROBABILIDADE = 0.01
+
+
+def _agora_utc():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _chave(sid):
+    return hashlib.sha256(sid.encode('ascii')).hexdigest()
+
+
+class SessaoServidor(CallbackDict, SessionMixin):
+    def __init__(self, dados=None, sid=None, expira_em=None):
+        def ao_alterar(self):
+            self.modified = True
+        super().__init__(dados, ao_alterar)
+        self.sid = sid
+        self.expira_em = expira_em
+        self.modified = False
+        self.renovar_id = False
+
+
+class SessaoBancoInterface(SessionInterface):
+    serializer = session_json_serializer
+
+    def _tabela(self):
+        return Sessao.__table__
+
+    def open_session(self, app, request):
+        # Arquivos estáticos não usam sessão: evita uma consulta por imagem/CSS
+        if app.static_url_path and request.path.startswith(app.static_url_path + '/'):
+            return SessaoServidor()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid:
+            return SessaoServidor()
+        tabela = self._tabela()
+        with db.engine.connect() as conn:
+            linha = conn.execute(
+                select(tabela.c.dados, tabela.c.expira_em).where(tabela.c.id == _chave(sid))
+            ).first()
+        if linha is None or linha.expira_em < _agora_utc():
+            return SessaoServidor()
+        try:
+            dados = self.serializer.loads(linha.dados)
+        except ValueError:
+            return SessaoServidor()
+        return SessaoServidor(dados, sid=sid, expira_em=linha.expira_em)
+
+    def save_session(self, app, session, response):
+        nome = self.get_cookie_name(app)
+        dominio = self.get_cookie_domain(app)
+        caminho = self.get_cookie_path(app)
+        tabela = self._tabela()
+
+        if not session:
+            # Sessão esvaziada (logout): remove do banco e do navegador
+            if session.sid:
+                with db.engine.begin() as conn:
+                    conn.execute(delete(tabela).where(tabela.c.id == _chave(session.sid)))
+                response.delete_cookie(nome, domain=dominio, path=caminho)
+            return
+
+        agora = _agora_utc()
+        duracao = app.permanent_session_lifetime
+        expira_em = agora + duracao
+        quase_expirando = session.expira_em is not None and session.expira_em - agora < duracao / 2
+        if not (session.modified or session.renovar_id or session.sid is None or quase_expirando):
+            return
+
+        dados = self.serializer.dumps(dict(session))
+        with db.engine.begin() as conn:
+            if session.sid and not session.renovar_id:
+                conn.execute(update(tabela).where(tabela.c.id == _chave(session.sid))
+                             .values(dados=dados, expira_em=expira_em))
+            else:
+                # Nova sessão, ou troca de id após login (evita fixação de sessão)
+                if session.sid:
+                    conn.execute(delete(tabela).where(tabela.c.id == _chave(session.sid)))
+                session.sid = secrets.token_urlsafe(32)
+                conn.execute(insert(tabela).values(id=_chave(session.sid), dados=dados, expira_em=expira_em))
+            if random.random() < LIMPEZA_PROBABILIDADE:
+                conn.execute(delete(tabela).where(tabela.c.expira_em < agora))
+        session.expira_em = expira_em
+
+        response.set_cookie(
+            nome,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=dominio,
+            path=caminho,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def renovar_id(sessao):
+    """Marca a sessão para receber um novo id ao ser salva (chamar após autenticar)"""
+    sessao.renovar_id = True
@@ -0,0 +1,223 @@
+"""SUAP falso para desenvolvimento offline e testes de carga do login.
+
+Implementa o que o app usa da API do SUAP: POST /api/token/pair, os endpoints de
+dados (/api/rh/eu/ e os fallbacks de utils.SUAP_ENDPOINTS_DADOS) e as fotos de
+perfil. Qualquer matrícula entra com a senha configurada (--senha).
+
+Falhas e latência são injetadas por requisição, com sorteio reproduzível (--semente):
+
+    python suap_falso.py --porta 8001 --latencia 80 --latencia-p99 600 --taxa-5xx 0.05 --taxa-timeout 0.01
+    SUAP_API_BASE_URL=http://localhost:8001 python app.py
+
+--desativar /api/rh/eu/ responde 404 nesse endpoint (exercita a sondagem dos fallbacks).
+A configuração pode ser trocada com o servidor no ar: POST /_falso/config (JSON com
+os mesmos nomes, ex.: {"taxa_5xx": 0.5}); GET /_falso/estatisticas mostra os contadores.
+"""
+import argparse
+import math
+import random
+import secrets
+import threading
+import time
+from io import BytesIO
+from flask import Flask, request, jsonify, Response, abort
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional: sem ele, /media/fotos responde 404
+    Image = None
+
+ENDPOINTS_DADOS = (
+    '/api/rh/eu/',
+    '/api/ensino/meus-dados-aluno/',
+    '/api/rh/meus-dados/',
+    '/api/v2/rh/eu/',
+    '/api/v2/ensino/meus-dados-aluno/',
+    '/api/v2/rh/meus-dados/',
+)
+
+PADRAO = {
+    'senha': 'senha',
+    'latencia': 0.0,  # mediana, em ms
+    'latencia_p99': 0.0,  # p99 em ms; acima da mediana = distribuição log-normal
+    'taxa_401': 0.0,
+    'taxa_404': 0.0,
+    'taxa_5xx': 0.0,
+    'taxa_timeout': 0.0,
+    'duracao_timeout': 30.0,  # segundos "pendurado" antes de responder 504
+    'desativados': [],
+}
+Z_99 = 2.3263  # quantil 0,99 da normal padrão
+
+
+class Injetor:
+    """Sorteia latência e falha de cada requisição (thread-safe, reproduzível pela semente)"""
+
+    def __init__(self, semente=None, **opcoes):
+        self._lock = threading.Lock()
+        self._aleatorio = random.Random(semente)
+        self.opcoes = dict(PADRAO)
+        self.estatisticas = {}
+        self.configurar(**opcoes)
+
+    def configurar(self, **opcoes):
+        desconhecidas = set(opcoes) - set(PADRAO)
+        if desconhecidas:
+            raise ValueError(f"Opções desconhecidas: {', '.join(sorted(desconhecidas))}")
+        with self._lock:
+            self.opcoes.update(opcoes)
+        return dict(self.opcoes)
+
+    def contar(self, chave):
+        with self._lock:
+            self.estatisticas[chave] = self.estatisticas.get(chave, 0) + 1
+
+    def sortear(self):
+        """(latência em segundos, falha) com falha em None, 'timeout', 401, 404 ou 5xx"""
+        with self._lock:
+            o = self.opcoes
+            latencia = o['latencia'] / 1000
+            if latencia > 0 and o['latencia_p99'] > o['latencia']:
+                sigma = math.log(o['latencia_p99'] / o['latencia']) / Z_99
+                latencia = self._aleatorio.lognormvariate(math.log(latencia), sigma)
+            sorteio = self._aleatorio.random()
+            for falha, taxa in (('timeout', o['taxa_timeout']), (401, o['taxa_401']),
+                                (404, o['taxa_404']), ('5xx', o['taxa_5xx'])):
+                if sorteio < taxa:
+                    if falha == '5xx':
+                        falha = self._aleatorio.choice((500, 502, 503, 504))
+                    return latencia, falha
+                sorteio -= taxa
+            return latencia, None
+
+
+def _perfil(matricula, base_url):
+    return {
+        'matricula': matricula,
+        'nome_usual': f'Aluno {matricula[-4:]}',
+        'nome_registro': f'Aluno de Teste {matricula}',
+        'email': f'{matricula}@escolar.ifrn.edu.br',
+        'tipo_vinculo': 'Aluno',
+        'url_foto_75x100': f'{base_url}/media/fotos/75x100/{matricula}.jpg',
+        'url_foto_150x200': f'{base_url}/media/fotos/150x200/{matricula}.jpg',
+        'vinculo': {
+            'matricula': matricula,
+            'situacao': 'Matriculado',
+            'curso': {'nome': 'Tecnologia em Análise e Desenvolvimento de Sistemas'},
+            'campus': {'nome': 'Natal-Central'},
+        },
+    }
+
+
+def _foto(matricula, largura, altura):
+    """JPEG pequeno com cor derivada da matrícula (a mesma matrícula sempre gera a mesma foto)"""
+    semente = sum(ord(c) for c in matricula)
+    cor = (semente * 37 % 256, semente * 91 % 256, semente * 53 % 256)
+    saida = BytesIO()
+    Image.new('RGB', (largura, altura), cor).save(saida, 'JPEG', quality=80)
+    return saida.getvalue()
+
+
+def criar_app(semente=None, **opcoes):
+    """App Flask do SUAP falso; `opcoes` usa os nomes de PADRAO"""
+    app = Flask(__name__)
+    injetor = Injetor(semente, **opcoes)
+    app.extensions['suap_falso'] = injetor
+    tokens = {}
+    tokens_lock = threading.Lock()
+
+    @app.before_request
+    def injetar_falhas():
+        if request.path.startswith('/_falso/'):
+            return None
+        injetor.contar('requisicoes')
+        latencia, falha = injetor.sortear()
+        if falha == 'timeout':
+            injetor.contar('timeout')
+            time.sleep(injetor.opcoes['duracao_timeout'])
+            return jsonify({'detail': 'Gateway Timeout (simulado)'}), 504
+        if latencia > 0:
+            time.sleep(latencia)
+        if falha is not None:
+            injetor.contar(str(falha))
+            return jsonify({'detail': f'Erro {falha} simulado'}), falha
+        if request.path in injetor.opcoes['desativados']:
+            injetor.contar('404')
+            return jsonify({'detail': 'Não encontrado.'}), 404
+        return None
+
+    @app.route('/api/token/pair', methods=['POST'])
+    def token_pair():
+        dados = request.get_json(silent=True) or request.form
+        matricula = str(dados.get('username', '')).strip()
+        senha = str(dados.get('password', '')).strip()
+        if not matricula or senha != injetor.opcoes['senha']:
+            injetor.contar('401')
+            return jsonify({'detail': 'Usuário e/ou senha incorreto(s)'}), 401
+        access = secrets.token_urlsafe(24)
+        with tokens_lock:
+            tokens[access] = matricula
+        injetor.contar('logins')
+        return jsonify({'access': access, 'refresh': secrets.token_urlsafe(24)})
+
+    def dados_usuario():
+        autorizacao = request.headers.get('Authorization', '')
+        with tokens_lock:
+            matricula = tokens.get(autorizacao[7:]) if autorizacao.startswith('Bearer ') else None
+        if matricula is None:
+            injetor.contar('401')
+            return jsonify({'detail': 'Token inválido ou expirado'}), 401
+        return jsonify(_perfil(matricula, request.host_url.rstrip('/')))
+
+    for caminho in ENDPOINTS_DADOS:
+        app.add_url_rule(caminho, f'dados_{caminho.strip("/").replace("/", "_")}', dados_usuario)
+
+    @app.route('/media/fotos/<int:largura>x<int:altura>/<matricula>.jpg')
+    def foto(largura, altura, matricula):
+        if Image is None or largura > 600 or altura > 800:
+            abort(404)
+        return Response(_foto(matricula, largura, altura), mimetype='image/jpeg')
+
+    @app.route('/_falso/config', methods=['GET', 'POST'])
+    def configurar():
+        if request.method == 'POST':
+            try:
+                return jsonify(injetor.configurar(**(request.get_json(silent=True) or {})))
+            except ValueError as e:
+                return jsonify({'erro': str(e)}), 400
+        return jsonify(injetor.opcoes)
+
+    @app.route('/_falso/estatisticas')
+    def estatisticas():
+        return jsonify(injetor.estatisticas)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8001)
+    parser.add_argument('--senha', default=PADRAO['senha'], help='senha aceita para qualquer matrícula')
+    parser.add_argument('--latencia', type=float, default=0, help='latência mediana (ms)')
+    parser.add_argument('--latencia-p99', type=float, default=0, help='latência p99 (ms); cauda log-normal')
+    parser.add_argument('--taxa-401', type=float, default=0, help='fração de respostas 401')
+    parser.add_argument('--taxa-404', type=float, default=0, help='fração de respostas 404')
+    parser.add_argument('--taxa-5xx', type=float, default=0, help='fração de respostas 500/502/503/504')
+    parser.add_argument('--taxa-timeout', type=float, default=0, help='fração de requisições que ficam penduradas')
+    parser.add_argument('--duracao-timeout', type=float, default=30, help='segundos pendurado antes do 504')
+    parser.add_argument('--desativar', nargs='*', default=[], choices=ENDPOINTS_DADOS,
+                        help='endpoints de dados que respondem 404')
+    parser.add_argument('--semente', type=int, default=None, help='semente do sorteio (reproduzível)')
+    args = parser.parse_args()
+
+    app = criar_app(args.semente, senha=args.senha, latencia=args.latencia, latencia_p99=args.latencia_p99,
+                    taxa_401=args.taxa_401, taxa_404=args.taxa_404, taxa_5xx=args.taxa_5xx,
+                    taxa_timeout=args.taxa_timeout, duracao_timeout=args.duracao_timeout,
+                    desativados=args.desativar)
+    print(f"SUAP falso em http://{args.host}:{args.porta} (senha: {args.senha!r})")
+    app.run(host=args.host, port=args.porta, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
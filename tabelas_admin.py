@@ -0,0 +1,144 @@
+"""Paginação, ordenação e contagem das tabelas da área admin.
+
+A paginação é por keyset em (coluna ordenada, id), como nas listagens públicas
+(utils.paginar_produtos): cada página custa o mesmo, sem OFFSET, desde que exista
+índice em (coluna, id). A contagem é exata até ADMIN_CONTAGEM_EXATA_MAX; acima
+disso vira estimativa (tabela sem filtro) ou "mais de N" (com filtro).
+"""
+import base64
+import json
+from datetime import datetime
+from flask import request, url_for
+from sqlalchemy import and_, func, or_, select, text, literal
+from config import Config
+from models import db
+
+
+def ordenacao(valor, colunas, padrao):
+    """Interpreta ?ordem=coluna ou ?ordem=-coluna (decrescente); retorna (nome, descendente)"""
+    valor = valor or padrao
+    descendente = valor.startswith('-')
+    nome = valor.lstrip('-')
+    if nome not in colunas:
+        return ordenacao(padrao, colunas, padrao)
+    return nome, descendente
+
+
+def filtro_prefixo(coluna, valor):
+    """coluna LIKE 'valor%' (usa o índice da coluna; curingas digitados são tratados como texto)"""
+    escapado = valor.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return coluna.like(f'{escapado}%', escape='\\')
+
+
+def _codificar(ordem, valor, ultimo_id):
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    bruto = json.dumps([ordem, valor, ultimo_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def _decodificar(cursor, ordem, coluna):
+    """(valor, id) do cursor, ou None se inválido ou gerado para outra ordenação"""
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        ordem_cursor, valor, ultimo_id = json.loads(bruto)
+        if ordem_cursor != ordem or not isinstance(ultimo_id, int):
+            return None
+        if valor is not None and coluna.type.python_type is datetime:
+            valor = datetime.fromisoformat(valor)
+        return valor, ultimo_id
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+
+def paginar(query, colunas, ordem, descendente, chave, cursor=None, limite=None):
+    """Uma página da consulta ordenada por (colunas[ordem], chave).
+
+    Retorna (itens, proximo_cursor). Colunas que aceitam NULL seguem a ordem do
+    SQLite/MySQL: NULL primeiro em ordem crescente e por último em decrescente.
+    """
+    limite = max(1, limite or Config.ADMIN_POR_PAGINA)
+    coluna = colunas[ordem]
+    nome_ordem = f"{'-' if descendente else ''}{ordem}"
+    posicao = _decodificar(cursor, nome_ordem, coluna)
+
+    if posicao:
+        valor, ultimo_id = posicao
+        depois_id = chave < ultimo_id if descendente else chave > ultimo_id
+        if coluna is chave:
+            query = query.filter(depois_id)
+        elif valor is None:
+            # Ainda no bloco de NULLs: no crescente vêm antes de todo o resto; no decrescente, por último
+            query = query.filter(and_(coluna.is_(None), depois_id) if descendente
+                                 else or_(coluna.isnot(None), and_(coluna.is_(None), depois_id)))
+        else:
+            # Valor lido pela PK (não depende do formato de data do driver), com o do cursor de reserva
+            referencia = func.coalesce(select(coluna).where(chave == ultimo_id).scalar_subquery(),
+                                       literal(valor, coluna.type))
+            if descendente:
+                seguintes = [coluna < referencia, and_(coluna == referencia, depois_id)]
+                if coluna.expression.nullable:
+                    seguintes.append(coluna.is_(None))
+                query = query.filter(or_(*seguintes))
+            else:
+                query = query.filter(or_(coluna > referencia, and_(coluna == referencia, depois_id)))
+
+    if coluna is chave:
+        criterio = [chave.desc() if descendente else chave.asc()]
+    elif descendente:
+        criterio = [coluna.desc(), chave.desc()]
+    else:
+        criterio = [coluna.asc(), chave.asc()]
+    itens = query.order_by(*criterio).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        ultimo = itens[-1]
+        proximo_cursor = _codificar(nome_ordem, getattr(ultimo, coluna.key), getattr(ultimo, chave.key))
+    return itens, proximo_cursor
+
+
+def _estimativa_tabela(tabela):
+    """Total aproximado de linhas da tabela sem varrê-la (None se o banco não oferece)"""
+    dialeto = db.session.get_bind().dialect.name
+    if dialeto == 'mysql':
+        return db.session.execute(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela"
+        ), {'tabela': tabela}).scalar()
+    if dialeto == 'sqlite':
+        # Estatística do ANALYZE, se houver; senão a faixa de rowids (dois saltos no B-tree)
+        existe = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")).scalar()
+        if existe:
+            stat = db.session.execute(text(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = :tabela AND idx IS NULL"), {'tabela': tabela}).scalar()
+            if stat:
+                return int(stat.split()[0])
+        return db.session.execute(text(f"SELECT MAX(rowid) - MIN(rowid) + 1 FROM {tabela}")).scalar()
+    return None
+
+
+def contar(query, chave, tabela, filtrado):
+    """Total para o cabeçalho da tabela: (número, tipo) com tipo 'exato', 'estimado' ou 'minimo'"""
+    maximo = Config.ADMIN_CONTAGEM_EXATA_MAX
+    amostra = query.order_by(None).with_entities(chave).limit(maximo + 1).subquery()
+    total = db.session.query(func.count()).select_from(amostra).scalar()
+    if total <= maximo:
+        return total, 'exato'
+    if not filtrado:
+        estimativa = _estimativa_tabela(tabela)
+        if estimativa:
+            return max(estimativa, total), 'estimado'
+    return maximo, 'minimo'
+
+
+def url_tabela(**mudancas):
+    """URL da tabela atual trocando parâmetros da query string (None remove); volta à primeira página"""
+    args = request.args.to_dict()
+    args.pop('cursor', None)
+    args.update(mudancas)
+    return url_for(request.endpoint, **{k: v for k, v in args.items() if v not in (None, '')})
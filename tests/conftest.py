@@ -0,0 +1,52 @@
+"""Fixtures dos testes: app sobre um SQLite temporário, com as migrações aplicadas."""
+import os
+import sys
+import tempfile
+
+import pytest
+
+pytest_plugins = ['pytester']
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Antes de importar config: banco e pastas de upload só dos testes
+_PASTA = tempfile.mkdtemp(prefix='reutilizaif_testes_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_PASTA, 'testes.db')
+os.environ['FOTOS_DIR'] = os.path.join(_PASTA, 'fotos')
+os.environ['FOTOS_PERFIL_DIR'] = os.path.join(_PASTA, 'perfis')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    from migracoes import aplicar_migracoes
+
+    app = create_app()
+    with app.app_context():
+        aplicar_migracoes()
+    return app
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+def logar(cliente, matricula):
+    with cliente.session_transaction() as sessao:
+        sessao['usuario_logado'] = True
+        sessao['matricula'] = matricula
+
+
+@pytest.fixture
+def produto(app):
+    """Produto novo, disponível para venda"""
+    from models import db, Produto
+
+    with app.app_context():
+        novo = Produto(nome='Produto de teste', preco=10.0, tipo='venda', status='disponivel',
+                       usuario_matricula='dono-teste', usuario_nome='Dono')
+        db.session.add(novo)
+        db.session.commit()
+        return novo.id
@@ -0,0 +1,30 @@
+"""Admin revogado em outro worker: o cache de admins não vale para alterações."""
+import utils
+from conftest import logar
+from models import db, Produto, UsuarioInfo
+
+MATRICULA = '20240000000099'
+
+
+def test_admin_revogado_perde_alteracoes_antes_do_cache_expirar(app, cliente, produto):
+    with app.app_context():
+        info = UsuarioInfo.query.filter_by(matricula=MATRICULA).first() or UsuarioInfo(matricula=MATRICULA)
+        info.is_admin = True
+        db.session.add(info)
+        db.session.commit()
+        utils._admins_cache.delete('admins')
+    logar(cliente, MATRICULA)
+    assert cliente.get('/admin/usuarios').status_code == 200  # cache deste "worker" preenchido
+
+    # Revogado por outro worker: o banco muda, este cache não é invalidado
+    with app.app_context():
+        UsuarioInfo.query.filter_by(matricula=MATRICULA).update({'is_admin': False})
+        db.session.commit()
+    assert MATRICULA in utils._admins_cache.get('admins')
+
+    resposta = cliente.post(f'/produtos/{produto}/excluir')
+    assert resposta.status_code == 302
+    with app.app_context():
+        assert db.session.get(Produto, produto) is not None
+    resposta = cliente.post('/admin/usuarios/dono-teste/toggle-admin')
+    assert '/admin' not in resposta.headers['Location']
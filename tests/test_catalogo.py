@@ -0,0 +1,41 @@
+"""Importação do catálogo: validação da foto e índice de busca com cadastros concorrentes."""
+import io
+import json
+
+import pytest
+
+import busca
+import catalogo
+from models import db, Produto
+
+
+def _linha(nome, **extra):
+    return json.dumps({'nome': nome, 'preco': '5', 'tipo': 'venda', **extra}) + '\n'
+
+
+def test_foto_precisa_ser_nome_de_fotos_dir(app):
+    arquivo = io.StringIO(_linha('Com foto ruim', foto='../../config.py'))
+    with app.app_context():
+        with pytest.raises(catalogo.ImportacaoInvalida) as erro:
+            catalogo.importar(arquivo, 'jsonl')
+        assert 'foto inválida' in erro.value.erros[0][1]
+        resumo = catalogo.importar(io.StringIO(_linha('Com foto boa', foto='ab' * 32 + '.jpg')), 'jsonl')
+        assert resumo['importados'] == 1
+
+
+def test_cadastro_durante_a_importacao_nao_duplica_o_indice(app):
+    def linhas():
+        yield _linha('Importado um')
+        yield _linha('Importado dois')
+        # Como um POST /produtos/novo entre dois lotes da importação
+        concorrente = Produto(nome='Cadastro concorrente', preco=1.0, tipo='venda', status='disponivel')
+        db.session.add(concorrente)
+        db.session.flush()
+        busca.indexar_produto(concorrente)
+        yield _linha('Importado três')
+
+    with app.app_context():
+        resumo = catalogo.importar(linhas(), 'jsonl', lote=2)
+        assert resumo['importados'] == 3
+        produtos, _ = busca.buscar_produtos('três')
+        assert [p.nome for p in produtos] == ['Importado três']
@@ -0,0 +1,75 @@
+import re
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from conftest import logar
+from models import db
+
+
+def _congelar_updated_at(app, produto_id):
+    """Simula escritas no mesmo segundo: updated_at volta ao mesmo valor (sem passar pelo ORM)"""
+    with app.app_context():
+        db.session.execute(text("UPDATE produto SET updated_at = '2026-01-01 12:00:00' WHERE id = :id"),
+                           {'id': produto_id})
+        db.session.commit()
+
+
+def test_etag_muda_com_dois_votos_no_mesmo_segundo(app, cliente, produto):
+    logar(cliente, 'votante-1')
+    _congelar_updated_at(app, produto)
+    antes = cliente.get('/api/produtos').headers['ETag']
+
+    assert cliente.post(f'/produtos/{produto}/avaliar', data={'nota': 5}).status_code == 200
+    _congelar_updated_at(app, produto)
+    depois_primeiro = cliente.get('/api/produtos', headers={'If-None-Match': antes})
+    assert depois_primeiro.status_code == 200
+
+    logar(cliente, 'votante-2')
+    assert cliente.post(f'/produtos/{produto}/avaliar', data={'nota': 1}).status_code == 200
+    _congelar_updated_at(app, produto)
+    logar(cliente, 'votante-1')
+    depois_segundo = cliente.get('/api/produtos', headers={'If-None-Match': depois_primeiro.headers['ETag']})
+    assert depois_segundo.status_code == 200
+    assert len({antes, depois_primeiro.headers['ETag'], depois_segundo.headers['ETag']}) == 3
+
+
+def _revalidar(cliente, etag):
+    return cliente.get('/api/produtos', headers={'If-None-Match': etag})
+
+
+def test_304_depois_de_voto_e_de_edicao(app, cliente, produto):
+    logar(cliente, 'votante-3')
+    etag = cliente.get('/api/produtos').headers['ETag']
+    assert _revalidar(cliente, etag).status_code == 304
+
+    assert cliente.post(f'/produtos/{produto}/avaliar', data={'nota': 4}).status_code == 200
+    resposta = _revalidar(cliente, etag)
+    assert resposta.status_code == 200
+    etag = resposta.headers['ETag']
+    assert _revalidar(cliente, etag).status_code == 304
+
+    logar(cliente, 'dono-teste')
+    etag = cliente.get('/api/produtos').headers['ETag']
+    editado = cliente.post(f'/produtos/{produto}/editar',
+                           data={'nome': 'Produto editado', 'preco': '12,00', 'tipo': 'venda'})
+    assert editado.status_code == 302
+    resposta = _revalidar(cliente, etag)
+    assert resposta.status_code == 200
+    assert _revalidar(cliente, resposta.headers['ETag']).status_code == 304
+
+
+def test_validador_nao_le_a_tabela_de_produtos(app, cliente, produto):
+    logar(cliente, 'votante-4')
+    etag = cliente.get('/api/produtos').headers['ETag']
+    consultas = []
+
+    def registrar(conn, cursor, sql, parametros, contexto, executemany):
+        consultas.append(sql)
+
+    event.listen(Engine, 'before_cursor_execute', registrar)
+    try:
+        assert _revalidar(cliente, etag).status_code == 304
+    finally:
+        event.remove(Engine, 'before_cursor_execute', registrar)
+    assert not [sql for sql in consultas if re.search(r'\bproduto\b', sql)]
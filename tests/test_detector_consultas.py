@@ -0,0 +1,74 @@
+"""Fixture do detector de consultas: falha com N+1 e SELECT sem LIMIT, passa com consultas limitadas."""
+import subprocess
+import sys
+
+import pytest
+
+from conftest import RAIZ
+
+CONFTEST = '''
+import pytest
+
+pytest_plugins = ['detector_consultas']
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    return create_app()
+'''
+
+TESTES = '''
+from config import Config
+from models import db, Avaliacao, Produto
+
+
+def _ids(n):
+    return [i for (i,) in db.session.query(Produto.id).order_by(Produto.id).limit(n)]
+
+
+def test_laco_com_calcular_media(app, detector_consultas):
+    with app.app_context():
+        for produto_id in _ids(Config.DETECTOR_REPETICOES + 1):
+            Avaliacao.calcular_media(produto_id)
+
+
+def test_select_sem_limite(app, detector_consultas, monkeypatch):
+    monkeypatch.setattr(Config, 'DETECTOR_LINHAS_MAX', 1)
+    with app.app_context():
+        Produto.query.all()
+
+
+def test_consulta_limitada(app, detector_consultas):
+    with app.app_context():
+        Produto.query.order_by(Produto.id).limit(10).all()
+        Avaliacao.calcular_media(_ids(1)[0])
+'''
+
+
+@pytest.fixture
+def produtos(app):
+    from config import Config
+    from models import db, Produto
+
+    with app.app_context():
+        faltam = Config.DETECTOR_REPETICOES + 1 - Produto.query.count()
+        for i in range(max(faltam, 0)):
+            db.session.add(Produto(nome=f'Produto {i}', preco=1.0, tipo='venda', status='disponivel'))
+        db.session.commit()
+
+
+def test_fixture_falha_com_n_mais_1_e_sem_limite(pytester, produtos):
+    pytester.makeconftest(CONFTEST)
+    pytester.makepyfile(test_interno=TESTES)
+    resultado = pytester.runpytest('-p', 'no:cacheprovider')
+    # As violações falham o teste no teardown da fixture (erro), não na chamada
+    resultado.assert_outcomes(passed=3, errors=2)
+    resultado.stdout.fnmatch_lines(['ERROR *test_laco_com_calcular_media*', 'ERROR *test_select_sem_limite*'])
+    resultado.stdout.fnmatch_lines(['*[[]n+1[]]*', '*[[]sem_limite[]]*'])
+
+
+def test_plugin_nao_le_config_ao_carregar():
+    # Como plugin (-p), o módulo carrega antes do conftest definir DATABASE_URL
+    codigo = 'import sys, detector_consultas; sys.exit("config" in sys.modules)'
+    assert subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ).returncode == 0
@@ -0,0 +1,73 @@
+"""Fotos de produtos: uploads e originais que o Pillow não decodifica."""
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+import fotos
+
+
+@pytest.fixture
+def pool_em_thread(monkeypatch):
+    """Gera as miniaturas numa thread do próprio processo, contando os envios"""
+    pool = ThreadPoolExecutor(max_workers=1)
+    envios = []
+
+    class Pool:
+        def submit(self, funcao, *args):
+            envios.append(args)
+            return pool.submit(funcao, *args)
+
+    monkeypatch.setattr(fotos, '_obter_pool', Pool)
+    yield envios
+    pool.shutdown(wait=True)
+
+
+def _esperar_fila():
+    prazo = time.monotonic() + 5
+    while fotos._pendentes and time.monotonic() < prazo:
+        time.sleep(0.01)
+
+
+def _jpeg_corrompido():
+    # Assinatura de JPEG válida, conteúdo que o Pillow não consegue ler
+    return b'\xff\xd8\xff\xe0' + os.urandom(2048)
+
+
+def test_upload_que_o_pillow_nao_le_e_recusado(app):
+    with pytest.raises(fotos.FotoInvalida):
+        fotos.salvar_upload(FileStorage(io.BytesIO(_jpeg_corrompido()), 'foto.jpg'))
+    assert not os.listdir(os.path.join(app.config['FOTOS_DIR'], 'tmp'))
+
+
+def test_upload_valido_e_aceito(app, pool_em_thread):
+    saida = io.BytesIO()
+    Image.new('RGB', (400, 300), 'blue').save(saida, 'PNG')
+    nome = fotos.salvar_upload(FileStorage(io.BytesIO(saida.getvalue()), 'foto.png'))
+    assert fotos.foto_existe(nome)
+    _esperar_fila()
+
+
+def test_original_corrompido_nao_volta_para_a_fila(app, pool_em_thread):
+    # Ex.: gravado antes da verificação no upload
+    conteudo = _jpeg_corrompido()
+    nome = f'{hashlib.sha256(conteudo).hexdigest()}.jpg'
+    os.makedirs(os.path.dirname(fotos.caminho_original(nome)), exist_ok=True)
+    with open(fotos.caminho_original(nome), 'wb') as f:
+        f.write(conteudo)
+    with app.app_context():
+        fotos.agendar_miniaturas(nome)
+    _esperar_fila()
+    assert os.path.exists(fotos.caminho_falha(nome))
+
+    with app.test_request_context():
+        for _ in range(3):
+            resposta = fotos.resposta_miniatura(nome, 320, 'webp')
+            assert resposta.mimetype == 'image/jpeg'
+            resposta.close()
+    assert len(pool_em_thread) == 1
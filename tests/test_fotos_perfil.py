@@ -0,0 +1,79 @@
+"""Fotos de perfil: download em segundo plano, sem bloquear /fotos/<matricula>."""
+import threading
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import fotos_perfil
+from conftest import logar
+from models import db, UsuarioInfo
+
+MATRICULA = '20240000000077'
+
+
+@pytest.fixture
+def usuario_com_foto(app):
+    with app.app_context():
+        info = UsuarioInfo.query.filter_by(matricula=MATRICULA).first()
+        if not info:
+            info = UsuarioInfo(matricula=MATRICULA, nome='Aluno com foto')
+            db.session.add(info)
+        info.foto_url = 'https://suap.example/media/foto-77.jpg'
+        db.session.commit()
+        fotos_perfil.invalidar(MATRICULA)
+    yield
+    fotos_perfil.definir_fetcher(None)
+
+
+def _jpeg():
+    saida = BytesIO()
+    Image.new('RGB', (150, 200), 'red').save(saida, 'JPEG')
+    return saida.getvalue()
+
+
+def _esperar_downloads():
+    prazo = time.monotonic() + 5
+    while fotos_perfil._baixando and time.monotonic() < prazo:
+        time.sleep(0.01)
+
+
+def test_cliente_de_fotos_separado_e_sem_retentativas():
+    from utils import suap_client
+    assert fotos_perfil.cliente_fotos.tentativas == 0
+    assert fotos_perfil.cliente_fotos.breaker is not suap_client.breaker
+
+
+def test_imagem_padrao_enquanto_baixa(cliente, usuario_com_foto):
+    liberar = threading.Event()
+
+    def fetcher_lento(url):
+        assert liberar.wait(timeout=5)
+        return _jpeg()
+
+    fotos_perfil.definir_fetcher(fetcher_lento)
+    logar(cliente, MATRICULA)
+    resposta = cliente.get(f'/fotos/{MATRICULA}')
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'image/svg+xml'
+    assert resposta.headers['Cache-Control'] == 'no-store'
+    liberar.set()
+    _esperar_downloads()
+    resposta = cliente.get(f'/fotos/{MATRICULA}')
+    assert resposta.mimetype == 'image/jpeg'
+
+
+def test_falha_nao_repete_download(cliente, usuario_com_foto):
+    chamadas = []
+
+    def fetcher_com_erro(url):
+        chamadas.append(url)
+        raise fotos_perfil.FotoIndisponivel('HTTP 404')
+
+    fotos_perfil.definir_fetcher(fetcher_com_erro)
+    logar(cliente, MATRICULA)
+    for _ in range(3):
+        assert cliente.get(f'/fotos/{MATRICULA}').mimetype == 'image/svg+xml'
+        _esperar_downloads()
+    assert len(chamadas) == 1
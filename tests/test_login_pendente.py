@@ -0,0 +1,57 @@
+"""Login com SUAP em segundo plano: falhas ao gravar, prazo dos pendentes e dados guardados."""
+import json
+import secrets
+from datetime import timedelta
+
+import login_pendente
+from models import db, LoginPendente
+
+
+def _pendente(created_at=None):
+    pendente = LoginPendente(id=secrets.token_urlsafe(16), matricula='20240000000001', status='pendente',
+                             created_at=created_at or login_pendente._agora_utc())
+    db.session.add(pendente)
+    db.session.commit()
+    return pendente.id
+
+
+def test_resultado_guarda_so_o_necessario(app, monkeypatch):
+    monkeypatch.setattr(login_pendente, 'autenticar_suap', lambda m, s: {
+        'sucesso': True, 'token': 'jwt', 'is_aluno': True, 'dados_usuario': {'nome': 'Aluno'}})
+    with app.app_context():
+        pendente_id = _pendente()
+        login_pendente._em_andamento.acquire()
+        login_pendente._executar(app, pendente_id, '20240000000001', 'senha')
+        guardado = json.loads(db.session.get(LoginPendente, pendente_id).resultado)
+        assert 'dados_usuario' not in guardado
+        assert login_pendente.consultar(pendente_id)['sucesso']
+
+
+def test_falha_ao_gravar_vira_erro(app, monkeypatch):
+    monkeypatch.setattr(login_pendente, 'autenticar_suap', lambda m, s: {'sucesso': True, 'token': 'jwt'})
+    gravar = login_pendente._gravar
+    chamadas = []
+
+    def gravar_falhando_uma_vez(pendente_id, resultado):
+        chamadas.append(resultado)
+        if len(chamadas) == 1:
+            raise RuntimeError('database is locked')
+        return gravar(pendente_id, resultado)
+
+    monkeypatch.setattr(login_pendente, '_gravar', gravar_falhando_uma_vez)
+    with app.app_context():
+        pendente_id = _pendente()
+        login_pendente._em_andamento.acquire()
+        login_pendente._executar(app, pendente_id, '20240000000001', 'senha')
+        resultado = login_pendente.consultar(pendente_id)
+        assert resultado['sucesso'] is False and 'tente novamente' in resultado['erro']
+
+
+def test_pendente_alem_do_prazo_vira_erro(app):
+    with app.app_context():
+        recente = _pendente()
+        assert login_pendente.consultar(recente) is None
+        antigo = _pendente(login_pendente._agora_utc() - login_pendente.PRAZO_PENDENTE - timedelta(seconds=1))
+        resultado = login_pendente.consultar(antigo)
+        assert resultado['sucesso'] is False
+        assert db.session.get(LoginPendente, antigo) is None
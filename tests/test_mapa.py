@@ -0,0 +1,26 @@
+"""GET /api/produtos/mapa com parâmetros numéricos não finitos."""
+import pytest
+
+from conftest import logar
+
+BBOX = '-35.3,-5.9,-35.1,-5.7'
+
+
+@pytest.mark.parametrize('zoom', ['nan', 'inf', '-inf', 'NaN'])
+def test_zoom_nao_finito_responde_400(cliente, zoom):
+    logar(cliente, 'mapa-1')
+    resposta = cliente.get(f'/api/produtos/mapa?bbox={BBOX}&zoom={zoom}')
+    assert resposta.status_code == 400
+
+
+@pytest.mark.parametrize('bbox', ['nan,-5.9,-35.1,-5.7', '-35.3,-inf,-35.1,-5.7', '-35.3,-5.9,inf,nan'])
+def test_bbox_nao_finito_responde_400(cliente, bbox):
+    logar(cliente, 'mapa-1')
+    assert cliente.get(f'/api/produtos/mapa?bbox={bbox}&zoom=13').status_code == 400
+
+
+def test_zoom_invalido_usa_o_padrao(cliente):
+    logar(cliente, 'mapa-1')
+    resposta = cliente.get(f'/api/produtos/mapa?bbox={BBOX}&zoom=abc')
+    assert resposta.status_code == 200
+    assert resposta.get_json()['type'] == 'FeatureCollection'
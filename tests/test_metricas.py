@@ -0,0 +1,29 @@
+"""Métricas: tempo das consultas SQL e latência do SUAP por endpoint."""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import metricas
+from models import db
+
+
+@pytest.mark.parametrize('url, endpoint', [
+    ('https://suap.ifrn.edu.br/api/token/pair', '/api/token/pair'),
+    ('https://suap.ifrn.edu.br/api/v2/rh/eu/?formato=json', '/api/v2/rh/eu/'),
+    ('http://localhost:8001/media/fotos/75x100/20231041110013.jpg', '/media/fotos/75x100/:id'),
+    ('https://suap.ifrn.edu.br/api/edu/alunos/123/', '/api/edu/alunos/:id/'),
+])
+def test_endpoint_suap(url, endpoint):
+    assert metricas.endpoint_suap(url) == endpoint
+
+
+def test_consulta_com_erro_nao_deixa_inicio_na_conexao(app):
+    with app.app_context():
+        conexao = db.session.connection()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                db.session.execute(text('SELECT * FROM tabela_que_nao_existe'))
+            db.session.rollback()
+            conexao = db.session.connection()
+        assert db.session.execute(text('SELECT 1')).scalar() == 1
+        assert 'metricas_inicio' not in conexao.info
@@ -0,0 +1,44 @@
+"""Migrações aplicadas sobre um banco criado antes de produto ganhar colunas novas."""
+import os
+import tempfile
+
+from sqlalchemy import create_engine, inspect, text
+
+from migracoes import MIGRACOES, aplicar_migracoes
+
+# Schema da primeira versão do projeto (antes da migração 2)
+SCHEMA_ORIGINAL = (
+    "CREATE TABLE produto (id INTEGER PRIMARY KEY, nome VARCHAR(100) NOT NULL, preco FLOAT NOT NULL,"
+    " descricao VARCHAR(500), usuario_matricula VARCHAR(20), usuario_nome VARCHAR(150), tipo VARCHAR(20),"
+    " status VARCHAR(20), endereco VARCHAR(200), latitude FLOAT, longitude FLOAT,"
+    " created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)",
+    "CREATE TABLE usuario_info (id INTEGER PRIMARY KEY, matricula VARCHAR(20) NOT NULL UNIQUE,"
+    " telefone VARCHAR(30), nome VARCHAR(150), curso VARCHAR(150), campus VARCHAR(150),"
+    " foto_url VARCHAR(300), senha_hash VARCHAR(255), jwt_token TEXT,"
+    " created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)",
+    "CREATE TABLE avaliacao (id INTEGER PRIMARY KEY, produto_id INTEGER NOT NULL REFERENCES produto (id),"
+    " avaliador_matricula VARCHAR(20) NOT NULL, nota INTEGER NOT NULL, comentario VARCHAR(500),"
+    " created_at DATETIME DEFAULT CURRENT_TIMESTAMP)",
+    "CREATE TABLE schema_migracao (versao INTEGER PRIMARY KEY, descricao VARCHAR(200),"
+    " aplicada_em DATETIME DEFAULT CURRENT_TIMESTAMP)",
+    "INSERT INTO schema_migracao (versao, descricao) VALUES (1, 'schema inicial')",
+    "INSERT INTO produto (nome, preco, tipo, status) VALUES ('Antigo', 5, 'venda', 'disponivel')",
+    "INSERT INTO avaliacao (produto_id, avaliador_matricula, nota) VALUES (1, 'a', 4), (1, 'b', 2)",
+)
+
+
+def test_banco_antigo_recebe_todas_as_migracoes():
+    pasta = tempfile.mkdtemp(prefix='migracoes_')
+    engine = create_engine('sqlite:///' + os.path.join(pasta, 'antigo.db'))
+    with engine.begin() as conn:
+        for instrucao in SCHEMA_ORIGINAL:
+            conn.execute(text(instrucao))
+
+    aplicadas = aplicar_migracoes(engine)
+
+    assert aplicadas == sorted(v for v, _, _ in MIGRACOES if v > 1)
+    assert 'versao' in {c['name'] for c in inspect(engine).get_columns('produto')}
+    with engine.connect() as conn:
+        linha = conn.execute(text("SELECT rating_count, rating_sum, versao FROM produto")).one()
+    assert tuple(linha) == (2, 6, 1)
+    engine.dispose()
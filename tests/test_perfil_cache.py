@@ -0,0 +1,22 @@
+import time
+
+import cache
+import utils
+from config import Config
+from models import PerfilSuap, db
+
+
+def test_invalidacao_em_outro_worker_vale_apos_o_ttl_da_memoria(app, monkeypatch):
+    relogio = [time.monotonic()]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: relogio[0])
+    with app.app_context():
+        utils.salvar_perfil_cache('perfil-cache', {'nome': 'Antigo'})
+        assert utils.obter_perfil_cache('perfil-cache') == {'nome': 'Antigo'}
+
+        # Outro worker atendeu /perfil?atualizar=1: apagou a linha, mas não esta memória
+        PerfilSuap.query.filter_by(matricula='perfil-cache').delete()
+        db.session.commit()
+        assert utils.obter_perfil_cache('perfil-cache') == {'nome': 'Antigo'}
+
+        relogio[0] += Config.PERFIL_MEMORIA_TTL + 1
+        assert utils.obter_perfil_cache('perfil-cache') is None
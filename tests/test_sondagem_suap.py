@@ -0,0 +1,63 @@
+"""Busca dos dados no SUAP: prioridade dos endpoints e um só resultado no circuit breaker."""
+import time
+
+import pytest
+import requests
+
+import utils
+from utils import CircuitBreaker, SuapClient, SUAP_ENDPOINTS_DADOS
+
+PRINCIPAL, ALUNO = SUAP_ENDPOINTS_DADOS[0], SUAP_ENDPOINTS_DADOS[1]
+
+
+@pytest.fixture
+def suap(monkeypatch):
+    """Respostas por endpoint: (segundos de espera, dados, erro)"""
+    respostas = {}
+
+    def consultar(caminho, headers):
+        espera, dados, erro = respostas.get(caminho, (0, None, 'HTTP 404'))
+        time.sleep(espera)
+        return dados, erro
+
+    monkeypatch.setattr(utils, '_consultar_endpoint_dados', consultar)
+    monkeypatch.setattr(utils, '_endpoint_preferido', PRINCIPAL)
+    monkeypatch.setattr(utils.suap_client, 'breaker', CircuitBreaker(limite_falhas=2, tempo_reabertura=30))
+    return respostas
+
+
+class SessaoLenta:
+    """requests.Session em que toda chamada estoura o timeout de leitura"""
+
+    def request(self, metodo, url, **kwargs):
+        raise requests.exceptions.ReadTimeout('lento')
+
+
+def test_sondagens_com_falha_contam_uma_vez_no_breaker(monkeypatch):
+    cliente = SuapClient('http://suap.teste', tentativas=0,
+                         breaker=CircuitBreaker(limite_falhas=2, tempo_reabertura=30))
+    cliente.session = SessaoLenta()
+    monkeypatch.setattr(utils, 'suap_client', cliente)
+    monkeypatch.setattr(utils, '_endpoint_preferido', PRINCIPAL)
+
+    dados, erro = utils._buscar_dados_suap({})
+    assert dados is None and erro
+    assert cliente.breaker._falhas == 1
+    assert cliente.breaker.estado == CircuitBreaker.FECHADO
+
+
+def test_endpoint_de_maior_prioridade_vence_mesmo_mais_lento(suap):
+    suap[PRINCIPAL] = (0, None, 'HTTP 503')
+    suap[ALUNO] = (0.2, {'origem': 'aluno'}, None)
+    suap[SUAP_ENDPOINTS_DADOS[-1]] = (0, {'origem': 'fallback v2'}, None)
+    dados, erro = utils._buscar_dados_suap({})
+    assert dados == {'origem': 'aluno'} and erro is None
+    assert utils._endpoint_preferido == ALUNO
+    assert utils.suap_client.breaker._falhas == 0
+
+
+def test_endpoints_404_sao_pulados(suap):
+    suap[SUAP_ENDPOINTS_DADOS[-1]] = (0, {'origem': 'fallback v2'}, None)
+    dados, _ = utils._buscar_dados_suap({})
+    assert dados == {'origem': 'fallback v2'}
+    assert utils._endpoint_preferido == SUAP_ENDPOINTS_DADOS[-1]
@@ -0,0 +1,48 @@
+import pytest
+import requests
+
+from utils import CircuitBreaker, SuapClient
+
+
+class SessaoFalsa:
+    """Substitui requests.Session: levanta ou devolve o próximo item da fila"""
+
+    def __init__(self, *respostas):
+        self.respostas = list(respostas)
+
+    def request(self, metodo, url, **kwargs):
+        resposta = self.respostas.pop(0)
+        if isinstance(resposta, BaseException):
+            raise resposta
+        return resposta
+
+
+def _resposta(status):
+    resposta = requests.Response()
+    resposta.status_code = status
+    return resposta
+
+
+def _cliente(*respostas):
+    cliente = SuapClient('http://suap.teste', tentativas=0,
+                         breaker=CircuitBreaker(limite_falhas=1, tempo_reabertura=0))
+    cliente.session = SessaoFalsa(*respostas)
+    return cliente
+
+
+@pytest.mark.parametrize('erro', [requests.exceptions.ChunkedEncodingError('corpo cortado'),
+                                  requests.exceptions.TooManyRedirects('redirecionamentos'),
+                                  ValueError('erro fora do requests')])
+def test_falha_na_chamada_de_teste_reabre_o_breaker(erro):
+    cliente = _cliente(_resposta(500), erro, _resposta(200))
+    cliente.get('/api/rh/eu/')
+    assert cliente.breaker.estado == CircuitBreaker.ABERTO
+
+    # Chamada de teste (meio-aberto) termina com uma exceção qualquer: volta a ABERTO
+    with pytest.raises(type(erro)):
+        cliente.get('/api/rh/eu/')
+    assert cliente.breaker.estado == CircuitBreaker.ABERTO
+
+    # Passado o tempo de reabertura, a próxima chamada de teste ainda é permitida
+    assert cliente.get('/api/rh/eu/').status_code == 200
+    assert cliente.breaker.estado == CircuitBreaker.FECHADO
@@ -1,7 +1,172 @@
+import base64
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from datetime import datetime, timedelta, timezone
 import requests
-from flask import session
+from requests.adapters import HTTPAdapter
+from flask import session, g, request, has_request_context
+from werkzeug.local import LocalProxy
+from sqlalchemy import and_, or_, func, literal
 from config import Config
-from models import UsuarioInfo
+from models import db, Produto, UsuarioInfo, PerfilSuap
+from cache import TTLCache
+import metricas
+
+# Contadores da página pública; invalidado pelas rotas que alteram produtos/usuários.
+# Em outros workers o valor antigo dura no máximo ESTATISTICAS_CACHE_TTL.
+_estatisticas_cache = TTLCache(ttl=Config.ESTATISTICAS_CACHE_TTL)
+# Matrículas com permissão de admin, só para leituras (ver is_admin_user); invalidado por admin.toggle_admin
+_admins_cache = TTLCache(ttl=Config.ADMINS_CACHE_TTL)
+# Perfis normalizados do SUAP por matrícula (camada em memória sobre a tabela perfil_suap).
+# Os três caches são por processo: a invalidação não chega aos outros workers (ver config.py)
+_perfis_cache = TTLCache(ttl=Config.PERFIL_MEMORIA_TTL)
+
+class SuapIndisponivel(requests.exceptions.ConnectionError):
+    """SUAP marcado como fora do ar pelo circuit breaker: falha imediata, sem rede"""
+
+
+class CircuitBreaker:
+    """Abre após `limite_falhas` falhas seguidas e só deixa uma chamada de teste passar
+    depois de `tempo_reabertura` segundos (meio-aberto)."""
+
+    FECHADO, ABERTO, MEIO_ABERTO = 'fechado', 'aberto', 'meio_aberto'
+
+    def __init__(self, limite_falhas, tempo_reabertura):
+        self.limite_falhas = limite_falhas
+        self.tempo_reabertura = tempo_reabertura
+        self.estado = self.FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self.estado == self.FECHADO:
+                return True
+            if self.estado == self.ABERTO and time.monotonic() - self._aberto_em >= self.tempo_reabertura:
+                # Deixa passar uma única chamada de teste
+                self.estado = self.MEIO_ABERTO
+                return True
+            return False
+
+    def esta_aberto(self):
+        """True enquanto as chamadas estão sendo recusadas (não consome a chamada de teste)"""
+        with self._lock:
+            return (self.estado == self.ABERTO
+                    and time.monotonic() - self._aberto_em < self.tempo_reabertura)
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self.estado = self.FECHADO
+            self._falhas = 0
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            if self.estado == self.MEIO_ABERTO or self._falhas >= self.limite_falhas:
+                self.estado = self.ABERTO
+                self._aberto_em = time.monotonic()
+
+
+class SuapClient:
+    """Cliente HTTP compartilhado do SUAP.
+
+    - conexões keep-alive reutilizadas (requests.Session com pool);
+    - retentativas limitadas com backoff exponencial e jitter, apenas para erros de
+      conexão e 502/503/504 (timeouts de leitura não são repetidos, para limitar a latência);
+    - circuit breaker que falha rápido enquanto o SUAP estiver fora do ar.
+    """
+
+    STATUS_RETENTAVEIS = (502, 503, 504)
+
+    def __init__(self, base_url, timeout=(3, 10), tentativas=2, backoff=0.3,
+                 pool_tamanho=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker(limite_falhas=5, tempo_reabertura=30)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_tamanho, pool_maxsize=pool_tamanho, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def url(self, caminho):
+        return caminho if caminho.startswith('http') else f"{self.base_url}{caminho}"
+
+    def _esperar(self, tentativa):
+        # Backoff exponencial com "full jitter" para não sincronizar os workers
+        time.sleep(random.uniform(0, self.backoff * (2 ** tentativa)))
+
+    def _enviar(self, metodo, url, **kwargs):
+        """Uma tentativa, com a latência registrada em /metrics (status HTTP ou nome do erro)"""
+        inicio = time.perf_counter()
+        try:
+            response = self.session.request(metodo, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            metricas.observar_suap(url, type(e).__name__, time.perf_counter() - inicio)
+            raise
+        metricas.observar_suap(url, response.status_code, time.perf_counter() - inicio)
+        return response
+
+    def _tentar(self, metodo, url, **kwargs):
+        """Tentativas com backoff; retorna a última resposta ou propaga a última exceção"""
+        for tentativa in range(self.tentativas + 1):
+            ultima = tentativa == self.tentativas
+            try:
+                response = self._enviar(metodo, url, **kwargs)
+            except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError):
+                if ultima:
+                    raise
+                self._esperar(tentativa)
+                continue
+            if response.status_code in self.STATUS_RETENTAVEIS and not ultima:
+                self._esperar(tentativa)
+                continue
+            return response
+
+    def request(self, metodo, caminho, usar_breaker=True, **kwargs):
+        """`usar_breaker=False`: chamada fora do circuit breaker, para quem registra um
+        resultado só para um grupo de chamadas (ver _buscar_dados_suap)"""
+        url = self.url(caminho)
+        kwargs.setdefault('timeout', self.timeout)
+        if not usar_breaker:
+            return self._tentar(metodo, url, **kwargs)
+        if not self.breaker.permitir():
+            metricas.observar_suap(url, 'breaker_aberto', 0)
+            raise SuapIndisponivel('SUAP indisponível (circuit breaker aberto)')
+        # Toda saída registra um resultado no breaker: se a chamada de teste do estado
+        # meio-aberto sumisse sem registro, o breaker ficaria recusando tudo para sempre
+        try:
+            response = self._tentar(metodo, url, **kwargs)
+        except BaseException:
+            self.breaker.registrar_falha()
+            raise
+        if response.status_code >= 500:
+            self.breaker.registrar_falha()
+        else:
+            self.breaker.registrar_sucesso()
+        return response
+
+    def get(self, caminho, **kwargs):
+        return self.request('GET', caminho, **kwargs)
+
+    def post(self, caminho, **kwargs):
+        return self.request('POST', caminho, **kwargs)
+
+
+suap_client = SuapClient(
+    Config.SUAP_API_BASE_URL,
+    timeout=(Config.SUAP_TIMEOUT_CONEXAO, Config.SUAP_TIMEOUT_LEITURA),
+    tentativas=Config.SUAP_TENTATIVAS,
+    backoff=Config.SUAP_BACKOFF,
+    pool_tamanho=Config.SUAP_POOL_TAMANHO,
+    breaker=CircuitBreaker(Config.SUAP_BREAKER_FALHAS, Config.SUAP_BREAKER_REABERTURA)
+)
+
 
 def autenticar_suap(matricula, senha):
     """Autentica usuário no SUAP e retorna dados"""
@@ -28,11 +193,10 @@ def autenticar_suap(matricula, senha):
         for url in endpoints:
             try:
                 # Tenta primeiro com JSON (formato correto conforme api.json)
-                response = requests.post(
+                response = suap_client.post(
                     url, 
                     json=data, 
                     headers=headers_json, 
-                    timeout=15,  # Aumentado para 15 segundos
                     allow_redirects=False,
                     verify=True  # Verifica certificado SSL
                 )
@@ -54,10 +218,9 @@ def autenticar_suap(matricula, senha):
                     # Outro erro - tenta form-data como fallback
                     print(f"✗ {url} retornou {response.status_code}, tentando form-data...")
                     try:
-                        response_form = requests.post(
+                        response_form = suap_client.post(
                             url, 
                             data=data, 
-                            timeout=15,
                             allow_redirects=False,
                             verify=True
                         )
@@ -72,6 +235,10 @@ def autenticar_suap(matricula, senha):
                     except:
                         last_error = f"HTTP {response.status_code}"
                         
+            except SuapIndisponivel:
+                last_error = "SuapIndisponivel"
+                print(f"✗ SUAP indisponível (circuit breaker aberto), ignorando {url}")
+                break
             except requests.exceptions.ConnectionError as e:
                 last_error = f"ConnectionError: Não foi possível conectar ao servidor"
                 print(f"✗ Erro de conexão com {url}: {str(e)[:100]}")
@@ -96,7 +263,9 @@ def autenticar_suap(matricula, senha):
         if not response:
             # Mensagem de erro mais informativa
             if last_error:
-                if 'ConnectionError' in last_error or 'ConnectTimeout' in last_error:
+                if last_error == 'SuapIndisponivel':
+                    erro_msg = 'O SUAP está indisponível no momento. Tente novamente em alguns instantes.'
+                elif 'ConnectionError' in last_error or 'ConnectTimeout' in last_error:
                     erro_msg = 'Não foi possível conectar ao servidor SUAP. Verifique sua conexão com a internet.'
                 elif 'Timeout' in last_error:
                     erro_msg = 'O servidor SUAP demorou muito para responder. Tente novamente.'
@@ -120,7 +289,7 @@ def autenticar_suap(matricula, senha):
                 refresh_token = token_data.get('refresh')  # Salvar refresh token para uso futuro
                 
                 if token:
-                    user_info = obter_dados_usuario_suap(token)
+                    user_info = obter_perfil_usuario(matricula, token)
                     
                     if user_info:
                         vinculo = user_info.get('vinculo', {})
@@ -220,6 +389,125 @@ def autenticar_suap(matricula, senha):
         }
 
 
+# Endpoints conforme documentação: https://suap.ifrn.edu.br/api/docs
+# Priorizando /api/rh/eu/ que retorna dados pessoais completos (nome_social, nome_usual, nome_registro, nome, etc)
+SUAP_ENDPOINTS_DADOS = [
+    "/api/rh/eu/",  # Endpoint principal - retorna dados pessoais completos
+    "/api/ensino/meus-dados-aluno/",  # Endpoint específico para alunos
+    "/api/rh/meus-dados/",  # Endpoint geral
+    "/api/v2/rh/eu/",  # Fallback v2
+    "/api/v2/ensino/meus-dados-aluno/",  # Fallback v2
+    "/api/v2/rh/meus-dados/",  # Fallback v2
+]
+
+# Último endpoint de dados que respondeu 200 neste processo (tentado primeiro no próximo login)
+_endpoint_preferido = SUAP_ENDPOINTS_DADOS[0]
+_endpoint_lock = threading.Lock()
+_sondagem_executor = ThreadPoolExecutor(max_workers=Config.SUAP_SONDAGEM_WORKERS,
+                                        thread_name_prefix='suap-sondagem')
+
+
+def _consultar_endpoint_dados(caminho, headers):
+    """GET em um endpoint de dados, fora do breaker; retorna (dados, erro)"""
+    url = suap_client.url(caminho)
+    try:
+        response = suap_client.get(url, headers=headers, verify=True, usar_breaker=False)
+        if response.status_code == 200:
+            dados = response.json()
+            print(f"✓ Dados obtidos com sucesso de: {url}")  # Debug
+            return dados, None
+        print(f"✗ {url} retornou {response.status_code}: {response.text[:200]}")  # Debug
+        return None, f"HTTP {response.status_code}"
+    except requests.exceptions.ConnectionError as e:
+        erro = f"ConnectionError: {str(e)[:100]}"
+        print(f"✗ Erro de conexão com {url}: {erro}")
+        return None, erro
+    except requests.exceptions.Timeout:
+        print(f"✗ Timeout com {url}")
+        return None, "Timeout ao obter dados"
+    except Exception as e:
+        erro = f"{type(e).__name__}: {str(e)[:150]}"
+        print(f"✗ Erro com {url}: {erro}")
+        return None, erro
+
+
+def _suap_respondeu(erro):
+    """O SUAP respondeu com HTTP abaixo de 500 (mesmo 401/404): está no ar"""
+    return erro is None or (erro.startswith('HTTP ') and int(erro[5:]) < 500)
+
+
+def _sondar_endpoints(headers):
+    """Retorna (dados, erro, SUAP respondeu?)"""
+    global _endpoint_preferido
+    preferido = _endpoint_preferido
+    dados, erro = _consultar_endpoint_dados(preferido, headers)
+    # 401: token inválido para todos os endpoints
+    if dados is not None or erro == 'HTTP 401':
+        return dados, erro, True
+
+    respondeu = _suap_respondeu(erro)
+    restantes = [c for c in SUAP_ENDPOINTS_DADOS if c != preferido]
+    futuros = {_sondagem_executor.submit(_consultar_endpoint_dados, c, headers): c for c in restantes}
+    resultados = {}
+    escolhido = None
+    limite = sum(suap_client.timeout) if isinstance(suap_client.timeout, tuple) else suap_client.timeout
+    try:
+        for futuro in as_completed(futuros, timeout=limite + 1):
+            resultados[futuros[futuro]] = futuro.result()
+            # Um endpoint só vence quando todos os de maior prioridade já falharam
+            for caminho in restantes:
+                if caminho not in resultados:
+                    break
+                if resultados[caminho][0] is not None:
+                    escolhido = caminho
+                    break
+            if escolhido:
+                break
+    except FuturesTimeout:
+        erro = "Timeout ao obter dados"
+    finally:
+        for futuro in futuros:
+            futuro.cancel()
+
+    respondeu = respondeu or any(_suap_respondeu(e) for _, e in resultados.values())
+    if escolhido:
+        with _endpoint_lock:
+            _endpoint_preferido = escolhido
+        return resultados[escolhido][0], None, True
+    # Prazo esgotado com endpoint melhor ainda pendente: usa o melhor que respondeu,
+    # sem torná-lo o preferido (o pendente pode só estar lento agora)
+    for caminho in restantes:
+        if resultados.get(caminho, (None,))[0] is not None:
+            return resultados[caminho][0], None, True
+    erros = [e for _, e in resultados.values() if e]
+    if erro != "Timeout ao obter dados" and erros:
+        erro = erros[-1]
+    return None, erro, respondeu
+
+
+def _buscar_dados_suap(headers):
+    """Busca os dados do usuário: primeiro no endpoint que funcionou por último; se falhar,
+    sonda os demais em paralelo, na prioridade de SUAP_ENDPOINTS_DADOS.
+
+    Assim a latência do login fica limitada a ~2 timeouts, qualquer que seja a versão da API.
+    A busca inteira conta como uma chamada no circuit breaker: as sondagens que falham
+    juntas em um login lento não o abrem sozinhas.
+    """
+    breaker = suap_client.breaker
+    if not breaker.permitir():
+        metricas.observar_suap(suap_client.url(_endpoint_preferido), 'breaker_aberto', 0)
+        return None, "SUAP indisponível (circuit breaker aberto)"
+    respondeu = False
+    try:
+        dados, erro, respondeu = _sondar_endpoints(headers)
+        return dados, erro
+    finally:
+        if respondeu:
+            breaker.registrar_sucesso()
+        else:
+            breaker.registrar_falha()
+
+
 def obter_dados_usuario_suap(token):
     """Obtém dados do usuário do SUAP usando o token"""
     try:
@@ -228,48 +516,7 @@ def obter_dados_usuario_suap(token):
             'Accept': 'application/json'
         }
         
-        # Endpoints conforme documentação: https://suap.ifrn.edu.br/api/docs
-        # Priorizando /api/rh/eu/ que retorna dados pessoais completos (nome_social, nome_usual, nome_registro, nome, etc)
-        endpoints_dados = [
-            f"{Config.SUAP_API_BASE_URL}/api/rh/eu/",  # Endpoint principal - retorna dados pessoais completos
-            f"{Config.SUAP_API_BASE_URL}/api/ensino/meus-dados-aluno/",  # Endpoint específico para alunos
-            f"{Config.SUAP_API_BASE_URL}/api/rh/meus-dados/",  # Endpoint geral
-            f"{Config.SUAP_API_BASE_URL}/api/v2/rh/eu/",  # Fallback v2
-            f"{Config.SUAP_API_BASE_URL}/api/v2/ensino/meus-dados-aluno/",  # Fallback v2
-            f"{Config.SUAP_API_BASE_URL}/api/v2/rh/meus-dados/",  # Fallback v2
-        ]
-        
-        dados = None
-        last_error_dados = None
-        for url in endpoints_dados:
-            try:
-                response = requests.get(
-                    url, 
-                    headers=headers, 
-                    timeout=15,
-                    verify=True
-                )
-                
-                if response.status_code == 200:
-                    dados = response.json()
-                    print(f"✓ Dados obtidos com sucesso de: {url}")  # Debug
-                    break
-                else:
-                    print(f"✗ {url} retornou {response.status_code}: {response.text[:200]}")  # Debug
-                    last_error_dados = f"HTTP {response.status_code}"
-                    
-            except requests.exceptions.ConnectionError as e:
-                last_error_dados = f"ConnectionError: {str(e)[:100]}"
-                print(f"✗ Erro de conexão com {url}: {last_error_dados}")
-                continue
-            except requests.exceptions.Timeout as e:
-                last_error_dados = "Timeout ao obter dados"
-                print(f"✗ Timeout com {url}")
-                continue
-            except Exception as e:
-                last_error_dados = f"{type(e).__name__}: {str(e)[:150]}"
-                print(f"✗ Erro com {url}: {last_error_dados}")
-                continue
+        dados, last_error_dados = _buscar_dados_suap(headers)
         
         if dados:
             # Normaliza nome - API SUAP /api/rh/eu/ retorna: nome_social, nome_usual, nome_registro, nome, primeiro_nome, ultimo_nome
@@ -291,9 +538,9 @@ def obter_dados_usuario_suap(token):
             if 'foto' in dados and dados['foto']:
                 foto = dados['foto']
                 if foto.startswith('/'):
-                    dados['foto'] = f"https://suap.ifrn.edu.br{foto}"
+                    dados['foto'] = f"{Config.SUAP_API_BASE_URL}{foto}"
                 elif not foto.startswith('http'):
-                    dados['foto'] = f"https://suap.ifrn.edu.br{foto}"
+                    dados['foto'] = f"{Config.SUAP_API_BASE_URL}/{foto}"
             elif 'url_foto' in dados and dados['url_foto']:
                 dados['foto'] = dados['url_foto']
             elif 'foto_150x200' in dados and dados['foto_150x200']:
@@ -344,6 +591,65 @@ def obter_dados_usuario_suap(token):
         return None
 
 
+def _agora_utc():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def obter_perfil_cache(matricula):
+    """Perfil normalizado em cache (memória, depois perfil_suap) ou None se ausente/expirado"""
+    dados = _perfis_cache.get(matricula)
+    if dados is not None:
+        return dados
+    registro = PerfilSuap.query.filter_by(matricula=matricula).first()
+    if not registro:
+        return None
+    idade = _agora_utc() - registro.atualizado_em
+    if idade > timedelta(seconds=Config.PERFIL_SUAP_TTL):
+        return None
+    dados = json.loads(registro.dados)
+    # Na memória, vale por PERFIL_MEMORIA_TTL, sem passar da validade persistida
+    restante = Config.PERFIL_SUAP_TTL - idade.total_seconds()
+    _perfis_cache.set(matricula, dados, ttl=min(Config.PERFIL_MEMORIA_TTL, restante))
+    return dados
+
+
+def salvar_perfil_cache(matricula, dados):
+    """Grava o perfil normalizado em memória e em perfil_suap"""
+    registro = PerfilSuap.query.filter_by(matricula=matricula).first()
+    if not registro:
+        registro = PerfilSuap(matricula=matricula)
+        db.session.add(registro)
+    registro.dados = json.dumps(dados, ensure_ascii=False)
+    registro.atualizado_em = _agora_utc()
+    db.session.commit()
+    _perfis_cache.set(matricula, dados)
+
+
+def invalidar_perfil(matricula):
+    """Força a próxima leitura do perfil a ir ao SUAP"""
+    _perfis_cache.delete(matricula)
+    PerfilSuap.query.filter_by(matricula=matricula).delete()
+    db.session.commit()
+
+
+def obter_perfil_usuario(matricula, token, atualizar=False):
+    """Perfil normalizado do usuário: do cache local enquanto fresco, senão do SUAP.
+
+    `atualizar=True` ignora o cache e busca de novo no SUAP.
+    """
+    if matricula and not atualizar:
+        dados = obter_perfil_cache(matricula)
+        if dados is not None:
+            return dados
+    dados = obter_dados_usuario_suap(token)
+    if dados and matricula:
+        salvar_perfil_cache(matricula, dados)
+        # Foto nova no SUAP (ou atualização pedida pelo usuário): descarta a cópia local
+        import fotos_perfil
+        fotos_perfil.sincronizar(matricula, dados, forcar=atualizar)
+    return dados
+
+
 def salvar_info_usuario(db_session, matricula, dados_usuario):
     """Salva informações do usuário no banco de dados"""
     from models import UsuarioInfo
@@ -391,12 +697,160 @@ def salvar_info_usuario(db_session, matricula, dados_usuario):
     db_session.session.commit()
 
 
-def is_admin_user():
-    """Retorna True se o usuário na sessão é admin (config ou is_admin no banco)."""
-    matricula = session.get('matricula')
-    if not matricula:
-        return False
+def matriculas_admin():
+    """Matrículas admin (config + is_admin no banco), em cache curto entre requisições"""
+    def carregar():
+        do_banco = db.session.query(UsuarioInfo.matricula).filter(UsuarioInfo.is_admin.is_(True)).all()
+        return frozenset(Config.ADMIN_MATRICULAS) | frozenset(m for (m,) in do_banco)
+    return _admins_cache.obter_ou_calcular('admins', carregar)
+
+
+def invalidar_admins():
+    """Descarta o conjunto de admins em cache (chamar após alterar is_admin)"""
+    _admins_cache.delete('admins')
+    g.pop('is_admin', None)
+
+
+def usuario_atual():
+    """UsuarioInfo do usuário logado, carregado no máximo uma vez por requisição"""
+    if 'usuario_info' not in g:
+        matricula = session.get('matricula')
+        g.usuario_info = UsuarioInfo.query.filter_by(matricula=matricula).first() if matricula else None
+    return g.usuario_info
+
+
+def perfil_de_usuario_info(info):
+    """Dicionário no formato do perfil do SUAP montado a partir do UsuarioInfo (usado pelos templates)"""
+    foto = info.foto_url
+    return {
+        'matricula': info.matricula,
+        'nome': info.nome,
+        'nome_usual': info.nome,
+        'foto': foto,
+        'url_foto_150x200': foto,
+        'url_foto_75x100': foto,
+        'vinculo': {
+            'curso': {'nome': info.curso} if info.curso else None,
+            'campus': {'nome': info.campus} if info.campus else None
+        }
+    }
+
+
+def dados_usuario_atual():
+    """Perfil do usuário logado; a sessão guarda só a matrícula, o resto vem do UsuarioInfo"""
+    if 'dados_usuario' not in g:
+        info = usuario_atual()
+        g.dados_usuario = perfil_de_usuario_info(info) if info else {'matricula': session.get('matricula')}
+    return g.dados_usuario
+
+
+# Passado aos templates como `usuario`: só consulta o banco se o template de fato usar
+perfil_atual = LocalProxy(dados_usuario_atual)
+
+
+def _admin_no_banco(matricula):
+    """Consulta direta, sem o cache entre requisições (que é por worker)"""
     if matricula in Config.ADMIN_MATRICULAS:
         return True
-    u = UsuarioInfo.query.filter_by(matricula=matricula).first()
-    return bool(u and getattr(u, 'is_admin', False))
+    return db.session.query(UsuarioInfo.id).filter(
+        UsuarioInfo.matricula == matricula, UsuarioInfo.is_admin.is_(True)).first() is not None
+
+
+def is_admin_user():
+    """Retorna True se o usuário na sessão é admin (config ou is_admin no banco).
+
+    Leituras usam matriculas_admin() (cache de ADMINS_CACHE_TTL por worker). Requisições
+    que alteram dados (POST etc.) consultam o banco: um admin revogado em outro worker
+    perde na hora o poder de alterar, e não só quando o cache deste expira.
+    """
+    if 'is_admin' not in g:
+        matricula = session.get('matricula')
+        if not matricula:
+            g.is_admin = False
+        elif has_request_context() and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            g.is_admin = _admin_no_banco(matricula)
+        else:
+            g.is_admin = matricula in matriculas_admin()
+    return g.is_admin
+
+
+def codificar_cursor(produto):
+    """Gera o cursor opaco (created_at, id) a partir do último produto da página"""
+    created = produto.created_at.isoformat() if produto.created_at else ''
+    bruto = f"{created}|{produto.id}".encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna (created_at, id) do cursor ou None se for inválido"""
+    if not cursor:
+        return None
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        bruto = base64.urlsafe_b64decode(cursor + preenchimento).decode('utf-8')
+        created, produto_id = bruto.rsplit('|', 1)
+        return (datetime.fromisoformat(created) if created else None), int(produto_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginar_produtos(query, cursor=None, limite=None):
+    """Pagina uma consulta de produtos por keyset (created_at, id), do mais novo ao mais antigo.
+
+    Retorna (produtos, proximo_cursor). O custo de cada página é constante:
+    nunca usa OFFSET, apenas o índice em (created_at, id).
+    """
+    limite = limite or Config.PRODUTOS_POR_PAGINA
+    limite = max(1, min(limite, Config.PRODUTOS_POR_PAGINA_MAX))
+
+    posicao = decodificar_cursor(cursor)
+    if posicao:
+        created, ultimo_id = posicao
+        # Compara com o valor gravado no banco (subconsulta pela PK) para não depender
+        # do formato de data do driver (SQLite grava CURRENT_TIMESTAMP sem microssegundos).
+        # Se o produto do cursor foi removido, cai no valor codificado no cursor.
+        created_ref = db.session.query(Produto.created_at).filter(Produto.id == ultimo_id).scalar_subquery()
+        if created is not None:
+            created_ref = func.coalesce(created_ref, literal(created, Produto.created_at.type))
+        query = query.filter(or_(
+            Produto.created_at < created_ref,
+            and_(Produto.created_at == created_ref, Produto.id < ultimo_id)
+        ))
+
+    produtos = query.order_by(Produto.created_at.desc(), Produto.id.desc()).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(produtos) > limite:
+        produtos = produtos[:limite]
+        proximo_cursor = codificar_cursor(produtos[-1])
+    return produtos, proximo_cursor
+
+
+def _calcular_estatisticas():
+    total_usuarios = db.session.query(func.count(UsuarioInfo.id)).scalar() or 0
+    total_produtos = db.session.query(func.count(Produto.id)).scalar() or 0
+
+    # Contagens de produtos disponíveis por tipo em uma única consulta
+    produtos_stats = db.session.query(
+        Produto.tipo,
+        func.count(Produto.id)
+    ).filter_by(status='disponivel').group_by(Produto.tipo).all()
+    por_tipo = dict(produtos_stats)
+
+    return {
+        'total_usuarios': total_usuarios,
+        'total_produtos': total_produtos,
+        'produtos_venda': por_tipo.get('venda', 0),
+        'produtos_troca': por_tipo.get('troca', 0)
+    }
+
+
+def obter_estatisticas():
+    """Estatísticas da página inicial, servidas do cache em estado estável"""
+    return _estatisticas_cache.obter_ou_calcular('index', _calcular_estatisticas)
+
+
+def invalidar_estatisticas():
+    """Descarta as estatísticas em cache deste processo (chamar após criar/editar/excluir
+    produto ou usuário); os outros workers esperam o ESTATISTICAS_CACHE_TTL"""
+    _estatisticas_cache.delete('index')